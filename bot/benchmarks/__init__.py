@@ -0,0 +1 @@
+# Package benchmarks pour les mesures de performance du bot 
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""Micro-benchmark du rendu des embeds de réservation
+
+Compare, pour N réservations, le rendu avec les dates re-parsées à chaque
+champ (ancien EmbedBuilder, reproduit ci-dessous) et le rendu à partir d'une
+ReservationView construite une seule fois par document.
+
+Usage : python -m benchmarks.embed_render [--count 1000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import discord
+from bson import ObjectId
+
+from config import Config
+from utils.embeds import EmbedBuilder
+from utils.reservation_view import ReservationView
+
+
+def make_reservations(count):
+    """Génère des réservations hydratées comme celles retournées par Database"""
+    now = datetime.utcnow().replace(microsecond=0)
+    reservations = []
+    for i in range(count):
+        start = now + timedelta(hours=random.randint(-500, 500))
+        reservations.append({
+            '_id': ObjectId(),
+            'status': 'pending',
+            'startDate': start,
+            'endDate': start + timedelta(hours=2),
+            'notes': "Soirée jeux" if i % 3 == 0 else None,
+            'game': {'_id': ObjectId(), 'name': f"Jeu {i % 50}", 'players': '2-6', 'duration': '60 min', 'age': '12+'},
+            'user': {'_id': ObjectId(), 'username': f"user{i % 200}"}
+        })
+    return reservations
+
+
+def _legacy_ts(value):
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+def legacy_render(reservation):
+    """Rendu avant ReservationView : chaque champ date re-parse le document"""
+    game = reservation.get('game')
+    user = reservation.get('user')
+
+    # create_reservation_embed
+    embed = discord.Embed(title=f"🎮 Nouvelle réservation - {game['name'] if game else 'Jeu inconnu'}",
+                          color=Config.COLORS['PENDING'], timestamp=datetime.utcnow())
+    embed.add_field(name="📅 Début de réservation", value=f"<t:{_legacy_ts(reservation['startDate'])}:F>", inline=True)
+    embed.add_field(name="📅 Fin de réservation", value=f"<t:{_legacy_ts(reservation['endDate'])}:F>", inline=True)
+    embed.add_field(name="👤 Utilisateur", value=f"{user['username'] if user else 'Utilisateur inconnu'}", inline=True)
+    if reservation.get('notes'):
+        embed.add_field(name="📝 Notes", value=reservation['notes'], inline=False)
+    if game:
+        embed.add_field(name="🎯 Détails du jeu",
+                        value=f"**Joueurs:** {game.get('players', 'N/A')}\n**Durée:** {game.get('duration', 'N/A')}\n**Âge:** {game.get('age', 'N/A')}",
+                        inline=False)
+    embed.set_footer(text=f"ID: {reservation['_id']}")
+
+    # create_reservation_detail_embed
+    detail = discord.Embed(title="📋 Détails de la réservation", color=Config.COLORS['INFO'], timestamp=datetime.utcnow())
+    detail.add_field(name="Statut", value=f"⏳ {reservation['status'].upper()}", inline=True)
+    detail.add_field(name="Début", value=f"<t:{_legacy_ts(reservation['startDate'])}:F>", inline=True)
+    detail.add_field(name="Fin", value=f"<t:{_legacy_ts(reservation['endDate'])}:F>", inline=True)
+    detail.add_field(name="Utilisateur", value=f"{user['username'] if user else 'Inconnu'}", inline=True)
+    if game:
+        detail.add_field(name="Jeu", value=f"**{game['name']}**\nJoueurs: {game.get('players', 'N/A')}\nDurée: {game.get('duration', 'N/A')}", inline=False)
+    if reservation.get('notes'):
+        detail.add_field(name="Notes", value=reservation['notes'], inline=False)
+    detail.set_footer(text=f"ID: {reservation['_id']}")
+
+    # Ligne de create_reservation_list_embed
+    value = f"📅 <t:{_legacy_ts(reservation['startDate'])}:F>\n⏰ <t:{_legacy_ts(reservation['endDate'])}:F>\nID: `{reservation['_id']}`"
+    return embed, detail, value
+
+
+def view_render(reservation):
+    """Rendu actuel : une ReservationView par document, partagée par les embeds"""
+    view = ReservationView.from_document(reservation)
+    embed = EmbedBuilder.create_reservation_embed(view)
+    detail = EmbedBuilder.create_reservation_detail_embed(view)
+    value = f"📅 <t:{view.start_ts}:F>\n⏰ <t:{view.end_ts}:F>\nID: `{view.id}`"
+    return embed, detail, value
+
+
+def measure(render, reservations, repeat):
+    """Temps de rendu (ms) pour l'ensemble des réservations, par répétition"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for reservation in reservations:
+            render(reservation)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du rendu des embeds de réservation")
+    parser.add_argument('--count', type=int, default=1000, help="nombre de réservations rendues")
+    parser.add_argument('--repeat', type=int, default=5, help="nombre de répétitions")
+    args = parser.parse_args()
+
+    reservations = make_reservations(args.count)
+    per_thousand = 1000 / args.count
+
+    print(f"Rendu de {args.count} réservations ({args.repeat} répétitions), coût ramené à 1k réservations :")
+    results = {}
+    for name, render in (('avant (parse par champ)', legacy_render), ('après (ReservationView)', view_render)):
+        timings = measure(render, reservations, args.repeat)
+        results[name] = statistics.median(timings) * per_thousand
+        print(f"  {name:<26} médiane {results[name]:8.2f} ms   min {min(timings) * per_thousand:8.2f} ms")
+
+    before, after = results.values()
+    print(f"  gain: {(1 - after / before) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
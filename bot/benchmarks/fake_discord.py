@@ -0,0 +1,375 @@
+"""Couche Discord simulée pour les benchmarks
+
+Salon, serveur, messages, membres et interactions avec juste ce que les
+services et les cogs du bot utilisent. Chaque appel qui serait une requête
+REST passe par FakeRest : latence aléatoire, limites de débit par route et
+réponses 429 suivies d'une attente retry_after, comme discord.py le fait.
+Les embeds et les vues restent les vrais objets discord.py : le coût de
+leur construction fait partie de la mesure.
+"""
+
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import discord
+
+from utils.profiling import record_rest
+
+# Limites par route (requêtes, fenêtre en secondes), proches de celles de Discord
+DEFAULT_RATE_LIMITS = {
+    'POST /channels/:id/messages': (5, 5.0),
+    'PATCH /channels/:id/messages/:id': (5, 5.0),
+    'GET /channels/:id/messages/:id': (50, 1.0),
+    'PUT /channels/:id/messages/:id/reactions': (1, 0.25),
+    'DELETE /channels/:id/messages/:id/reactions': (1, 0.25),
+    'GET /guilds/:id/members/:id': (10, 1.0),
+    'POST /interactions/:id/:token/callback': None,
+    'POST /webhooks/:id/:token': (5, 2.0),
+}
+
+# Générateur d'identifiants façon snowflake
+_snowflakes = itertools.count(1_300_000_000_000_000_000)
+
+
+def snowflake():
+    return next(_snowflakes)
+
+
+class FakeNotFound(Exception):
+    """Message ou membre inconnu (404)"""
+
+
+class _Bucket:
+    __slots__ = ('limit', 'per', 'remaining', 'reset_at')
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def acquire(self, now):
+        """0 si la requête passe, sinon le retry_after d'une réponse 429"""
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining > 0:
+            self.remaining -= 1
+            return 0.0
+        return self.reset_at - now
+
+
+class FakeRest:
+    """API REST simulée
+
+    latency : durée médiane d'une requête (secondes), jitter : dispersion
+    (loi log-normale), rate_limits : {route: (requêtes, fenêtre)} par salon,
+    random_429 : probabilité d'un 429 inattendu (limite globale, Cloudflare...).
+    """
+
+    def __init__(self, latency=0.05, jitter=0.3, rate_limits=None, random_429=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limits = DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+        self.random_429 = random_429
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self.calls = Counter()
+        self.rate_limited = Counter()
+
+    @contextmanager
+    def suspended(self):
+        """Requêtes instantanées et sans limite, pour préparer un scénario sans le mesurer"""
+        saved = self.latency, self.rate_limits, self.random_429
+        self.latency, self.rate_limits, self.random_429 = 0.0, {}, 0.0
+        try:
+            yield
+        finally:
+            self.latency, self.rate_limits, self.random_429 = saved
+
+    def _duration(self):
+        if not self.latency:
+            return 0.0
+        return self.latency * self._random.lognormvariate(0, self.jitter)
+
+    async def request(self, route, major=None):
+        """Exécute une requête sur route (et le salon major), 429 et nouvelles tentatives comprises"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        limit = self.rate_limits.get(route)
+        bucket = None
+        if limit:
+            bucket = self._buckets.get((route, major))
+            if bucket is None:
+                bucket = self._buckets[(route, major)] = _Bucket(*limit)
+
+        while True:
+            retry_after = bucket.acquire(loop.time()) if bucket else 0.0
+            if not retry_after and self.random_429 and self._random.random() < self.random_429:
+                retry_after = self._random.uniform(0.1, 1.0)
+            if retry_after:
+                self.rate_limited[route] += 1
+                await asyncio.sleep(self._duration() + retry_after)
+                continue
+            await asyncio.sleep(self._duration())
+            break
+
+        self.calls[route] += 1
+        # Comme la trace aiohttp du bot : le temps compte pour le gestionnaire en cours
+        record_rest(time.perf_counter() - started)
+
+
+def _components(view):
+    if view is None:
+        return []
+    return [discord.ActionRow(row) for row in view.to_components()]
+
+
+class FakeRole:
+    def __init__(self, id, name="role"):
+        self.id = id
+        self.name = name
+
+
+class FakeMember:
+    def __init__(self, id, name, roles=(), administrator=False, bot=False):
+        self.id = id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{id}>"
+        self.roles = list(roles)
+        self.guild_permissions = discord.Permissions(administrator=administrator)
+        self.bot = bot
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embeds=(), view=None, author=None):
+        self.id = snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content or ""
+        self.embeds = list(embeds)
+        self.components = _components(view)
+        self.reactions = Counter()
+        self.created_at = time.perf_counter()
+        self.edited_at = None
+
+    async def edit(self, content=None, embed=None, embeds=None, view=discord.utils.MISSING, **kwargs):
+        await self.channel.rest.request('PATCH /channels/:id/messages/:id', self.channel.id)
+        self._apply(content, embed, embeds, view)
+
+    def _apply(self, content=None, embed=None, embeds=None, view=discord.utils.MISSING):
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        if embeds is not None:
+            self.embeds = list(embeds)
+        if view is not discord.utils.MISSING:
+            self.components = _components(view)
+        self.edited_at = time.perf_counter()
+        self.channel._notify_listeners('edit', self)
+
+    async def add_reaction(self, emoji):
+        await self.channel.rest.request('PUT /channels/:id/messages/:id/reactions', self.channel.id)
+        self.reactions[str(emoji)] += 1
+
+    async def remove_reaction(self, emoji, member):
+        await self.channel.rest.request('DELETE /channels/:id/messages/:id/reactions', self.channel.id)
+        self.reactions[str(emoji)] -= 1
+
+    async def delete(self):
+        self.channel.messages.pop(self.id, None)
+
+
+class FakeChannel:
+    """Salon textuel : messages conservés en mémoire, envois et lectures via FakeRest"""
+
+    def __init__(self, id, guild, rest, name="reservations", author=None):
+        self.id = id
+        self.guild = guild
+        self.rest = rest
+        self.name = name
+        self.author = author
+        self.messages = {}
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(kind, message) à chaque envoi ('send') ou édition ('edit') de message"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify_listeners(self, kind, message):
+        for callback in self._listeners:
+            callback(kind, message)
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, delete_after=None, file=None, **kwargs):
+        await self.rest.request('POST /channels/:id/messages', self.id)
+        message = FakeMessage(self, content, [embed] if embed is not None else embeds or (), view, self.author)
+        if delete_after is None:
+            self.messages[message.id] = message
+        self._notify_listeners('send', message)
+        return message
+
+    async def fetch_message(self, message_id):
+        await self.rest.request('GET /channels/:id/messages/:id', self.id)
+        message = self.messages.get(int(message_id))
+        if message is None:
+            raise FakeNotFound(f"Message {message_id} inconnu")
+        return message
+
+    def get_partial_message(self, message_id):
+        return self.messages.get(int(message_id))
+
+
+class FakeGuild:
+    def __init__(self, id, rest, name="BDA"):
+        self.id = id
+        self.rest = rest
+        self.name = name
+        self.members = {}
+
+    def add_member(self, member):
+        self.members[member.id] = member
+        return member
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id):
+        await self.rest.request('GET /guilds/:id/members/:id', self.id)
+        member = self.members.get(member_id)
+        if member is None:
+            raise FakeNotFound(f"Membre {member_id} inconnu")
+        return member
+
+
+class FakeBot:
+    """Client Discord réduit à ce qu'utilisent les services et les cogs"""
+
+    def __init__(self, guild, channel, user):
+        self.guild = guild
+        self.channel = channel
+        self.user = user
+        self.guilds = [guild]
+        self.users = list(guild.members.values())
+        self.latency = 0.05
+        self.notification_service = None
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+
+    def is_ready(self):
+        return True
+
+    def is_closed(self):
+        return False
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise RuntimeError("Interaction déjà répondue")
+        self._done = True
+        await self._interaction.rest.request('POST /interactions/:id/:token/callback')
+
+    async def defer(self, ephemeral=False, thinking=False):
+        await self._respond()
+
+    async def send_message(self, content=None, embed=None, embeds=None, view=None, ephemeral=False, file=None, **kwargs):
+        await self._respond()
+        self._interaction.responses.append(
+            SentResponse(content, [embed] if embed is not None else list(embeds or ()), view, ephemeral, file)
+        )
+
+    async def edit_message(self, content=None, embed=None, embeds=None, view=discord.utils.MISSING, **kwargs):
+        await self._respond()
+        # L'édition porte sur le message du composant cliqué
+        if self._interaction.message is not None:
+            self._interaction.message._apply(content, embed, embeds, view)
+        self._interaction.responses.append(
+            SentResponse(content, [embed] if embed is not None else list(embeds or ()), view, False, None)
+        )
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, ephemeral=False, file=None, **kwargs):
+        await self._interaction.rest.request('POST /webhooks/:id/:token', self._interaction.id)
+        self._interaction.responses.append(
+            SentResponse(content, [embed] if embed is not None else list(embeds or ()), view, ephemeral, file)
+        )
+
+
+class SentResponse:
+    __slots__ = ('content', 'embeds', 'view', 'ephemeral', 'file')
+
+    def __init__(self, content, embeds, view, ephemeral, file):
+        self.content = content
+        self.embeds = embeds
+        self.view = view
+        self.ephemeral = ephemeral
+        self.file = file
+
+
+class FakeInteraction:
+    """Interaction d'une commande slash ou d'un clic sur un composant"""
+
+    def __init__(self, bot, user, message=None):
+        self.id = snowflake()
+        self.client = bot
+        self.rest = bot.channel.rest
+        self.user = user
+        self.guild = bot.guild
+        self.guild_id = bot.guild.id
+        self.channel = bot.channel
+        self.channel_id = bot.channel.id
+        self.message = message
+        self.responses = []
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeReactionPayload:
+    """Équivalent de discord.RawReactionActionEvent pour on_raw_reaction_add"""
+
+    def __init__(self, message, user, emoji, with_member=True):
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+        self.guild_id = message.guild.id
+        self.user_id = user.id
+        self.member = user if with_member else None
+        self.emoji = discord.PartialEmoji.from_str(emoji)
+        self.event_type = 'REACTION_ADD'
+
+
+def reservation_id_of(embed):
+    """ID de réservation d'un embed de notification (pied de page « ID: ... »)"""
+    match = re.fullmatch(r'ID: ([0-9a-f]{24})', embed.footer.text or '') if embed.footer else None
+    return match.group(1) if match else None
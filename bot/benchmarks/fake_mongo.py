@@ -0,0 +1,607 @@
+"""MongoDB en mémoire pour les benchmarks
+
+Reproduit la partie de l'API d'AsyncMongoClient utilisée par Database
+(find, find_one, find_one_and_update, update_one/many, delete_one,
+bulk_write, aggregate $match/$group, create_index, watch) sans serveur.
+
+Les index déclarés par create_index sont réellement maintenus : un index
+de hachage et un index trié sur le premier champ de chaque index. Une
+requête part du plus petit ensemble de candidats qu'un index fournit (ou
+de toute la collection) puis filtre : le nombre de documents examinés
+(stats['examined']) suit donc celui d'un vrai serveur et trahit une
+requête qui perdrait son index.
+
+Chaque commande attend `latency` secondes avant de s'exécuter (aller-retour
+réseau simulé) puis s'exécute sans point d'attente : elle est atomique,
+comme une opération mono-document de MongoDB. L'exécution des requêtes se
+fait en revanche dans la boucle d'événements du bot, ce qu'un vrai serveur
+ne fait pas : pour mesurer le coût côté base, utiliser --mongo-uri.
+"""
+
+import asyncio
+import bisect
+import copy
+import heapq
+import re
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Code renvoyé par MongoDB sans replica set : le bot bascule sur le poll incrémental
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+MISSING = object()
+
+
+def _bson(value):
+    """Valeur telle que relue après un aller-retour BSON (dates naïves UTC à la milliseconde)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: _bson(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_bson(item) for item in value]
+    return value
+
+
+def _get(document, path):
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def _set(document, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _unset(document, path):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def _equals(value, expected):
+    if expected is None:
+        return value is MISSING or value is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value is not MISSING and value == expected
+
+
+def _compare(value, expected, op):
+    if value is MISSING or value is None:
+        return False
+    try:
+        return op(value, expected)
+    except TypeError:
+        return False
+
+
+OPERATORS = {
+    '$eq': lambda value, expected: _equals(value, expected),
+    '$ne': lambda value, expected: not _equals(value, expected),
+    '$in': lambda value, expected: any(_equals(value, item) for item in expected),
+    '$nin': lambda value, expected: not any(_equals(value, item) for item in expected),
+    '$gt': lambda value, expected: _compare(value, expected, lambda a, b: a > b),
+    '$gte': lambda value, expected: _compare(value, expected, lambda a, b: a >= b),
+    '$lt': lambda value, expected: _compare(value, expected, lambda a, b: a < b),
+    '$lte': lambda value, expected: _compare(value, expected, lambda a, b: a <= b),
+    '$exists': lambda value, expected: (value is not MISSING) == bool(expected),
+}
+
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte'}
+
+
+def _is_operator_dict(condition):
+    return isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition)
+
+
+def matches(document, query):
+    """Indique si un document satisfait un filtre MongoDB (sous-ensemble utilisé par le bot)"""
+    for key, condition in query.items():
+        if key == '$or':
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == '$and':
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        else:
+            value = _get(document, key)
+            if _is_operator_dict(condition):
+                for op, expected in condition.items():
+                    if op == '$regex':
+                        flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+                        if not isinstance(value, str) or not re.search(expected, value, flags):
+                            return False
+                    elif op == '$options':
+                        continue
+                    elif not OPERATORS[op](value, expected):
+                        return False
+            elif not _equals(value, condition):
+                return False
+    return True
+
+
+def _sort_key(value):
+    # null et champs absents en premier, comme MongoDB
+    if value is MISSING or value is None:
+        return (0, 0)
+    return (1, value)
+
+
+def _project(document, projection):
+    if not projection:
+        return dict(document)
+    included = {key for key, flag in projection.items() if flag}
+    if included:
+        result = {key: document[key] for key in included if key in document}
+        if projection.get('_id', 1) and '_id' in document:
+            result['_id'] = document['_id']
+        return result
+    excluded = {key for key, flag in projection.items() if not flag}
+    return {key: value for key, value in document.items() if key not in excluded}
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class FakeCursor:
+    """Curseur de find() : sort, limit, skip, to_list, itération asynchrone, explain"""
+
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort = []
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    async def to_list(self, length=None):
+        await self.collection._roundtrip()
+        documents = self.collection._find(self.query, self.projection, self._sort, self._skip, self._limit)
+        return documents[:length] if length else documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in await self.to_list():
+            yield document
+
+    async def explain(self):
+        await self.collection._roundtrip()
+        _, plan = self.collection._candidates(_bson(self.query or {}))
+        return {'queryPlanner': {'winningPlan': {'stage': plan}}}
+
+
+class FakeAggregateCursor:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._documents:
+            yield document
+
+    async def to_list(self, length=None):
+        return self._documents[:length] if length else list(self._documents)
+
+
+class FakeCollection:
+    """Collection en mémoire avec index de hachage et index triés"""
+
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._documents = {}
+        # Champ indexé -> {valeur: {_id}} et champ indexé -> liste triée de (valeur, _id)
+        self._hash = {}
+        self._sorted = {}
+        self.stats = {'commands': 0, 'examined': 0, 'returned': 0}
+
+    def __len__(self):
+        return len(self._documents)
+
+    async def _roundtrip(self):
+        self.stats['commands'] += 1
+        await asyncio.sleep(self.latency)
+
+    # Index
+
+    async def create_index(self, keys, name=None, **kwargs):
+        await self._roundtrip()
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if field != '_id' and field not in self._hash:
+            self._hash[field] = {}
+            self._sorted[field] = []
+            self._index_many(self._documents.values(), fields=[field])
+        return name or field
+
+    def _index_many(self, documents, fields=None):
+        fields = fields if fields is not None else list(self._hash)
+        for field in fields:
+            buckets = self._hash[field]
+            entries = self._sorted[field]
+            for document in documents:
+                value = _get(document, field)
+                value = None if value is MISSING else value
+                if _hashable(value):
+                    buckets.setdefault(value, set()).add(document['_id'])
+                if value is not None:
+                    entries.append((value, document['_id']))
+            try:
+                entries.sort()
+            except TypeError:
+                # Valeurs de types incomparables : pas d'index trié sur ce champ
+                self._sorted[field] = None
+
+    def _index_values(self, document):
+        return {field: _get(document, field) for field in self._hash}
+
+    def _reindex(self, document_id, before, after):
+        """Met à jour les index ; before vaut None pour une insertion, after None pour une suppression"""
+        for field in self._hash:
+            old = MISSING if before is None else before.get(field, MISSING)
+            new = MISSING if after is None else after.get(field, MISSING)
+            old = None if old is MISSING else old
+            new = None if new is MISSING else new
+            if before is not None and after is not None and old == new and type(old) is type(new):
+                continue
+            buckets = self._hash[field]
+            if before is not None and _hashable(old) and old in buckets:
+                buckets[old].discard(document_id)
+            if after is not None and _hashable(new):
+                buckets.setdefault(new, set()).add(document_id)
+            entries = self._sorted[field]
+            if entries is None:
+                continue
+            try:
+                if before is not None and old is not None:
+                    position = bisect.bisect_left(entries, (old, document_id))
+                    if position < len(entries) and entries[position] == (old, document_id):
+                        del entries[position]
+                if after is not None and new is not None:
+                    bisect.insort(entries, (new, document_id))
+            except TypeError:
+                self._sorted[field] = None
+
+    def _candidates(self, query):
+        """Plus petit ensemble d'_id fourni par un index, et nom du plan"""
+        condition = query.get('_id', MISSING)
+        if condition is not MISSING:
+            if not _is_operator_dict(condition):
+                return [condition], 'IDHACK'
+            if '$in' in condition:
+                return list(condition['$in']), 'IXSCAN _id'
+
+        best, plan = None, 'COLLSCAN'
+        for field, condition in query.items():
+            if field.startswith('$') or field not in self._hash:
+                continue
+            if not _is_operator_dict(condition):
+                if not _hashable(condition):
+                    continue
+                ids = self._hash[field].get(condition, ())
+            elif '$in' in condition and all(_hashable(value) for value in condition['$in']):
+                ids = set().union(*(self._hash[field].get(value, ()) for value in condition['$in']))
+            elif RANGE_OPERATORS & condition.keys() and self._sorted[field] is not None:
+                ids = self._range(field, condition)
+            else:
+                continue
+            if best is None or len(ids) < len(best):
+                best, plan = ids, f"IXSCAN {field}"
+        if best is None:
+            return self._documents.keys(), plan
+        return best, plan
+
+    def _range(self, field, condition):
+        entries = self._sorted[field]
+        low, high = 0, len(entries)
+        # Les bornes (valeur, ObjectId min/max) encadrent toutes les entrées de même valeur
+        if '$gte' in condition:
+            low = bisect.bisect_left(entries, (condition['$gte'], _MIN_ID))
+        if '$gt' in condition:
+            low = max(low, bisect.bisect_right(entries, (condition['$gt'], _MAX_ID)))
+        if '$lt' in condition:
+            high = bisect.bisect_left(entries, (condition['$lt'], _MIN_ID))
+        if '$lte' in condition:
+            high = min(high, bisect.bisect_right(entries, (condition['$lte'], _MAX_ID)))
+        return [document_id for _, document_id in entries[low:high]]
+
+    def _matching(self, query):
+        ids, _ = self._candidates(query)
+        documents = self._documents
+        stats = self.stats
+        for document_id in ids:
+            document = documents.get(document_id)
+            if document is None:
+                continue
+            stats['examined'] += 1
+            if matches(document, query):
+                yield document
+
+    def _find(self, query, projection=None, sort=None, skip=0, limit=0):
+        query = _bson(query or {})
+        documents = self._matching(query)
+        if sort:
+            directions = {direction for _, direction in sort}
+            fields = [field for field, _ in sort]
+
+            def key(document):
+                return tuple(_sort_key(_get(document, field)) for field in fields)
+
+            if len(directions) == 1 and limit:
+                pick = heapq.nsmallest if directions == {1} else heapq.nlargest
+                documents = pick(skip + limit, documents, key=key)
+            else:
+                documents = list(documents)
+                for field, direction in reversed(sort):
+                    documents.sort(key=lambda document: _sort_key(_get(document, field)), reverse=direction == -1)
+        else:
+            documents = list(documents)
+        documents = documents[skip:skip + limit if limit else None]
+        self.stats['returned'] += len(documents)
+        return [copy.deepcopy(_project(document, projection)) for document in documents]
+
+    # Lecture
+
+    def find(self, filter=None, projection=None):
+        return FakeCursor(self, filter, projection)
+
+    async def find_one(self, filter=None, projection=None):
+        await self._roundtrip()
+        documents = self._find(filter, projection, limit=1)
+        return documents[0] if documents else None
+
+    async def count_documents(self, filter):
+        await self._roundtrip()
+        return sum(1 for _ in self._matching(_bson(filter)))
+
+    async def aggregate(self, pipeline):
+        await self._roundtrip()
+        return FakeAggregateCursor(self._aggregate(pipeline))
+
+    def _aggregate(self, pipeline):
+        pipeline = list(pipeline)
+        query = {}
+        if pipeline and '$match' in pipeline[0]:
+            query = _bson(pipeline.pop(0)['$match'])
+
+        # Comptage par champ indexé sans filtre : lu sur l'index, comme un COUNT_SCAN
+        if not query and pipeline and '$group' in pipeline[0]:
+            group = pipeline[0]['$group']
+            field = group['_id'][1:] if isinstance(group['_id'], str) else None
+            accumulators = {name: spec for name, spec in group.items() if name != '_id'}
+            if field in self._hash and all(spec == {'$sum': 1} for spec in accumulators.values()):
+                pipeline.pop(0)
+                rows = [
+                    {'_id': value, **{name: len(ids) for name in accumulators}}
+                    for value, ids in self._hash[field].items() if ids
+                ]
+                self.stats['examined'] += sum(len(ids) for ids in self._hash[field].values())
+                return self._run_stages(rows, pipeline)
+
+        return self._run_stages([dict(document) for document in self._matching(query)], pipeline)
+
+    def _run_stages(self, documents, pipeline):
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                documents = [document for document in documents if matches(document, _bson(spec))]
+            elif name == '$group':
+                groups = {}
+                for document in documents:
+                    key = _get(document, spec['_id'][1:]) if isinstance(spec['_id'], str) else spec['_id']
+                    key = None if key is MISSING else key
+                    row = groups.setdefault(key, {'_id': key})
+                    for field, accumulator in spec.items():
+                        if field == '_id':
+                            continue
+                        (op, operand), = accumulator.items()
+                        if op != '$sum':
+                            raise NotImplementedError(f"Accumulateur non pris en charge: {op}")
+                        amount = operand if not isinstance(operand, str) else _get(document, operand[1:])
+                        row[field] = row.get(field, 0) + (amount if isinstance(amount, (int, float)) else 0)
+                documents = list(groups.values())
+            elif name == '$sort':
+                for field, direction in reversed(list(spec.items())):
+                    documents.sort(key=lambda document: _sort_key(_get(document, field)), reverse=direction == -1)
+            elif name == '$limit':
+                documents = documents[:spec]
+            else:
+                raise NotImplementedError(f"Étape d'agrégation non prise en charge: {name}")
+        self.stats['returned'] += len(documents)
+        return documents
+
+    # Écriture
+
+    async def insert_one(self, document):
+        await self._roundtrip()
+        return SimpleNamespace(inserted_id=self._insert([document])[0])
+
+    async def insert_many(self, documents, ordered=True):
+        await self._roundtrip()
+        return SimpleNamespace(inserted_ids=self._insert(documents))
+
+    def _insert(self, documents):
+        inserted = []
+        for document in documents:
+            document = _bson(document)
+            document.setdefault('_id', ObjectId())
+            if document['_id'] in self._documents:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+            self._documents[document['_id']] = document
+            inserted.append(document)
+        if len(inserted) == 1:
+            self._reindex(inserted[0]['_id'], None, self._index_values(inserted[0]))
+        else:
+            self._index_many(inserted)
+        return [document['_id'] for document in inserted]
+
+    def _apply(self, document, update, inserting=False):
+        before = self._index_values(document)
+        for op, fields in update.items():
+            fields = _bson(fields)
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                for path, value in fields.items():
+                    _set(document, path, value)
+            elif op == '$unset':
+                for path in fields:
+                    _unset(document, path)
+            elif op == '$inc':
+                for path, amount in fields.items():
+                    current = _get(document, path)
+                    _set(document, path, (0 if current is MISSING else current) + amount)
+            elif op != '$setOnInsert':
+                raise NotImplementedError(f"Opérateur de mise à jour non pris en charge: {op}")
+        self._reindex(document['_id'], before, self._index_values(document))
+
+    def _upsert(self, query, update):
+        document = {key: value for key, value in _bson(query).items() if not key.startswith('$') and not _is_operator_dict(value)}
+        document.setdefault('_id', ObjectId())
+        if document['_id'] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+        self._documents[document['_id']] = document
+        self._reindex(document['_id'], None, self._index_values(document))
+        self._apply(document, update, inserting=True)
+        return document
+
+    def _update(self, query, update, upsert=False, many=False):
+        query = _bson(query)
+        documents = list(self._matching(query))
+        if not many:
+            documents = documents[:1]
+        modified = 0
+        for document in documents:
+            snapshot = copy.deepcopy(document)
+            self._apply(document, update)
+            modified += document != snapshot
+        upserted_id = None
+        if not documents and upsert:
+            upserted_id = self._upsert(query, update)['_id']
+        return SimpleNamespace(matched_count=len(documents), modified_count=modified, upserted_id=upserted_id)
+
+    async def update_one(self, filter, update, upsert=False):
+        await self._roundtrip()
+        return self._update(filter, update, upsert)
+
+    async def update_many(self, filter, update, upsert=False):
+        await self._roundtrip()
+        return self._update(filter, update, upsert, many=True)
+
+    async def find_one_and_update(self, filter, update, projection=None, upsert=False, return_document=False, **kwargs):
+        await self._roundtrip()
+        query = _bson(filter)
+        document = next(iter(self._matching(query)), None)
+        if document is None:
+            if not upsert:
+                return None
+            document = self._upsert(query, update)
+            return copy.deepcopy(_project(document, projection)) if return_document else None
+        before = copy.deepcopy(document)
+        self._apply(document, update)
+        return copy.deepcopy(_project(document if return_document else before, projection))
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._roundtrip()
+        matched = modified = 0
+        for request in requests:
+            result = self._update(request._filter, request._doc, request._upsert)
+            matched += result.matched_count
+            modified += result.modified_count
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def delete_one(self, filter):
+        await self._roundtrip()
+        document = next(iter(self._matching(_bson(filter))), None)
+        if document is None:
+            return SimpleNamespace(deleted_count=0)
+        self._reindex(document['_id'], self._index_values(document), None)
+        del self._documents[document['_id']]
+        return SimpleNamespace(deleted_count=1)
+
+    async def watch(self, *args, **kwargs):
+        await self._roundtrip()
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=CHANGE_STREAM_UNSUPPORTED)
+
+
+# Bornes des ObjectId, pour les recherches par intervalle dans les index triés
+_MIN_ID = ObjectId(b'\x00' * 12)
+_MAX_ID = ObjectId(b'\xff' * 12)
+
+
+class FakeDatabase:
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._collections = {}
+
+    def __getitem__(self, name):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = FakeCollection(name, self.latency)
+        return collection
+
+    def collections(self):
+        return dict(self._collections)
+
+    async def command(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return {'ok': 1.0}
+
+    async def watch(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=CHANGE_STREAM_UNSUPPORTED)
+
+
+class FakeMongoClient:
+    """Client MongoDB en mémoire ; latency est l'aller-retour simulé de chaque commande (secondes)"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._databases = {}
+        self.admin = FakeDatabase('admin', latency)
+
+    def __getitem__(self, name):
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = FakeDatabase(name, self.latency)
+        return database
+
+    async def close(self):
+        pass
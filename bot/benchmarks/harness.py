@@ -0,0 +1,278 @@
+"""Environnement commun des benchmarks et de la génération de charge
+
+build_environment() branche le bot (l'instance globale db, NotificationService,
+ReservationWatcher et les cogs, sans modification) sur la couche Discord
+simulée et sur MongoDB en mémoire (ou un vrai serveur local avec
+mongo_uri), puis remplit la base avec le volume demandé.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from benchmarks.fake_discord import FakeBot, FakeChannel, FakeGuild, FakeMember, FakeRest, FakeRole, snowflake
+from benchmarks.fake_mongo import FakeMongoClient
+from commands.admin import AdminCommands
+from commands.reservations import ReservationCommands
+from config import Config
+from database import db
+from events.reservation_events import ReservationEvents
+from services.notification_service import NotificationService
+from services.reminder_scheduler import ReminderScheduler
+from services.reservation_watcher import ReservationWatcher
+from utils.permissions import admin_verdicts
+
+logger = logging.getLogger(__name__)
+
+# Volumes nommés de réservations
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+# Base utilisée sur un vrai serveur (supprimée puis recréée à chaque exécution)
+BENCHMARK_DATABASE = 'bda_serv_benchmark'
+
+SEED_BATCH = 10_000
+
+
+def parse_size(value):
+    """'100k' -> 100000 ; accepte aussi un nombre"""
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round((len(sorted_values) - 1) * percent / 100)))
+    return sorted_values[index]
+
+
+class Environment:
+    """Bot branché sur les doublures : db, rest, bot, channel, admins, services et cogs"""
+
+    def __init__(self, rest, guild, channel, bot, admins, games, users):
+        self.rest = rest
+        self.guild = guild
+        self.channel = channel
+        self.bot = bot
+        self.admins = admins
+        self.games = games
+        self.users = users
+        self.notification_service = None
+        self.reminder_scheduler = None
+        self.watcher = None
+        self.cogs = {}
+
+    def db_stats(self):
+        """Compteurs des collections en mémoire (vide avec un vrai serveur)"""
+        if not hasattr(db.db, 'collections'):
+            return {'commands': 0, 'examined': 0, 'returned': 0}
+        totals = {'commands': 0, 'examined': 0, 'returned': 0}
+        for collection in db.db.collections().values():
+            for key in totals:
+                totals[key] += collection.stats[key]
+        return totals
+
+
+def new_reservation(games, users, start=None, status='pending', now=None):
+    """Document de réservation tel que le crée POST /api/reservations"""
+    now = now or datetime.utcnow()
+    start = start or now + timedelta(days=random.randint(1, 30), hours=random.randint(8, 20))
+    return {
+        '_id': ObjectId(),
+        'gameId': random.choice(games)['_id'],
+        'userId': random.choice(users)['_id'],
+        'startDate': start,
+        'endDate': start + timedelta(hours=random.choice((1, 2, 3))),
+        'status': status,
+        'createdAt': now
+    }
+
+
+async def seed(count, pending_ratio=0.02, game_count=200, user_count=None):
+    """Remplit la base : jeux, utilisateurs et count réservations sur ~15 mois
+
+    Les réservations passées sont approuvées ou rejetées et déjà notifiées
+    (discord_message_id), une fraction pending_ratio reste en attente.
+    """
+    user_count = user_count or max(10, min(count // 10, 50_000))
+    games = [
+        {'_id': ObjectId(), 'name': f"Jeu {i}", 'players': f"{2 + i % 3}-{4 + i % 5}", 'duration': f"{30 + i % 4 * 30} min", 'age': f"{8 + i % 3 * 2}+"}
+        for i in range(game_count)
+    ]
+    users = [{'_id': ObjectId(), 'username': f"membre{i}"} for i in range(user_count)]
+    await db.get_collection('games').insert_many(games)
+    for start in range(0, len(users), SEED_BATCH):
+        await db.get_collection('users').insert_many(users[start:start + SEED_BATCH])
+
+    now = datetime.utcnow().replace(microsecond=0)
+    reservations = db.get_collection('reservations')
+    batch = []
+    for i in range(count):
+        start = now + timedelta(minutes=random.randint(-400 * 24 * 60, 60 * 24 * 60))
+        if random.random() < pending_ratio:
+            status, message_id = 'pending', str(snowflake())
+        else:
+            status, message_id = random.choice(('approved', 'approved', 'rejected')), str(snowflake())
+        reservation = new_reservation(games, users, start, status, now=start - timedelta(days=random.randint(1, 20)))
+        reservation['discord_message_id'] = message_id
+        batch.append(reservation)
+        if len(batch) >= SEED_BATCH:
+            await reservations.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await reservations.insert_many(batch, ordered=False)
+    return games, users
+
+
+async def build_environment(size, mongo_uri=None, mongo_latency=0.001, rest_latency=0.05, rest_jitter=0.3,
+                            random_429=0.0, rate_limits=None, pending_ratio=0.02, admin_count=5):
+    """Construit l'environnement simulé et remplit la base"""
+    # MongoDB : serveur local dédié, ou en mémoire
+    if mongo_uri:
+        Config.MONGODB_URI = mongo_uri
+        Config.DATABASE_NAME = BENCHMARK_DATABASE
+        await db.connect()
+        await db.client.drop_database(BENCHMARK_DATABASE)
+    else:
+        db.client = FakeMongoClient(mongo_latency)
+        db.db = db.client[BENCHMARK_DATABASE]
+    for cache in db.caches.values():
+        cache.clear()
+    admin_verdicts.clear()
+
+    await db.ensure_indexes()
+    games, users = await seed(size, pending_ratio)
+    await db.warm_message_index()
+
+    # Discord : un serveur, le salon des notifications et quelques admins
+    rest = FakeRest(rest_latency, rest_jitter, rate_limits, random_429)
+    guild = FakeGuild(snowflake(), rest)
+    Config.CHANNEL_ID = Config.CHANNEL_ID or snowflake()
+    Config.ADMIN_ROLE_ID = Config.ADMIN_ROLE_ID or snowflake()
+    admin_role = FakeRole(Config.ADMIN_ROLE_ID, "admin")
+    admins = [guild.add_member(FakeMember(snowflake(), f"admin{i}", roles=[admin_role])) for i in range(admin_count)]
+    bot_user = guild.add_member(FakeMember(snowflake(), Config.BOT_NAME, bot=True))
+    channel = FakeChannel(Config.CHANNEL_ID, guild, rest, author=bot_user)
+    bot = FakeBot(guild, channel, bot_user)
+
+    environment = Environment(rest, guild, channel, bot, admins, games, users)
+    environment.notification_service = NotificationService(bot)
+    bot.notification_service = environment.notification_service
+    await environment.notification_service.initialize()
+    environment.reminder_scheduler = ReminderScheduler(environment.notification_service)
+    environment.watcher = ReservationWatcher(environment.notification_service, environment.reminder_scheduler)
+    environment.cogs = {
+        'admin': AdminCommands(bot),
+        'reservations': ReservationCommands(bot),
+        'events': ReservationEvents(bot)
+    }
+    return environment
+
+
+async def close_environment(environment):
+    environment.watcher.stop()
+    environment.reminder_scheduler.stop()
+    await environment.notification_service.stop()
+    await db.close()
+
+
+class Result:
+    """Mesures d'un scénario : durées par opération, débit et compteurs"""
+
+    def __init__(self, name, durations, elapsed, errors=0, rest_calls=0, rate_limited=0, db_examined=0):
+        self.name = name
+        self.durations = sorted(durations)
+        self.elapsed = elapsed
+        self.errors = errors
+        self.rest_calls = rest_calls
+        self.rate_limited = rate_limited
+        self.db_examined = db_examined
+
+    def summary(self):
+        count = len(self.durations)
+        return {
+            'operations': count,
+            'errors': self.errors,
+            'throughput': count / self.elapsed if self.elapsed else 0.0,
+            'p50_ms': percentile(self.durations, 50) * 1000,
+            'p90_ms': percentile(self.durations, 90) * 1000,
+            'p99_ms': percentile(self.durations, 99) * 1000,
+            'max_ms': (self.durations[-1] if self.durations else 0.0) * 1000,
+            'rest_calls_per_op': self.rest_calls / count if count else 0.0,
+            'rate_limited': self.rate_limited,
+            'db_examined_per_op': self.db_examined / count if count else 0.0
+        }
+
+
+async def measure(name, environment, operation, count, concurrency=1):
+    """Exécute operation(i) count fois, concurrency à la fois, et mesure chaque appel"""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    errors = 0
+    rest_before = sum(environment.rest.calls.values())
+    limited_before = sum(environment.rest.rate_limited.values())
+    examined_before = environment.db_stats()['examined']
+
+    async def run(index):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation(index)
+            except Exception as e:
+                errors += 1
+                logger.error(f"{name}: opération {index} en erreur: {e!r}")
+                return
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(index) for index in range(count)))
+    elapsed = time.perf_counter() - started
+
+    return Result(
+        name, durations, elapsed, errors,
+        rest_calls=sum(environment.rest.calls.values()) - rest_before,
+        rate_limited=sum(environment.rest.rate_limited.values()) - limited_before,
+        db_examined=environment.db_stats()['examined'] - examined_before
+    )
+
+
+def print_report(results, title):
+    print(title)
+    print(f"  {'scénario':<24} {'ops':>6} {'err':>4} {'ops/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'REST/op':>8} {'429':>5} {'docs/op':>9}")
+    for result in results:
+        s = result.summary()
+        print(
+            f"  {result.name:<24} {s['operations']:>6} {s['errors']:>4} {s['throughput']:>9.1f} {s['p50_ms']:>9.1f} {s['p90_ms']:>9.1f} "
+            f"{s['p99_ms']:>9.1f} {s['max_ms']:>9.1f} {s['rest_calls_per_op']:>8.1f} {s['rate_limited']:>5} {s['db_examined_per_op']:>9.1f}"
+        )
+
+
+def save_report(results, path, parameters, totals=None):
+    report = {'parameters': parameters, 'results': {result.name: result.summary() for result in results}}
+    if totals is not None:
+        report['totals'] = totals
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+
+def compare_with_baseline(results, path, tolerance):
+    """Compare le p99 et les documents examinés à un rapport précédent ; retourne les régressions"""
+    with open(path, encoding='utf-8') as file:
+        baseline = json.load(file)['results']
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        current = result.summary()
+        for key in ('p99_ms', 'db_examined_per_op'):
+            if previous[key] and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{result.name}: {key} {previous[key]:.1f} -> {current[key]:.1f}")
+    return regressions
@@ -0,0 +1,267 @@
+"""Générateur de charge de bout en bout
+
+Rejoue l'arrivée de réservations telle que POST /api/reservations les crée
+(processus de Poisson au débit --rate, plus des rafales --burst, comme à
+l'ouverture des inscriptions d'un événement) et la modération qui suit :
+plusieurs admins simulés traitent les notifications par réaction ✅/❌ ou par
+bouton, parfois tous en même temps sur la même réservation (--storm).
+
+La détection (ReservationWatcher), les notifications (NotificationService et
+sa file d'envoi) et la modération (cog des réactions, boutons persistants)
+sont ceux du bot, sans modification, sur la couche Discord simulée et la base
+en mémoire (ou --mongo-uri).
+
+Mesures :
+- time_to_notify : insertion -> message de notification envoyé
+- time_to_moderate : action de l'admin -> décision traitée par le bot
+- end_to_end : insertion -> décision traitée (réflexion de l'admin comprise)
+
+Usage : python -m benchmarks.load [--size 10k] [--rate 5] [--duration 60] [--admins 5]
+        [--burst 200 --burst-at 10] [--storm 0.1] [--json charge.json]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import re
+import time
+
+from bson import ObjectId
+
+from benchmarks.fake_discord import FakeInteraction, FakeReactionPayload, reservation_id_of
+from benchmarks.harness import (
+    Result, build_environment, close_environment, new_reservation, parse_size, print_report, save_report
+)
+from config import Config
+from database import db
+from views.reservation_controls import CUSTOM_ID_PATTERN, ReservationButton
+
+logger = logging.getLogger(__name__)
+
+# Intervalle d'échantillonnage de la file d'envoi et des réservations en attente de notification
+SAMPLE_INTERVAL = 0.5
+
+
+class LoadGenerator:
+    """Injecte les réservations, fait modérer les notifications et collecte les mesures"""
+
+    def __init__(self, env, think_time=2.0, reaction_ratio=0.5, reject_ratio=0.2, storm=0.1):
+        self.env = env
+        self.think_time = think_time
+        self.reaction_ratio = reaction_ratio
+        self.reject_ratio = reject_ratio
+        self.storm = storm
+        self.inserted = {}
+        self.notified = {}
+        self.moderated = {}
+        self.time_to_moderate = []
+        self.queue = asyncio.Queue()
+        self.counters = {'reactions': 0, 'clicks': 0, 'storms': 0, 'conflicts': 0, 'ignored': 0, 'errors': 0}
+        self.peak_dispatcher_queue = 0
+        self.peak_unnotified = 0
+
+    # Arrivées
+
+    async def inject(self, rate, duration, burst=0, burst_at=0.0):
+        """Insère des réservations au débit moyen rate pendant duration secondes"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        burst_task = None
+        if burst:
+            burst_task = asyncio.create_task(self._burst(burst, started + burst_at))
+
+        if rate > 0:
+            next_arrival = started + random.expovariate(rate)
+            while next_arrival < started + duration:
+                await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+                await self._insert()
+                next_arrival += random.expovariate(rate)
+        if burst_task:
+            await burst_task
+
+    async def _burst(self, count, at):
+        await asyncio.sleep(max(0.0, at - asyncio.get_running_loop().time()))
+        logger.warning(f"Rafale de {count} réservations")
+        await asyncio.gather(*(self._insert() for _ in range(count)))
+
+    async def _insert(self):
+        reservation = new_reservation(self.env.games, self.env.users)
+        self.inserted[str(reservation['_id'])] = time.perf_counter()
+        await db.get_collection('reservations').insert_one(reservation)
+
+    # Notifications
+
+    def on_message(self, kind, message):
+        """Repère les notifications envoyées et les confie aux admins"""
+        if kind != 'send':
+            return
+        now = time.perf_counter()
+        for embed in message.embeds:
+            reservation_id = reservation_id_of(embed)
+            if reservation_id in self.inserted and reservation_id not in self.notified:
+                self.notified[reservation_id] = now
+                self.queue.put_nowait((reservation_id, message))
+
+    async def sample(self):
+        while True:
+            self.peak_dispatcher_queue = max(self.peak_dispatcher_queue, self.env.notification_service.dispatcher.queue_depth)
+            self.peak_unnotified = max(self.peak_unnotified, len(self.inserted) - len(self.notified))
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    # Modération
+
+    async def admin(self, member):
+        """Un admin : prend la notification suivante, réfléchit, puis décide"""
+        while True:
+            reservation_id, message = await self.queue.get()
+            try:
+                await asyncio.sleep(random.expovariate(1 / self.think_time) if self.think_time else 0)
+                if random.random() < self.storm:
+                    # Tous les admins décident en même temps, pas forcément dans le même sens
+                    self.counters['storms'] += 1
+                    await asyncio.gather(*(self.moderate(other, reservation_id, message) for other in self.env.admins))
+                else:
+                    await self.moderate(member, reservation_id, message)
+            finally:
+                self.queue.task_done()
+
+    async def moderate(self, member, reservation_id, message):
+        decision = 'reject' if random.random() < self.reject_ratio else 'approve'
+        # Les réactions ne modèrent que les notifications individuelles
+        by_reaction = len(message.embeds) == 1 and random.random() < self.reaction_ratio
+        started = time.perf_counter()
+        try:
+            if by_reaction:
+                self.counters['reactions'] += 1
+                emoji = Config.EMOJIS['APPROVE' if decision == 'approve' else 'REJECT']
+                await self.env.cogs['events'].on_raw_reaction_add(FakeReactionPayload(message, member, emoji))
+            else:
+                self.counters['clicks'] += 1
+                await self.click(member, message, decision, reservation_id)
+        except Exception as e:
+            self.counters['errors'] += 1
+            logger.error(f"Modération de {reservation_id} en erreur: {e!r}")
+            return
+        finished = time.perf_counter()
+        self.time_to_moderate.append(finished - started)
+
+        # Seule la première décision compte, les suivantes sont des conflits
+        reservation = await db.get_collection('reservations').find_one({'_id': ObjectId(reservation_id)}, {'status': 1})
+        if not reservation or reservation['status'] == 'pending':
+            self.counters['ignored'] += 1
+        elif reservation_id in self.moderated:
+            self.counters['conflicts'] += 1
+        else:
+            self.moderated[reservation_id] = finished
+
+    async def click(self, member, message, decision, reservation_id):
+        """Clic sur le bouton de la réservation, résolu depuis son custom_id comme le fait discord.py"""
+        for row in message.components:
+            for component in row.children:
+                match = re.fullmatch(CUSTOM_ID_PATTERN, component.custom_id or '')
+                if match and match['action'] == decision and match['id'] == reservation_id:
+                    interaction = FakeInteraction(self.env.bot, member, message)
+                    button = await ReservationButton.from_custom_id(interaction, component, match)
+                    await button.callback(interaction)
+                    return
+        raise RuntimeError(f"Bouton {decision} introuvable pour {reservation_id}")
+
+    # Rapport
+
+    def results(self, elapsed):
+        time_to_notify = [self.notified[i] - self.inserted[i] for i in self.notified]
+        end_to_end = [self.moderated[i] - self.inserted[i] for i in self.moderated]
+        return [
+            Result('time_to_notify', time_to_notify, elapsed, len(self.inserted) - len(self.notified)),
+            Result('time_to_moderate', self.time_to_moderate, elapsed, self.counters['errors']),
+            Result('end_to_end', end_to_end, elapsed, len(self.notified) - len(self.moderated))
+        ]
+
+
+async def run(args):
+    Config.RESERVATION_POLL_INTERVAL = args.poll_interval
+    if args.coalesce_window is not None:
+        Config.NOTIFICATION_COALESCE_WINDOW = args.coalesce_window
+
+    size = parse_size(args.size)
+    env = await build_environment(
+        size, mongo_uri=args.mongo_uri, mongo_latency=args.mongo_latency,
+        rest_latency=args.rest_latency, random_429=args.random_429,
+        rate_limits={} if args.no_rate_limits else None, admin_count=args.admins
+    )
+    print(f"Base remplie avec {size} réservations, {args.admins} admins")
+
+    generator = LoadGenerator(env, args.think_time, args.reaction_ratio, args.reject_ratio, args.storm)
+    env.channel.add_listener(generator.on_message)
+    env.watcher.start()
+    workers = [asyncio.create_task(generator.admin(member)) for member in env.admins]
+    sampler = asyncio.create_task(generator.sample())
+
+    started = time.perf_counter()
+    try:
+        await generator.inject(args.rate, args.duration, args.burst, args.burst_at)
+        # Laisser le bot et les admins écouler la file
+        deadline = time.perf_counter() + args.drain_timeout
+        while time.perf_counter() < deadline and len(generator.moderated) < len(generator.inserted):
+            await asyncio.sleep(SAMPLE_INTERVAL)
+    finally:
+        elapsed = time.perf_counter() - started
+        for task in workers + [sampler]:
+            task.cancel()
+        env.channel.remove_listener(generator.on_message)
+        await close_environment(env)
+
+    results = generator.results(elapsed)
+    print_report(results, f"Charge ({args.size}, {len(generator.inserted)} réservations en {elapsed:.0f} s, {args.admins} admins)")
+    totals = {
+        'injected': len(generator.inserted),
+        'notified': len(generator.notified),
+        'moderated': len(generator.moderated),
+        **generator.counters,
+        'rest_calls': sum(env.rest.calls.values()),
+        'rate_limited': sum(env.rest.rate_limited.values()),
+        'peak_dispatcher_queue': generator.peak_dispatcher_queue,
+        'peak_unnotified': generator.peak_unnotified
+    }
+    print("  " + ", ".join(f"{key}={value}" for key, value in totals.items()))
+    for route, count in env.rest.rate_limited.most_common():
+        print(f"  429 sur {route}: {count}")
+    if args.json:
+        save_report(results, args.json, {key: value for key, value in vars(args).items() if key not in ('json', 'verbose')}, totals)
+        print(f"Rapport enregistré dans {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge de bout en bout : arrivées de réservations et modération")
+    parser.add_argument('--size', default='10k', help="Réservations déjà en base : 1k, 10k, 100k, 1M ou un nombre")
+    parser.add_argument('--rate', type=float, default=5.0, help="Arrivées par seconde (moyenne)")
+    parser.add_argument('--duration', type=float, default=60.0, help="Durée de l'injection (s)")
+    parser.add_argument('--burst', type=int, default=0, help="Réservations arrivant d'un coup")
+    parser.add_argument('--burst-at', type=float, default=0.0, help="Instant de la rafale depuis le début (s)")
+    parser.add_argument('--admins', type=int, default=5)
+    parser.add_argument('--think-time', type=float, default=2.0, help="Temps de réflexion moyen d'un admin (s)")
+    parser.add_argument('--reaction-ratio', type=float, default=0.5, help="Part des décisions par réaction plutôt que par bouton")
+    parser.add_argument('--reject-ratio', type=float, default=0.2)
+    parser.add_argument('--storm', type=float, default=0.1, help="Probabilité que tous les admins décident en même temps")
+    parser.add_argument('--drain-timeout', type=float, default=120.0, help="Attente maximale de la fin de la modération (s)")
+    parser.add_argument('--mongo-uri', help="Serveur MongoDB local à utiliser à la place de la base en mémoire")
+    parser.add_argument('--mongo-latency', type=float, default=0.001)
+    parser.add_argument('--rest-latency', type=float, default=0.05)
+    parser.add_argument('--random-429', type=float, default=0.0)
+    parser.add_argument('--no-rate-limits', action='store_true')
+    parser.add_argument('--poll-interval', type=float, default=Config.RESERVATION_POLL_INTERVAL, help="RESERVATION_POLL_INTERVAL (s)")
+    parser.add_argument('--coalesce-window', type=float, help="NOTIFICATION_COALESCE_WINDOW (s)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--json', help="Enregistrer le rapport dans ce fichier")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.seed is not None:
+        random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
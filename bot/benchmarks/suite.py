@@ -0,0 +1,236 @@
+"""Suite de benchmarks des chemins critiques du bot
+
+Mesure, sur la couche Discord simulée et une base remplie au volume demandé :
+- new_reservations : insertion d'une réservation -> détection -> notification envoyée
+- reaction_moderation : réaction ✅/❌ d'un admin -> décision enregistrée et message mis à jour
+- stats : commande /stats
+- reservations_list : commande /reservations list (première page)
+- reservations_next : bouton Suivant de la liste paginée
+- daily_summary : résumé quotidien
+
+Les services et les cogs sont ceux du bot, sans modification. Avec --baseline,
+le p99 et les documents examinés par opération sont comparés à un rapport
+précédent (--json) et le code de sortie vaut 1 en cas de régression.
+
+Usage : python -m benchmarks.suite [--size 1k|10k|100k|1M] [--scenarios stats,reservations_list]
+        [--count 50] [--concurrency 5] [--json rapport.json] [--baseline rapport.json]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+
+from benchmarks.fake_discord import FakeInteraction, FakeReactionPayload, reservation_id_of
+from benchmarks.harness import (
+    build_environment, close_environment, compare_with_baseline, measure,
+    new_reservation, parse_size, print_report, save_report
+)
+from config import Config
+from database import db
+
+# Délai maximal d'attente d'une notification avant de compter l'opération en erreur
+NOTIFICATION_TIMEOUT = 30
+
+
+def expect_embed(interaction):
+    """Dernier embed répondu à l'interaction ; erreur si absent ou embed d'erreur"""
+    embeds = [embed for response in interaction.responses for embed in response.embeds]
+    if not embeds:
+        raise RuntimeError("Aucune réponse à l'interaction")
+    if (embeds[-1].title or '').startswith('❌'):
+        raise RuntimeError(f"Réponse d'erreur: {embeds[-1].description}")
+    return embeds[-1]
+
+
+async def new_reservations(env, count, concurrency):
+    """Temps entre l'insertion d'une réservation et l'envoi de sa notification"""
+    loop = asyncio.get_running_loop()
+    waiting = {}
+
+    def on_message(kind, message):
+        if kind != 'send':
+            return
+        for embed in message.embeds:
+            future = waiting.pop(reservation_id_of(embed), None)
+            if future and not future.done():
+                future.set_result(message)
+
+    async def operation(index):
+        reservation = new_reservation(env.games, env.users)
+        future = waiting[str(reservation['_id'])] = loop.create_future()
+        await db.get_collection('reservations').insert_one(reservation)
+        await asyncio.wait_for(future, NOTIFICATION_TIMEOUT)
+
+    env.channel.add_listener(on_message)
+    env.watcher.start()
+    try:
+        # Laisser la surveillance démarrer (bascule sur le poll sans replica set)
+        await asyncio.sleep(Config.RESERVATION_POLL_INTERVAL * 2)
+        return await measure('new_reservations', env, operation, count, concurrency)
+    finally:
+        env.watcher.stop()
+        env.channel.remove_listener(on_message)
+
+
+async def reaction_moderation(env, count, concurrency):
+    """Réactions ✅/❌ d'admins sur des notifications individuelles"""
+    events = env.cogs['events']
+    reservations = db.get_collection('reservations')
+    documents = [new_reservation(env.games, env.users) for _ in range(count)]
+    await reservations.insert_many(documents)
+
+    # Préparation hors mesure : une notification individuelle par réservation
+    coalesce_window = Config.NOTIFICATION_COALESCE_WINDOW
+    Config.NOTIFICATION_COALESCE_WINDOW = 0
+    try:
+        with env.rest.suspended():
+            notified = await asyncio.gather(*(
+                env.notification_service.claim_and_notify(document['_id']) for document in documents
+            ))
+    finally:
+        Config.NOTIFICATION_COALESCE_WINDOW = coalesce_window
+    messages = [message for _, message in notified if message is not None]
+
+    async def operation(index):
+        message = messages[index]
+        emoji = Config.EMOJIS['APPROVE'] if index % 2 == 0 else Config.EMOJIS['REJECT']
+        await events.on_raw_reaction_add(FakeReactionPayload(message, random.choice(env.admins), emoji))
+
+    return await measure('reaction_moderation', env, operation, len(messages), concurrency)
+
+
+async def stats(env, count, concurrency):
+    cog = env.cogs['admin']
+
+    async def operation(index):
+        interaction = FakeInteraction(env.bot, random.choice(env.admins))
+        await cog.stats.callback(cog, interaction)
+        expect_embed(interaction)
+
+    return await measure('stats', env, operation, count, concurrency)
+
+
+async def reservations_list(env, count, concurrency):
+    cog = env.cogs['reservations']
+
+    async def operation(index):
+        interaction = FakeInteraction(env.bot, random.choice(env.admins))
+        await cog.reservations.callback(cog, interaction, 'list')
+        expect_embed(interaction)
+
+    return await measure('reservations_list', env, operation, count, concurrency)
+
+
+async def reservations_next(env, count, concurrency):
+    """Pages successives de la liste, en repartant de la première page en fin de liste"""
+    cog = env.cogs['reservations']
+    admin = env.admins[0]
+    interaction = FakeInteraction(env.bot, admin)
+    await cog.reservations.callback(cog, interaction, 'list')
+    first_page = interaction.responses[-1].view
+    message = await env.channel.send(embed=expect_embed(interaction), view=first_page)
+    views = [first_page]
+
+    async def operation(index):
+        view = views[-1] if not views[-1].next_page.disabled else first_page
+        interaction = FakeInteraction(env.bot, admin, message)
+        await view.next_page.callback(interaction)
+        expect_embed(interaction)
+        views.append(interaction.responses[-1].view)
+
+    # Une page à la fois : chaque clic part de la page affichée
+    return await measure('reservations_next', env, operation, count, concurrency=1)
+
+
+async def daily_summary(env, count, concurrency):
+    async def operation(index):
+        if not await env.notification_service.send_daily_summary():
+            raise RuntimeError("Résumé quotidien non envoyé")
+
+    return await measure('daily_summary', env, operation, count, concurrency)
+
+
+SCENARIOS = {
+    'new_reservations': new_reservations,
+    'reaction_moderation': reaction_moderation,
+    'stats': stats,
+    'reservations_list': reservations_list,
+    'reservations_next': reservations_next,
+    'daily_summary': daily_summary
+}
+
+
+async def run(args):
+    names = list(SCENARIOS) if args.scenarios == 'all' else args.scenarios.split(',')
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Scénario(s) inconnu(s): {', '.join(unknown)} (disponibles: {', '.join(SCENARIOS)})")
+
+    Config.RESERVATION_POLL_INTERVAL = args.poll_interval
+    if args.coalesce_window is not None:
+        Config.NOTIFICATION_COALESCE_WINDOW = args.coalesce_window
+
+    size = parse_size(args.size)
+    started = time.perf_counter()
+    env = await build_environment(
+        size, mongo_uri=args.mongo_uri, mongo_latency=args.mongo_latency,
+        rest_latency=args.rest_latency, random_429=args.random_429,
+        rate_limits={} if args.no_rate_limits else None
+    )
+    print(f"Base remplie avec {size} réservations en {time.perf_counter() - started:.1f} s")
+
+    results = []
+    try:
+        for name in names:
+            results.append(await SCENARIOS[name](env, args.count, args.concurrency))
+    finally:
+        await close_environment(env)
+
+    print_report(results, f"Benchmarks ({args.size}, {args.count} opérations, concurrence {args.concurrency})")
+    parameters = {key: value for key, value in vars(args).items() if key not in ('json', 'baseline', 'verbose')}
+    if args.json:
+        save_report(results, args.json, parameters)
+        print(f"Rapport enregistré dans {args.json}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"Régressions au-delà de {args.tolerance:.0%} :")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"Aucune régression par rapport à {args.baseline}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques du bot")
+    parser.add_argument('--size', default='1k', help="Réservations en base : 1k, 10k, 100k, 1M ou un nombre")
+    parser.add_argument('--scenarios', default='all', help=f"Liste séparée par des virgules parmi : {', '.join(SCENARIOS)}")
+    parser.add_argument('--count', type=int, default=50, help="Opérations par scénario")
+    parser.add_argument('--concurrency', type=int, default=5)
+    parser.add_argument('--mongo-uri', help="Serveur MongoDB local à utiliser à la place de la base en mémoire")
+    parser.add_argument('--mongo-latency', type=float, default=0.001, help="Latence simulée d'une commande MongoDB (s)")
+    parser.add_argument('--rest-latency', type=float, default=0.05, help="Latence médiane simulée d'une requête REST (s)")
+    parser.add_argument('--random-429', type=float, default=0.0, help="Probabilité d'un 429 inattendu par requête")
+    parser.add_argument('--no-rate-limits', action='store_true', help="Désactiver les limites de débit par route")
+    parser.add_argument('--poll-interval', type=float, default=0.1, help="RESERVATION_POLL_INTERVAL pendant le benchmark (s)")
+    parser.add_argument('--coalesce-window', type=float, help="NOTIFICATION_COALESCE_WINDOW pendant le benchmark (s)")
+    parser.add_argument('--seed', type=int, help="Graine aléatoire, pour des exécutions reproductibles")
+    parser.add_argument('--json', help="Enregistrer le rapport dans ce fichier")
+    parser.add_argument('--baseline', help="Rapport de référence à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Dégradation tolérée par rapport à la référence")
+    parser.add_argument('--verbose', action='store_true', help="Afficher les logs du bot")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.seed is not None:
+        random.seed(args.seed)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
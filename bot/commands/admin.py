@@ -5,17 +5,24 @@ import logging
 from database import db
 from utils.embeds import EmbedBuilder
 from utils.permissions import check_admin_permission, send_permission_error
+from services.statistics import get_reservation_stats, approval_rate
+from utils.profiling import profiled, sample_stacks, collapsed, top_frames
 from config import Config
 from datetime import datetime
 import asyncio
+import io
+import threading
 
 logger = logging.getLogger(__name__)
 
 class AdminCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Un seul profilage à la fois
+        self.profiling = False
     
     @app_commands.command(name="stats", description="Afficher les statistiques des réservations")
+    @profiled('/stats')
     async def stats(self, interaction: discord.Interaction):
         """Affiche les statistiques des réservations"""
         # Vérifier les permissions
@@ -27,21 +34,8 @@ class AdminCommands(commands.Cog):
         await interaction.response.defer()
         
         try:
-            # Récupérer toutes les réservations
-            all_reservations = db.get_reservations()
-            
-            # Compter par statut
-            stats = {
-                'pending': 0,
-                'approved': 0,
-                'rejected': 0,
-                'total': len(all_reservations)
-            }
-            
-            for reservation in all_reservations:
-                status = reservation.get('status', 'unknown')
-                if status in stats:
-                    stats[status] += 1
+            # Compter les réservations par statut
+            stats = await get_reservation_stats()
             
             # Créer l'embed
             embed = discord.Embed(
@@ -75,11 +69,11 @@ class AdminCommands(commands.Cog):
             )
             
             # Calculer le pourcentage d'approbation
-            if stats['total'] > 0:
-                approval_rate = (stats['approved'] / stats['total']) * 100
+            rate = approval_rate(stats)
+            if rate is not None:
                 embed.add_field(
                     name="📊 Taux d'approbation",
-                    value=f"**{approval_rate:.1f}%**",
+                    value=f"**{rate:.1f}%**",
                     inline=True
                 )
             
@@ -91,6 +85,7 @@ class AdminCommands(commands.Cog):
             await interaction.followup.send(embed=embed)
     
     @app_commands.command(name="sync", description="Synchroniser les commandes slash")
+    @profiled('/sync')
     async def sync(self, interaction: discord.Interaction):
         """Synchronise les commandes slash avec Discord"""
         # Vérifier les permissions
@@ -117,6 +112,7 @@ class AdminCommands(commands.Cog):
             await interaction.followup.send(embed=embed)
     
     @app_commands.command(name="ping", description="Vérifier la latence du bot")
+    @profiled('/ping')
     async def ping(self, interaction: discord.Interaction):
         """Vérifie la latence du bot"""
         latency = round(self.bot.latency * 1000)
@@ -130,6 +126,7 @@ class AdminCommands(commands.Cog):
         await interaction.response.send_message(embed=embed)
     
     @app_commands.command(name="status", description="Afficher le statut du bot")
+    @profiled('/status')
     async def status(self, interaction: discord.Interaction):
         """Affiche le statut du bot"""
         # Vérifier les permissions
@@ -145,7 +142,7 @@ class AdminCommands(commands.Cog):
             db_status = "✅ Connecté"
             try:
                 if db.client:
-                    db.client.admin.command('ping')
+                    await db.client.admin.command('ping')
                 else:
                     db_status = "❌ Déconnecté"
             except:
@@ -190,14 +187,149 @@ class AdminCommands(commands.Cog):
                 inline=True
             )
             
+            # Efficacité des caches de référence
+            cache_lines = []
+            for name, cache_stats in db.cache_stats().items():
+                cache_lines.append(
+                    f"{name}: {cache_stats['size']}/{cache_stats['maxsize']} entrées, "
+                    f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0f}%)"
+                )
+            embed.add_field(
+                name="Cache",
+                value="\n".join(cache_lines),
+                inline=False
+            )
+
+            # Retard de la boucle d'événements et appels bloquants les plus coûteux
+            loop_monitor = getattr(self.bot, 'loop_monitor', None)
+            if loop_monitor:
+                lag = loop_monitor.lag_stats()
+                embed.add_field(
+                    name="Boucle d'événements",
+                    value=(
+                        f"Retard p50 **{lag['p50'] * 1000:.1f}ms**, p99 **{lag['p99'] * 1000:.1f}ms**, "
+                        f"max {lag['max'] * 1000:.0f}ms\n"
+                        f"{lag['stalls']} blocage(s) > {Config.LOOP_LAG_THRESHOLD_MS:.0f}ms depuis le démarrage"
+                    ),
+                    inline=False
+                )
+                offender_lines = []
+                for offender in loop_monitor.worst_offenders(5):
+                    task = f" ({offender['task']})" if offender['task'] else ""
+                    offender_lines.append(
+                        f"`{offender['location']}`{task} : {offender['count']}×, "
+                        f"total {offender['total'] * 1000:.0f}ms, max {offender['max'] * 1000:.0f}ms"
+                    )
+                if offender_lines:
+                    embed.add_field(
+                        name="Blocages les plus longs",
+                        value="\n".join(offender_lines)[:1024],
+                        inline=False
+                    )
+
             await interaction.followup.send(embed=embed)
             
         except Exception as e:
             logger.error(f"Erreur dans la commande status: {e}")
             embed = EmbedBuilder.create_error_embed("Erreur", f"Une erreur s'est produite: {str(e)}")
             await interaction.followup.send(embed=embed)
-    
+
+    @app_commands.command(name="db_top", description="Afficher les requêtes MongoDB les plus coûteuses depuis le démarrage")
+    @app_commands.describe(limit="Nombre de requêtes à afficher")
+    @profiled('/db_top')
+    async def db_top(self, interaction: discord.Interaction, limit: app_commands.Range[int, 1, 20] = 10):
+        """Affiche les formes de requêtes qui ont pris le plus de temps depuis le démarrage"""
+        # Vérifier les permissions
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
+
+        offenders = db.monitor.top_offenders(limit)
+
+        embed = discord.Embed(
+            title="🐢 Requêtes MongoDB les plus coûteuses",
+            description=f"Depuis le démarrage, seuil de lenteur : **{Config.MONGO_SLOW_QUERY_MS:.0f}ms**",
+            color=Config.COLORS['INFO'],
+            timestamp=discord.utils.utcnow()
+        )
+
+        if not offenders:
+            embed.description += "\n\nAucune requête enregistrée."
+
+        for index, stats in enumerate(offenders, 1):
+            average = stats['total'] / stats['count'] * 1000
+            lines = [
+                f"Total **{stats['total'] * 1000:.0f}ms** sur {stats['count']} appel(s), "
+                f"moy. {average:.1f}ms, max {stats['max'] * 1000:.0f}ms",
+                f"{stats['documents']} document(s), {stats['slow']} lente(s), {stats['errors']} erreur(s)"
+            ]
+            if stats['plan']:
+                lines.append(f"Plan : {' > '.join(stats['plan'])}")
+            if stats['shape']:
+                lines.append(f"`{stats['shape'][:300]}`")
+            embed.add_field(
+                name=f"{index}. {stats['collection']}.{stats['operation']}",
+                value="\n".join(lines)[:1024],
+                inline=False
+            )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="profile", description="Profiler le bot en cours d'exécution pendant quelques secondes")
+    @app_commands.describe(seconds="Durée de l'échantillonnage en secondes")
+    @profiled('/profile')
+    async def profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 120] = 30):
+        """Échantillonne la pile de la boucle d'événements et joint les piles repliées en fichier"""
+        # Vérifier les permissions
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
+
+        if self.profiling:
+            embed = EmbedBuilder.create_warning_embed("Profilage en cours", "Un profilage est déjà en cours, réessayez plus tard")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True)
+
+        self.profiling = True
+        try:
+            # L'échantillonneur tourne dans un thread et observe le thread de la boucle
+            stacks = await asyncio.to_thread(sample_stacks, threading.get_ident(), seconds)
+        except Exception as e:
+            logger.error(f"Erreur lors du profilage: {e}")
+            embed = EmbedBuilder.create_error_embed("Erreur", f"Une erreur s'est produite: {str(e)}")
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        finally:
+            self.profiling = False
+
+        samples = sum(stacks.values())
+        embed = discord.Embed(
+            title="🔬 Profil du bot",
+            description=(
+                f"**{samples}** échantillons sur {seconds}s.\n"
+                "Le fichier joint est au format « collapsed » (flamegraph.pl, speedscope)."
+            ),
+            color=Config.COLORS['INFO'],
+            timestamp=discord.utils.utcnow()
+        )
+        leaves = top_frames(stacks)
+        if leaves:
+            embed.add_field(
+                name="Temps propre le plus élevé",
+                value="\n".join(f"`{frame}` : {count * 100 / samples:.1f}%" for frame, count in leaves)[:1024],
+                inline=False
+            )
+
+        filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+        file = discord.File(io.BytesIO(collapsed(stacks).encode('utf-8')), filename=filename)
+        await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+
     @app_commands.command(name="test_notification", description="Envoie une notification de test avec réactions")
+    @profiled('/test_notification')
     async def test_notification(self, interaction: discord.Interaction):
         """Envoie une notification de test avec réactions"""
         # Vérifier les permissions
@@ -259,6 +391,7 @@ class AdminCommands(commands.Cog):
 
     
     @app_commands.command(name="notify_all", description="Envoie des notifications pour toutes les réservations en attente")
+    @profiled('/notify_all')
     async def notify_all(self, interaction: discord.Interaction):
         """Envoie des notifications pour toutes les réservations en attente"""
         # Vérifier les permissions
@@ -270,24 +403,25 @@ class AdminCommands(commands.Cog):
         await interaction.response.defer()
         
         try:
-            # Récupérer toutes les réservations en attente
-            pending_reservations = db.get_pending_reservations()
+            # Réservations en attente sans notification (requête indexée)
+            to_notify = await db.get_unnotified_reservations()
             
-            if not pending_reservations:
+            if not to_notify:
                 await interaction.followup.send("Aucune réservation en attente à notifier.")
                 return
             
-            # Envoyer une notification pour chaque réservation
-            count = 0
-            for reservation in pending_reservations:
-                if not reservation.get('discord_message_id'):
-                    # Envoyer la notification
-                    from services.notification_service import NotificationService
-                    notification_service = NotificationService(self.bot)
-                    await notification_service.initialize()
-                    await notification_service.send_reservation_notification(reservation['_id'])
-                    count += 1
-                    await asyncio.sleep(1)  # Attendre 1 seconde entre chaque notification
+            notification_service = getattr(self.bot, 'notification_service', None)
+            if not notification_service:
+                await interaction.followup.send("❌ Le service de notification n'est pas encore initialisé.")
+                return
+            
+            # Envoyer une notification pour chaque réservation, cadencées par la file d'envoi
+            # (la prise atomique évite les doublons avec la détection automatique)
+            results = await asyncio.gather(*(
+                notification_service.claim_and_notify(reservation['_id'])
+                for reservation in to_notify
+            ))
+            count = sum(1 for _, message in results if message is not None)
             
             await interaction.followup.send(f"✅ {count} notification(s) envoyée(s) pour les réservations en attente.")
             
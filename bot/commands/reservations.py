@@ -2,9 +2,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-from database import db
+from database import db, as_object_id
 from utils.embeds import EmbedBuilder
+from utils.reservation_view import ReservationView
 from utils.permissions import check_admin_permission, send_permission_error
+from services.moderation import parse_reservation_ids, resolve_game_reservations, apply_bulk_decision
+from views.reservation_controls import DECISIONS
+from views.reservation_list import build_reservation_list
+from utils.profiling import profiled
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -24,6 +29,7 @@ class ReservationCommands(commands.Cog):
         app_commands.Choice(name="reject", value="reject"),
         app_commands.Choice(name="info", value="info")
     ])
+    @profiled('/reservations')
     async def reservations(self, interaction: discord.Interaction, action: str, reservation_id: str | None = None):
         """Commande principale pour gérer les réservations"""
         # Vérifier les permissions
@@ -63,64 +69,81 @@ class ReservationCommands(commands.Cog):
             await interaction.followup.send(embed=embed)
     
     async def list_reservations(self, interaction: discord.Interaction):
-        """Liste toutes les réservations en attente"""
-        reservations = db.get_pending_reservations()
+        """Liste les réservations en attente, page par page"""
+        embed, view = await build_reservation_list()
+        await interaction.followup.send(embed=embed, view=view)
+    
+    @app_commands.command(name="bulk", description="Approuver ou rejeter plusieurs réservations en une fois")
+    @app_commands.describe(
+        action="Action à effectuer",
+        ids="IDs des réservations, séparés par des espaces ou des virgules",
+        game="Toutes les réservations en attente des jeux dont le nom contient ce texte"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="approve", value="approve"),
+        app_commands.Choice(name="reject", value="reject")
+    ])
+    @profiled('/bulk')
+    async def bulk(self, interaction: discord.Interaction, action: str, ids: str | None = None, game: str | None = None):
+        """Approuve ou rejette plusieurs réservations en une seule écriture"""
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
         
-        if not reservations:
-            embed = EmbedBuilder.create_warning_embed("Aucune réservation", "Aucune réservation en attente")
-            await interaction.followup.send(embed=embed)
+        if not interaction.channel_id == Config.CHANNEL_ID:
+            await send_permission_error(interaction, "Cette commande ne peut être utilisée que dans le salon des réservations")
             return
         
-        # Récupérer les informations des jeux et utilisateurs
-        for reservation in reservations:
-            if 'game' not in reservation and 'gameId' in reservation:
-                reservation['game'] = db.get_game_by_id(reservation['gameId'])
-            if 'user' not in reservation and 'userId' in reservation:
-                reservation['user'] = db.get_user_by_id(reservation['userId'])
+        if not ids and not game:
+            await interaction.response.send_message("❌ Indiquez des IDs de réservation ou un jeu", ephemeral=True)
+            return
         
-        embed = EmbedBuilder.create_reservation_list_embed(reservations)
-        await interaction.followup.send(embed=embed)
+        await interaction.response.defer()
+        
+        try:
+            reservation_ids, invalid = parse_reservation_ids(ids or "")
+            if game:
+                reservation_ids += [rid for rid in await resolve_game_reservations(game) if rid not in reservation_ids]
+            
+            outcomes = await apply_bulk_decision(
+                reservation_ids,
+                action,
+                interaction.user.name,
+                getattr(self.bot, 'notification_service', None)
+            )
+            
+            embed = EmbedBuilder.create_bulk_summary_embed(DECISIONS[action][0], outcomes, invalid)
+            await interaction.followup.send(embed=embed)
+        except Exception as e:
+            logger.error(f"Erreur dans la commande bulk: {e}")
+            embed = EmbedBuilder.create_error_embed("Erreur", f"Une erreur s'est produite: {str(e)}")
+            await interaction.followup.send(embed=embed)
     
     async def approve_reservation(self, interaction: discord.Interaction, reservation_id: str):
         """Approuve une réservation"""
-        # Récupérer la réservation
-        reservation = db.get_reservation_by_id(reservation_id)
-        if not reservation:
-            embed = EmbedBuilder.create_error_embed("Réservation introuvable", f"Aucune réservation trouvée avec l'ID: {reservation_id}")
-            await interaction.followup.send(embed=embed)
-            return
+        object_id = as_object_id(reservation_id)
         
-        if reservation['status'] != 'pending':
-            embed = EmbedBuilder.create_warning_embed("Action impossible", f"Cette réservation est déjà {reservation['status']}")
-            await interaction.followup.send(embed=embed)
+        # Mettre à jour le statut si la réservation est toujours en attente (une seule requête)
+        reservation = None
+        if object_id:
+            reservation = await db.transition_reservation_status(object_id, 'approved', f"Approuvé par {interaction.user.name}")
+        
+        if not reservation:
+            # Relire uniquement pour expliquer l'échec
+            current = await db.get_reservation_by_id(object_id) if object_id else None
+            await interaction.followup.send(embed=EmbedBuilder.create_transition_error_embed(reservation_id, current))
             return
         
-        # Mettre à jour le statut
-        success = db.update_reservation_status(reservation_id, 'approved', f"Approuvé par {interaction.user.name}")
+        embed = EmbedBuilder.create_success_embed("Réservation approuvée", f"La réservation {reservation_id} a été approuvée avec succès")
+        await interaction.followup.send(embed=embed)
         
-        if success:
-            embed = EmbedBuilder.create_success_embed("Réservation approuvée", f"La réservation {reservation_id} a été approuvée avec succès")
-            await interaction.followup.send(embed=embed)
-            
-            # Notifier l'utilisateur si possible
-            await self.notify_user_reservation_update(reservation, 'approved')
-        else:
-            embed = EmbedBuilder.create_error_embed("Erreur", "Impossible de mettre à jour la réservation")
-            await interaction.followup.send(embed=embed)
+        # Notifier l'utilisateur si possible
+        await self.notify_user_reservation_update(reservation, 'approved')
     
     async def reject_reservation(self, interaction: discord.Interaction, reservation_id: str):
         """Rejette une réservation"""
-        # Récupérer la réservation
-        reservation = db.get_reservation_by_id(reservation_id)
-        if not reservation:
-            embed = EmbedBuilder.create_error_embed("Réservation introuvable", f"Aucune réservation trouvée avec l'ID: {reservation_id}")
-            await interaction.followup.send(embed=embed)
-            return
-        
-        if reservation['status'] != 'pending':
-            embed = EmbedBuilder.create_warning_embed("Action impossible", f"Cette réservation est déjà {reservation['status']}")
-            await interaction.followup.send(embed=embed)
-            return
+        object_id = as_object_id(reservation_id)
         
         # Demander une raison pour le rejet
         embed = discord.Embed(
@@ -134,38 +157,37 @@ class ReservationCommands(commands.Cog):
         # Pour l'instant, on utilise une raison par défaut
         reason = f"Rejeté par {interaction.user.name}"
         
-        # Mettre à jour le statut
-        success = db.update_reservation_status(reservation_id, 'rejected', reason)
+        # Mettre à jour le statut si la réservation est toujours en attente (une seule requête)
+        reservation = None
+        if object_id:
+            reservation = await db.transition_reservation_status(object_id, 'rejected', reason)
         
-        if success:
-            embed = EmbedBuilder.create_success_embed("Réservation rejetée", f"La réservation {reservation_id} a été rejetée")
-            await interaction.followup.send(embed=embed)
-            
-            # Notifier l'utilisateur si possible
-            await self.notify_user_reservation_update(reservation, 'rejected', reason)
-        else:
-            embed = EmbedBuilder.create_error_embed("Erreur", "Impossible de mettre à jour la réservation")
-            await interaction.followup.send(embed=embed)
+        if not reservation:
+            # Relire uniquement pour expliquer l'échec
+            current = await db.get_reservation_by_id(object_id) if object_id else None
+            await interaction.followup.send(embed=EmbedBuilder.create_transition_error_embed(reservation_id, current))
+            return
+        
+        embed = EmbedBuilder.create_success_embed("Réservation rejetée", f"La réservation {reservation_id} a été rejetée")
+        await interaction.followup.send(embed=embed)
+        
+        # Notifier l'utilisateur si possible
+        await self.notify_user_reservation_update(reservation, 'rejected', reason)
     
     async def info_reservation(self, interaction: discord.Interaction, reservation_id: str):
         """Affiche les détails d'une réservation"""
         # Récupérer la réservation
-        reservation = db.get_reservation_by_id(reservation_id)
+        object_id = as_object_id(reservation_id)
+        reservation = await db.get_reservation_by_id(object_id) if object_id else None
         if not reservation:
             embed = EmbedBuilder.create_error_embed("Réservation introuvable", f"Aucune réservation trouvée avec l'ID: {reservation_id}")
             await interaction.followup.send(embed=embed)
             return
         
         # Récupérer les informations du jeu et de l'utilisateur
-        game = None
-        user = None
-        
-        if 'gameId' in reservation:
-            game = db.get_game_by_id(reservation['gameId'])
-        if 'userId' in reservation:
-            user = db.get_user_by_id(reservation['userId'])
+        await db.hydrate_reservations([reservation])
         
-        embed = EmbedBuilder.create_reservation_detail_embed(reservation, game, user)
+        embed = EmbedBuilder.create_reservation_detail_embed(ReservationView.from_document(reservation))
         await interaction.followup.send(embed=embed)
     
     async def notify_user_reservation_update(self, reservation, status, reason=None):
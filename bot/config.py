@@ -1,4 +1,6 @@
 import os
+import socket
+import uuid
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement (optionnel, car Docker les fournit)
@@ -15,10 +17,83 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
     DATABASE_NAME = os.getenv('DATABASE_NAME', 'bda_serv')
     
+    # Pool de connexions MongoDB
+    MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 20))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 2))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 300000))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 10000))
+    
+    # Requêtes lentes : seuil de journalisation (ms) et capture de leur plan d'exécution
+    MONGO_SLOW_QUERY_MS = float(os.getenv('MONGO_SLOW_QUERY_MS', 100))
+    MONGO_EXPLAIN_SLOW_QUERIES = os.getenv('MONGO_EXPLAIN_SLOW_QUERIES', 'true').lower() == 'true'
+    
     # Configuration du bot
     BOT_PREFIX = os.getenv('BOT_PREFIX', '!')
     BOT_NAME = os.getenv('BOT_NAME', 'BDA Reservations Bot')
     
+    # Cache des jeux et utilisateurs (nombre d'entrées, durée de vie en secondes)
+    REFERENCE_CACHE_SIZE = int(os.getenv('REFERENCE_CACHE_SIZE', 2000))
+    REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', 600))
+    
+    # Messages de notification chargés au démarrage : réservations en attente et
+    # réservations créées depuis moins de MESSAGE_INDEX_WINDOW_DAYS jours (les autres
+    # sont chargés à la première réaction)
+    MESSAGE_INDEX_WINDOW_DAYS = float(os.getenv('MESSAGE_INDEX_WINDOW_DAYS', 7))
+    
+    # Cache des droits admin des membres (nombre d'entrées, durée de vie en secondes).
+    # Sans l'intent members, le bot ne voit pas les changements de rôles d'un membre :
+    # un verdict reste valable au plus ADMIN_CACHE_TTL secondes
+    ADMIN_CACHE_SIZE = int(os.getenv('ADMIN_CACHE_SIZE', 500))
+    ADMIN_CACHE_TTL = float(os.getenv('ADMIN_CACHE_TTL', 300))
+    
+    # Rappels des réservations en attente : premier rappel après REMINDER_DELAY_HOURS
+    # d'attente, puis toutes les REMINDER_INTERVAL_HOURS
+    REMINDER_DELAY_HOURS = float(os.getenv('REMINDER_DELAY_HOURS', 24))
+    REMINDER_INTERVAL_HOURS = float(os.getenv('REMINDER_INTERVAL_HOURS', 24))
+    # Regrouper les rappels échus dans quelques messages plutôt qu'un message par réservation
+    REMINDER_DIGEST = os.getenv('REMINDER_DIGEST', 'true').lower() == 'true'
+    
+    # Nombre d'appels REST Discord exécutés en parallèle par la file d'envoi
+    DISCORD_DISPATCH_CONCURRENCY = int(os.getenv('DISCORD_DISPATCH_CONCURRENCY', 4))
+    
+    # Détection des nouvelles réservations
+    # Intervalle (en secondes) du poll incrémental utilisé quand les change streams
+    # ne sont pas disponibles (MongoDB sans replica set)
+    RESERVATION_POLL_INTERVAL = float(os.getenv('RESERVATION_POLL_INTERVAL', 10))
+    # Fenêtre (en secondes) de regroupement des notifications : les réservations
+    # arrivées pendant la fenêtre ouverte par une notification sont envoyées
+    # ensemble (0 désactive le regroupement)
+    NOTIFICATION_COALESCE_WINDOW = float(os.getenv('NOTIFICATION_COALESCE_WINDOW', 3))
+    # Nombre minimal de réservations pour envoyer un message groupé plutôt que des messages individuels
+    NOTIFICATION_BATCH_MIN = int(os.getenv('NOTIFICATION_BATCH_MIN', 3))
+    # Durée (en secondes) de la réservation d'envoi posée sur une réservation avant sa
+    # notification ; passé ce délai, une autre instance peut la reprendre
+    NOTIFICATION_CLAIM_LEASE = float(os.getenv('NOTIFICATION_CLAIM_LEASE', 120))
+    
+    # Identifiant de cette instance du bot (propriétaire des réservations d'envoi et des baux)
+    INSTANCE_ID = os.getenv('INSTANCE_ID') or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    
+    # Coordination de plusieurs instances : durée du bail du leader et intervalle de
+    # renouvellement (en secondes) ; un leader arrêté est remplacé après au plus la durée du bail
+    COORDINATOR_LEASE_SECONDS = float(os.getenv('COORDINATOR_LEASE_SECONDS', 15))
+    COORDINATOR_RENEW_INTERVAL = float(os.getenv('COORDINATOR_RENEW_INTERVAL', 5))
+    # Répartir les notifications des nouvelles réservations entre les instances
+    # (sinon seul le leader les envoie)
+    COORDINATOR_PARTITION = os.getenv('COORDINATOR_PARTITION', 'false').lower() == 'true'
+    
+    # Endpoint HTTP des métriques (/metrics au format Prometheus) et de la sonde /ready,
+    # sur l'interface locale par défaut (docker-compose l'ouvre au réseau des conteneurs)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 8000))
+    
+    # Surveillance de la boucle d'événements : période de mesure (secondes) et
+    # seuil de retard (ms) au-delà duquel un blocage est journalisé avec sa pile
+    LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+    LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', 0.25))
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 100))
+    
     # Couleurs pour les embeds
     COLORS = {
         'SUCCESS': 0x4CAF50,    # Vert
@@ -1,102 +1,673 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import asyncio
+import functools
+import inspect
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import AsyncMongoClient, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, OperationFailure, PyMongoError
 import logging
 from config import Config
+from utils.cache import TTLCache, MISSING
+from utils.message_index import MessageIndex
+from utils.metrics import DB_LATENCY, DB_ERRORS
+from utils.mongo_monitor import CommandMonitor, plan_stages
+from utils.profiling import measure_db
 
 logger = logging.getLogger(__name__)
 
+# Champs des jeux et utilisateurs utilisés pour l'affichage des réservations
+GAME_PROJECTION = {'name': 1, 'players': 1, 'duration': 1, 'age': 1}
+USER_PROJECTION = {'username': 1}
+
+# Champs des réservations affichés dans les listes paginées
+LIST_PROJECTION = {'status': 1, 'startDate': 1, 'endDate': 1, 'gameId': 1, 'userId': 1}
+
+# Index nécessaires aux requêtes du bot sur la collection reservations
+RESERVATION_INDEXES = [
+    {'keys': [('status', ASCENDING), ('discord_message_id', ASCENDING)], 'name': 'bot_status_discord_message_id'},
+    {'keys': [('discord_message_id', ASCENDING)], 'name': 'bot_discord_message_id'},
+    {'keys': [('status', ASCENDING), ('startDate', ASCENDING), ('_id', ASCENDING)], 'name': 'bot_status_startDate_id'},
+    {'keys': [('status', ASCENDING), ('gameId', ASCENDING)], 'name': 'bot_status_gameId'},
+    {'keys': [('startDate', ASCENDING)], 'name': 'bot_startDate'}
+]
+
+# Code renvoyé par MongoDB quand les change streams ne sont pas disponibles (pas de replica set)
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+def as_object_id(value):
+    """Convertit un ID de réservation saisi par un admin en ObjectId, ou None s'il est invalide"""
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(str(value).strip())
+    except (InvalidId, TypeError):
+        return None
+
 class Database:
+    """Accès asynchrone à MongoDB (driver async de pymongo)
+
+    Toutes les méthodes sont des coroutines : une requête lente ne bloque plus
+    la boucle d'événements de discord.py (heartbeats de la gateway compris).
+    """
     def __init__(self):
         self.client = None
         self.db = None
-        self.connect()
+        # Latences et requêtes lentes, mesurées au niveau du driver
+        self.monitor = CommandMonitor()
+        
+        # Caches des données de référence, indexés par _id
+        self.caches = {
+            'games': TTLCache(Config.REFERENCE_CACHE_SIZE, Config.REFERENCE_CACHE_TTL),
+            'users': TTLCache(Config.REFERENCE_CACHE_SIZE, Config.REFERENCE_CACHE_TTL)
+        }
+        
+        # Messages de notification suivis (ID du message -> réservation)
+        self.message_index = MessageIndex()
+        # Messages absents de MongoDB, pour ne pas les rechercher à chaque réaction
+        self.unknown_messages = TTLCache(Config.REFERENCE_CACHE_SIZE, Config.REFERENCE_CACHE_TTL)
     
-    def connect(self):
+    async def connect(self):
         """Établit la connexion à MongoDB"""
         try:
-            self.client = MongoClient(Config.MONGODB_URI)
+            self.client = AsyncMongoClient(
+                Config.MONGODB_URI,
+                maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=Config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[self.monitor]
+            )
             # Test de la connexion
-            self.client.admin.command('ping')
+            await self.client.admin.command('ping')
             self.db = self.client[Config.DATABASE_NAME]
+            self.monitor.attach(self.db)
             logger.info("Connexion a MongoDB etablie avec succes")
         except ConnectionFailure as e:
             logger.error(f"Erreur de connexion a MongoDB: {e}")
             raise
     
+    def get_database(self):
+        """Récupère la base MongoDB du bot"""
+        if self.db is None:
+            raise ConnectionError("Base de données non connectée")
+        return self.db
+    
     def get_collection(self, collection_name):
         """Récupère une collection MongoDB"""
         if self.db is None:
             raise ConnectionError("Base de données non connectée")
         return self.db[collection_name]
     
-    def get_reservations(self, status=None):
+    async def get_reservations(self, status=None):
         """Récupère les réservations depuis la base de données"""
         collection = self.get_collection('reservations')
         if status:
-            return list(collection.find({'status': status}))
-        return list(collection.find())
+            return await collection.find({'status': status}).to_list()
+        return await collection.find().to_list()
     
-    def get_reservation_by_id(self, reservation_id):
+    async def get_reservation_by_id(self, reservation_id):
         """Récupère une réservation par son ID"""
         collection = self.get_collection('reservations')
-        return collection.find_one({'_id': reservation_id})
+        return await collection.find_one({'_id': reservation_id})
     
-    def update_reservation_status(self, reservation_id, status, admin_notes=None):
-        """Met à jour le statut d'une réservation"""
+    async def transition_reservation_status(self, reservation_id, status, admin_notes=None, from_status='pending'):
+        """Change le statut d'une réservation si elle est toujours dans from_status
+
+        Comparaison et mise à jour se font en une seule requête atomique : de
+        deux admins qui traitent la réservation en même temps, un seul réussit.
+        Retourne le document après mise à jour, ou None si la réservation
+        n'existe pas ou n'est plus dans from_status.
+        """
         collection = self.get_collection('reservations')
         update_data = {'status': status}
         if admin_notes:
             update_data['admin_notes'] = admin_notes
         
-        result = collection.update_one(
-            {'_id': reservation_id},
-            {'$set': update_data}
+        reservation = await collection.find_one_and_update(
+            {'_id': reservation_id, 'status': from_status},
+            {'$set': update_data},
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
+        if reservation:
+            self.message_index.update_status(reservation_id, status)
+        return reservation
     
-    def add_discord_message_id(self, reservation_id, message_id):
+    async def bulk_transition_reservation_status(self, reservation_ids, status, admin_notes=None, from_status='pending'):
+        """Change le statut de plusieurs réservations en un seul bulk_write conditionnel
+
+        Chaque mise à jour n'a d'effet que si la réservation est toujours dans
+        from_status, et marque la réservation d'un ID de lot (decision_batch)
+        propre à cet appel. La relecture des réservations indique ainsi, pour
+        chacune, si c'est ce lot qui l'a modifiée.
+        Retourne {reservation_id: (résultat, document)} où résultat vaut
+        'updated', 'not_found' ou le statut déjà en place.
+        """
+        collection = self.get_collection('reservations')
+        reservation_ids = list(dict.fromkeys(reservation_ids))
+        if not reservation_ids:
+            return {}
+        
+        batch_id = ObjectId()
+        update_data = {'status': status, 'decision_batch': batch_id}
+        if admin_notes:
+            update_data['admin_notes'] = admin_notes
+        
+        await collection.bulk_write(
+            [UpdateOne({'_id': reservation_id, 'status': from_status}, {'$set': update_data}) for reservation_id in reservation_ids],
+            ordered=False
+        )
+        
+        documents = {
+            reservation['_id']: reservation
+            for reservation in await collection.find({'_id': {'$in': reservation_ids}}).to_list()
+        }
+        
+        outcomes = {}
+        for reservation_id in reservation_ids:
+            reservation = documents.get(reservation_id)
+            if reservation is None:
+                outcomes[reservation_id] = ('not_found', None)
+            elif reservation.get('decision_batch') == batch_id:
+                self.message_index.update_status(reservation_id, status)
+                outcomes[reservation_id] = ('updated', reservation)
+            else:
+                outcomes[reservation_id] = (reservation['status'], reservation)
+        return outcomes
+    
+    async def add_discord_message_id(self, reservation_id, message_id):
         """Ajoute l'ID du message Discord à une réservation"""
         collection = self.get_collection('reservations')
-        result = collection.update_one(
+        result = await collection.update_one(
             {'_id': reservation_id},
-            {'$set': {'discord_message_id': message_id}}
+            {'$set': {'discord_message_id': message_id}, '$unset': {'notify_claim': ''}}
+        )
+        # Le bot ne notifie que des réservations en attente
+        self.message_index.track(message_id, reservation_id, 'pending')
+        return result.modified_count > 0
+    
+    async def add_discord_message_ids(self, reservation_ids, message_id):
+        """Associe un même message Discord groupé à plusieurs réservations"""
+        collection = self.get_collection('reservations')
+        result = await collection.update_many(
+            {'_id': {'$in': list(reservation_ids)}},
+            {'$set': {'discord_message_id': message_id}, '$unset': {'notify_claim': ''}}
+        )
+        self.message_index.track_batch(message_id, reservation_ids)
+        return result.modified_count
+    
+    async def claim_reservation_notification(self, reservation_id, owner, lease_seconds):
+        """Réserve atomiquement l'envoi de la notification d'une réservation
+
+        La réservation doit être en attente, sans message Discord et sans
+        réservation d'envoi en cours (ou dont le bail a expiré). Retourne le
+        document après la prise, ou None si une autre instance (ou un envoi
+        précédent) s'en occupe déjà.
+        """
+        collection = self.get_collection('reservations')
+        now = datetime.now(timezone.utc)
+        return await collection.find_one_and_update(
+            {
+                '_id': reservation_id,
+                'status': 'pending',
+                'discord_message_id': None,
+                '$or': [
+                    {'notify_claim': None},
+                    {'notify_claim.expires_at': {'$lt': now}}
+                ]
+            },
+            {'$set': {'notify_claim': {'owner': owner, 'expires_at': now + timedelta(seconds=lease_seconds)}}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def renew_notification_claim(self, reservation_id, owner, lease_seconds):
+        """Prolonge le bail de la réservation d'envoi tenue par owner
+
+        Retourne False si la prise n'est plus à owner (bail expiré et repris
+        par une autre instance) ou si la notification a déjà été envoyée.
+        """
+        collection = self.get_collection('reservations')
+        result = await collection.update_one(
+            {'_id': reservation_id, 'notify_claim.owner': owner, 'discord_message_id': None},
+            {'$set': {'notify_claim.expires_at': datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}}
+        )
+        return result.matched_count > 0
+    
+    async def release_notification_claim(self, reservation_id, owner):
+        """Libère la réservation d'envoi après un échec, pour qu'elle soit retentée"""
+        collection = self.get_collection('reservations')
+        result = await collection.update_one(
+            {'_id': reservation_id, 'notify_claim.owner': owner},
+            {'$unset': {'notify_claim': ''}}
         )
         return result.modified_count > 0
     
-    def get_reservation_by_discord_message(self, message_id):
-        """Récupère une réservation par l'ID du message Discord"""
+    async def warm_message_index(self):
+        """Charge en mémoire l'association message Discord -> réservation
+
+        Seuls les messages des réservations en attente, et ceux des
+        réservations créées depuis moins de MESSAGE_INDEX_WINDOW_DAYS jours,
+        sont chargés : l'index ne grandit pas avec l'historique. Les autres
+        messages sont ajoutés à la demande par resolve_tracked_message.
+        """
+        collection = self.get_collection('reservations')
+        recent = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(days=Config.MESSAGE_INDEX_WINDOW_DAYS))
+        cursor = collection.find(
+            {
+                'discord_message_id': {'$ne': None},
+                '$or': [{'status': 'pending'}, {'_id': {'$gte': recent}}]
+            },
+            {'_id': 1, 'status': 1, 'discord_message_id': 1}
+        )
+        self.message_index.clear()
+        self.unknown_messages.clear()
+        async for reservation in cursor:
+            self.message_index.track(reservation['discord_message_id'], reservation['_id'], reservation.get('status'))
+        logger.info(f"Index des messages chargé: {len(self.message_index)} message(s) suivi(s)")
+    
+    async def resolve_tracked_message(self, message_id):
+        """Entrée de l'index d'un message individuel suivi, chargée depuis MongoDB si absente
+
+        Retourne {'reservation_id', 'status'}, ou None pour un message groupé
+        ou inconnu. Un message inconnu est mémorisé REFERENCE_CACHE_TTL
+        secondes pour ne pas refaire la requête à chaque réaction.
+        """
+        tracked = self.message_index.get(message_id)
+        if tracked or message_id in self.message_index:
+            return tracked
+        message_id = str(message_id)
+        if self.unknown_messages.get(message_id) is not MISSING:
+            return None
+        
+        collection = self.get_collection('reservations')
+        reservations = await collection.find({'discord_message_id': message_id}, {'_id': 1, 'status': 1}).to_list()
+        if not reservations:
+            self.unknown_messages.set(message_id, True)
+            return None
+        if len(reservations) > 1:
+            self.message_index.track_batch(message_id, [reservation['_id'] for reservation in reservations])
+            return None
+        self.message_index.track(message_id, reservations[0]['_id'], reservations[0].get('status'))
+        return self.message_index.get(message_id)
+    
+    async def get_reservations_by_ids(self, reservation_ids, status=None, projection=None):
+        """Récupère plusieurs réservations par leurs IDs en une requête"""
+        collection = self.get_collection('reservations')
+        query = {'_id': {'$in': list(reservation_ids)}}
+        if status:
+            query['status'] = status
+        return await collection.find(query, projection).to_list()
+    
+    async def get_reminder_candidates(self):
+        """Récupère les champs nécessaires à la planification des rappels des réservations en attente"""
+        collection = self.get_collection('reservations')
+        return await collection.find(
+            {'status': 'pending'},
+            {'_id': 1, 'status': 1, 'createdAt': 1, 'startDate': 1, 'last_reminded_at': 1}
+        ).to_list()
+    
+    async def mark_reminded(self, reservation_ids, reminded_at):
+        """Enregistre la date du dernier rappel envoyé pour des réservations"""
+        collection = self.get_collection('reservations')
+        await collection.update_many(
+            {'_id': {'$in': list(reservation_ids)}},
+            {'$set': {'last_reminded_at': reminded_at}}
+        )
+    
+    async def get_unnotified_reservations(self, after_id=None):
+        """Récupère les réservations en attente sans message Discord, triées par _id
+
+        Si after_id est fourni, seules les réservations créées après ce _id
+        (high-water mark) sont retournées.
+        """
         collection = self.get_collection('reservations')
-        return collection.find_one({'discord_message_id': message_id})
+        query = {'status': 'pending', 'discord_message_id': None}
+        if after_id is not None:
+            query['_id'] = {'$gt': after_id}
+        return await collection.find(query).sort('_id', 1).to_list()
     
-    def get_pending_reservations(self):
+    async def count_reservations_by_status(self, start=None, end=None):
+        """Compte les réservations par statut côté serveur
+
+        Si start/end sont fournis, seules les réservations dont startDate est
+        dans [start, end[ sont comptées. Retourne {statut: nombre}.
+        """
+        collection = self.get_collection('reservations')
+        pipeline = []
+        if start is not None or end is not None:
+            date_range = {}
+            if start is not None:
+                date_range['$gte'] = start
+            if end is not None:
+                date_range['$lt'] = end
+            pipeline.append({'$match': {'startDate': date_range}})
+        pipeline.append({'$group': {'_id': '$status', 'count': {'$sum': 1}}})
+        
+        cursor = await collection.aggregate(pipeline)
+        return {row['_id']: row['count'] async for row in cursor}
+    
+    async def get_pending_reservations(self):
         """Récupère toutes les réservations en attente"""
-        return self.get_reservations('pending')
+        return await self.get_reservations('pending')
     
-    def get_games(self):
-        """Récupère tous les jeux"""
+    async def get_pending_reservation_ids(self, game_ids):
+        """Récupère les IDs des réservations en attente pour une liste de jeux"""
+        collection = self.get_collection('reservations')
+        reservations = await collection.find(
+            {'status': 'pending', 'gameId': {'$in': list(game_ids)}}, {'_id': 1}
+        ).sort('_id', 1).to_list()
+        return [reservation['_id'] for reservation in reservations]
+    
+    async def find_game_ids_by_name(self, name):
+        """Récupère les IDs des jeux dont le nom contient name (sans tenir compte de la casse)"""
         collection = self.get_collection('games')
-        return list(collection.find())
+        games = await collection.find({'name': {'$regex': re.escape(name), '$options': 'i'}}, {'_id': 1}).to_list()
+        return [game['_id'] for game in games]
     
-    def get_game_by_id(self, game_id):
-        """Récupère un jeu par son ID"""
+    async def get_reservations_page(self, status='pending', after=None, before=None, limit=10):
+        """Récupère une page de réservations triées par (startDate, _id)
+
+        Pagination par clé : after (ou before) est la clé (startDate, _id) de
+        la dernière (ou première) réservation de la page courante. La requête
+        parcourt l'index (status, startDate, _id) à partir de cette clé et ne
+        lit que limit + 1 documents projetés, quel que soit le nombre de
+        réservations. Retourne (réservations, has_more) où has_more indique
+        une page suivante (ou précédente avec before).
+        """
+        collection = self.get_collection('reservations')
+        query = {'status': status}
+        direction = ASCENDING
+        
+        key = after or before
+        if key is not None:
+            start_date, reservation_id = key
+            op = '$gt' if after is not None else '$lt'
+            query['$or'] = [
+                {'startDate': {op: start_date}},
+                {'startDate': start_date, '_id': {op: reservation_id}}
+            ]
+            if before is not None:
+                direction = DESCENDING
+        
+        reservations = await collection.find(query, LIST_PROJECTION).sort(
+            [('startDate', direction), ('_id', direction)]
+        ).limit(limit + 1).to_list()
+        
+        has_more = len(reservations) > limit
+        reservations = reservations[:limit]
+        if direction == DESCENDING:
+            reservations.reverse()
+        return reservations, has_more
+    
+    async def get_games(self):
+        """Récupère tous les jeux"""
         collection = self.get_collection('games')
-        return collection.find_one({'_id': game_id})
+        return await collection.find().to_list()
     
-    def get_users(self):
+    async def get_game_by_id(self, game_id):
+        """Récupère un jeu par son ID (champs d'affichage uniquement, mis en cache)"""
+        return await self._get_cached('games', game_id, GAME_PROJECTION)
+    
+    async def get_users(self):
         """Récupère tous les utilisateurs"""
         collection = self.get_collection('users')
-        return list(collection.find())
+        return await collection.find().to_list()
     
-    def get_user_by_id(self, user_id):
-        """Récupère un utilisateur par son ID"""
-        collection = self.get_collection('users')
-        return collection.find_one({'_id': user_id})
+    async def get_user_by_id(self, user_id):
+        """Récupère un utilisateur par son ID (champs d'affichage uniquement, mis en cache)"""
+        return await self._get_cached('users', user_id, USER_PROJECTION)
+    
+    async def _get_cached(self, collection_name, document_id, projection):
+        """Récupère un document de référence en passant par le cache"""
+        cache = self.caches[collection_name]
+        document = cache.get(document_id)
+        if document is MISSING:
+            collection = self.get_collection(collection_name)
+            document = await collection.find_one({'_id': document_id}, projection)
+            cache.set(document_id, document)
+        return document
+    
+    async def hydrate_reservations(self, reservations):
+        """Ajoute les clés 'game' et 'user' à une liste de réservations
+
+        Les jeux et utilisateurs absents du cache sont chargés en deux requêtes
+        $in projetées, exécutées en parallèle, quel que soit le nombre de réservations.
+        """
+        game_ids = {r['gameId'] for r in reservations if 'game' not in r and r.get('gameId')}
+        user_ids = {r['userId'] for r in reservations if 'user' not in r and r.get('userId')}
+        
+        games, users = await asyncio.gather(
+            self._find_by_ids('games', game_ids, GAME_PROJECTION),
+            self._find_by_ids('users', user_ids, USER_PROJECTION)
+        )
+        
+        for reservation in reservations:
+            if 'game' not in reservation and 'gameId' in reservation:
+                reservation['game'] = games.get(reservation['gameId'])
+            if 'user' not in reservation and 'userId' in reservation:
+                reservation['user'] = users.get(reservation['userId'])
+        return reservations
+    
+    async def _find_by_ids(self, collection_name, ids, projection):
+        """Charge des documents par _id via le cache, retournés sous forme {_id: document}"""
+        cache = self.caches[collection_name]
+        documents = {}
+        missing_ids = []
+        for document_id in ids:
+            document = cache.get(document_id)
+            if document is MISSING:
+                missing_ids.append(document_id)
+            else:
+                documents[document_id] = document
+        
+        if missing_ids:
+            collection = self.get_collection(collection_name)
+            cursor = collection.find({'_id': {'$in': missing_ids}}, projection)
+            async for document in cursor:
+                documents[document['_id']] = document
+            # Les documents introuvables sont aussi mis en cache
+            for document_id in missing_ids:
+                cache.set(document_id, documents.get(document_id))
+        return documents
+    
+    async def watch_reference_changes(self):
+        """Invalide les caches de référence à chaque modification des jeux ou utilisateurs
+
+        Tourne jusqu'à annulation. Sans replica set, les caches reposent
+        uniquement sur leur durée de vie (REFERENCE_CACHE_TTL).
+        """
+        pipeline = [{'$match': {'ns.coll': {'$in': list(self.caches)}}}]
+        while True:
+            try:
+                async with await self.get_database().watch(pipeline) as stream:
+                    logger.info("Invalidation des caches de référence par change stream activée")
+                    async for change in stream:
+                        cache = self.caches.get(change.get('ns', {}).get('coll'))
+                        if cache is None:
+                            continue
+                        if 'documentKey' in change:
+                            cache.invalidate(change['documentKey']['_id'])
+                        else:
+                            # drop, rename...
+                            cache.clear()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.warning("Change streams indisponibles, les caches de référence expirent après leur TTL")
+                    return
+                logger.error(f"Erreur du change stream des caches de référence: {e}")
+            except PyMongoError as e:
+                logger.error(f"Erreur du change stream des caches de référence: {e}")
+            
+            # Des modifications ont pu être manquées pendant l'interruption
+            for cache in self.caches.values():
+                cache.clear()
+            await asyncio.sleep(10)
+    
+    async def ensure_indexes(self):
+        """Crée les index utilisés par les requêtes du bot s'ils n'existent pas"""
+        collection = self.get_collection('reservations')
+        for index in RESERVATION_INDEXES:
+            try:
+                await collection.create_index(index['keys'], name=index['name'])
+            except OperationFailure as e:
+                logger.error(f"Impossible de créer l'index {index['name']}: {e}")
+        logger.info("Index des réservations vérifiés")
+        
+        # Les instances arrêtées sans se désinscrire disparaissent d'elles-mêmes
+        try:
+            await self.get_collection('bot_members').create_index(
+                'expires_at', name='bot_members_expires_at', expireAfterSeconds=0
+            )
+        except OperationFailure as e:
+            logger.error(f"Impossible de créer l'index bot_members_expires_at: {e}")
+    
+    async def explain_queries(self):
+        """Exécute explain() sur chaque requête du bot
+
+        Retourne une liste de {'name', 'stages', 'collscan'} pour vérifier
+        qu'aucune requête ne parcourt toute la collection.
+        """
+        reservations = self.get_collection('reservations')
+        sample_id = ObjectId()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        
+        # Chaque explain n'est lancé qu'au moment d'être attendu : une erreur
+        # n'abandonne pas de coroutines jamais attendues
+        explains = {
+            'get_reservations(pending)': lambda: reservations.find({'status': 'pending'}).explain(),
+            'get_reservation_by_id': lambda: reservations.find({'_id': sample_id}).explain(),
+            'resolve_tracked_message': lambda: reservations.find({'discord_message_id': '0'}, {'_id': 1, 'status': 1}).explain(),
+            'warm_message_index': lambda: reservations.find(
+                {'discord_message_id': {'$ne': None}, '$or': [{'status': 'pending'}, {'_id': {'$gte': sample_id}}]},
+                {'_id': 1, 'status': 1, 'discord_message_id': 1}
+            ).explain(),
+            'get_reservations_page(suivante)': lambda: reservations.find(
+                {'status': 'pending', '$or': [
+                    {'startDate': {'$gt': today}},
+                    {'startDate': today, '_id': {'$gt': sample_id}}
+                ]},
+                LIST_PROJECTION
+            ).sort([('startDate', ASCENDING), ('_id', ASCENDING)]).limit(11).explain(),
+            'get_pending_reservation_ids(jeu)': lambda: reservations.find(
+                {'status': 'pending', 'gameId': {'$in': [sample_id]}}, {'_id': 1}
+            ).explain(),
+            'get_unnotified_reservations': lambda: reservations.find(
+                {'status': 'pending', 'discord_message_id': None, '_id': {'$gt': sample_id}}
+            ).sort('_id', 1).explain(),
+            'count_reservations_by_status(jour)': lambda: self.get_database().command(
+                'aggregate', 'reservations',
+                pipeline=[
+                    {'$match': {'startDate': {'$gte': today, '$lt': today + timedelta(days=1)}}},
+                    {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+                ],
+                explain=True
+            ),
+            'hydrate_reservations(games)': lambda: self.get_collection('games').find({'_id': {'$in': [sample_id]}}).explain(),
+            'hydrate_reservations(users)': lambda: self.get_collection('users').find({'_id': {'$in': [sample_id]}}).explain()
+        }
+        
+        report = []
+        for name, explain in explains.items():
+            stages = plan_stages(await explain())
+            report.append({'name': name, 'stages': stages, 'collscan': 'COLLSCAN' in stages})
+        return report
+    
+    def cache_stats(self):
+        """Compteurs des caches de référence"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
+    
+    async def get_bot_state(self, key):
+        """Récupère un état persistant du bot (resume token, high-water mark...)"""
+        collection = self.get_collection('bot_state')
+        return await collection.find_one({'_id': key}) or {}
     
-    def close(self):
+    async def set_bot_state(self, key, values):
+        """Enregistre un état persistant du bot"""
+        collection = self.get_collection('bot_state')
+        await collection.update_one({'_id': key}, {'$set': values}, upsert=True)
+    
+    async def acquire_lease(self, name, owner, lease_seconds):
+        """Prend ou renouvelle un bail nommé (collection bot_leases)
+
+        Réussit si le bail est libre, expiré ou déjà détenu par owner.
+        Retourne True si owner détient le bail à l'issue de l'appel.
+        """
+        collection = self.get_collection('bot_leases')
+        now = datetime.now(timezone.utc)
+        try:
+            lease = await collection.find_one_and_update(
+                {'_id': name, '$or': [{'owner': owner}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'owner': owner, 'expires_at': now + timedelta(seconds=lease_seconds), 'renewed_at': now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Le bail existe et est détenu par une autre instance : l'upsert a échoué sur _id
+            return False
+        return lease is not None and lease.get('owner') == owner
+    
+    async def release_lease(self, name, owner):
+        """Libère un bail détenu par owner, pour une reprise immédiate par une autre instance"""
+        collection = self.get_collection('bot_leases')
+        result = await collection.delete_one({'_id': name, 'owner': owner})
+        return result.deleted_count > 0
+    
+    async def heartbeat_member(self, owner, lease_seconds):
+        """Signale qu'une instance du bot est vivante (collection bot_members)"""
+        collection = self.get_collection('bot_members')
+        now = datetime.now(timezone.utc)
+        await collection.update_one(
+            {'_id': owner},
+            {'$set': {'expires_at': now + timedelta(seconds=lease_seconds), 'heartbeat_at': now}},
+            upsert=True
+        )
+    
+    async def get_live_members(self):
+        """Retourne les identifiants triés des instances vivantes"""
+        collection = self.get_collection('bot_members')
+        now = datetime.now(timezone.utc)
+        members = await collection.find({'expires_at': {'$gt': now}}, {'_id': 1}).sort('_id', 1).to_list()
+        return [member['_id'] for member in members]
+    
+    async def remove_member(self, owner):
+        """Désinscrit une instance à son arrêt"""
+        collection = self.get_collection('bot_members')
+        await collection.delete_one({'_id': owner})
+    
+    async def close(self):
         """Ferme la connexion à MongoDB"""
         if self.client:
-            self.client.close()
+            await self.client.close()
             logger.info("Connexion a MongoDB fermee")
 
-# Instance globale de la base de données
+# Méthodes qui ne sont pas des requêtes ponctuelles, exclues des métriques de latence
+UNTIMED_METHODS = {'watch_reference_changes', 'close'}
+
+def _timed(name, method):
+    """Enregistre la latence (et les erreurs) d'une méthode de Database, et son temps dans le profil du gestionnaire en cours"""
+    latency = DB_LATENCY.labels(name)
+    errors = DB_ERRORS.labels(name)
+    
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with measure_db():
+                return await method(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+    
+    return wrapper
+
+for _name, _method in list(vars(Database).items()):
+    if inspect.iscoroutinefunction(_method) and not _name.startswith('_') and _name not in UNTIMED_METHODS:
+        setattr(Database, _name, _timed(_name, _method))
+
+# Instance globale de la base de données (connectée au démarrage via db.connect())
 db = Database() 
\ No newline at end of file
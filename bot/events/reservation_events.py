@@ -3,136 +3,178 @@ from discord.ext import commands
 import logging
 from database import db
 from utils.embeds import EmbedBuilder
-from utils.permissions import has_admin_role
+from utils.reservation_view import ReservationView
+from utils.permissions import has_admin_role, admin_verdicts, remember_admin_verdict, get_cached_admin_verdict
+from services.statistics import get_reservation_stats
+from views.reservation_controls import ReservationControls
+from views.reservation_list import build_reservation_list
+from utils.metrics import REACTION_LATENCY
+from utils.profiling import profiled
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Réactions traitées sur les messages de notification
+MODERATION_EMOJIS = {Config.EMOJIS['APPROVE'], Config.EMOJIS['REJECT'], Config.EMOJIS['INFO']}
+
 class ReservationEvents(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
     @commands.Cog.listener()
+    @profiled('on_raw_reaction_add')
     async def on_raw_reaction_add(self, payload):
         """Gère les réactions sur les messages de réservation"""
+        emoji = str(payload.emoji)
+        with REACTION_LATENCY.labels(emoji if emoji in MODERATION_EMOJIS else 'other').time():
+            await self.handle_reaction(payload)
+    
+    async def handle_reaction(self, payload):
+        """Filtre puis traite une réaction ajoutée"""
         # Vérifier que c'est dans le bon salon
         if payload.channel_id != Config.CHANNEL_ID:
             return
         
-        # Vérifier que c'est un message du bot
+        # Ignorer les réactions du bot (dont celles ajoutées à ses propres notifications)
+        if self.bot.user and payload.user_id == self.bot.user.id:
+            return
+        
+        emoji = str(payload.emoji)
+        if emoji not in MODERATION_EMOJIS:
+            return
+        
+        # Vérifier que c'est un message de notification suivi, sans appel REST (l'index
+        # en mémoire ne va dans MongoDB que pour un message ancien pas encore chargé ;
+        # les messages groupés se modèrent uniquement par leurs boutons)
+        tracked = await db.resolve_tracked_message(payload.message_id)
+        if not tracked:
+            return
+        
+        if emoji != Config.EMOJIS['INFO'] and tracked['status'] != 'pending':
+            return
+        
         channel = self.bot.get_channel(payload.channel_id)
         if not channel:
             return
         
+        # Vérifier les permissions de l'utilisateur avant de récupérer le message
+        member = await self.get_admin_verdict(payload)
+        if not member:
+            return
+        
+        if not member.is_admin:
+            # Supprimer la réaction si l'utilisateur n'a pas les permissions
+            # (un message partiel suffit, sans appel REST pour le récupérer)
+            try:
+                await channel.get_partial_message(payload.message_id).remove_reaction(payload.emoji, discord.Object(id=payload.user_id))
+            except:
+                pass
+            return
+        
         try:
             message = await channel.fetch_message(payload.message_id)
         except:
             return
         
-        if message.author.id != self.bot.user.id:
-            return
+        # Traiter la réaction : les décisions partent de l'ID connu par l'index,
+        # seule la réaction d'information a besoin du document complet
+        reservation_id = tracked['reservation_id']
+        if emoji == Config.EMOJIS['APPROVE']:
+            await self.handle_approve_reaction(reservation_id, message, member)
+        elif emoji == Config.EMOJIS['REJECT']:
+            await self.handle_reject_reaction(reservation_id, message, member)
+        elif emoji == Config.EMOJIS['INFO']:
+            reservation = await db.get_reservation_by_id(reservation_id)
+            if reservation:
+                await self.handle_info_reaction(reservation, message, member)
+    
+    async def get_admin_verdict(self, payload):
+        """Retourne le verdict admin de l'auteur d'une réaction, ou None"""
+        # La gateway fournit le membre pour les réactions sur un serveur
+        if payload.member is not None:
+            return remember_admin_verdict(payload.member)
         
-        # Récupérer la réservation associée au message
-        reservation = db.get_reservation_by_discord_message(str(payload.message_id))
-        if not reservation:
-            return
+        verdict = get_cached_admin_verdict(payload.user_id)
+        if verdict:
+            return verdict
         
-        # Vérifier les permissions de l'utilisateur
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
-            return
-            
+            return None
+        
         # Utiliser fetch_member au lieu de get_member pour éviter l'intent members
         try:
             member = await guild.fetch_member(payload.user_id)
         except:
             # Si on ne peut pas récupérer le membre, on ignore la réaction
-            return
-        
-        if not has_admin_role(member):
-            # Supprimer la réaction si l'utilisateur n'a pas les permissions
-            try:
-                await message.remove_reaction(payload.emoji, member)
-            except:
-                pass
-            return
-        
-        # Traiter la réaction
-        if str(payload.emoji) == Config.EMOJIS['APPROVE']:
-            await self.handle_approve_reaction(reservation, message, member)
-        elif str(payload.emoji) == Config.EMOJIS['REJECT']:
-            await self.handle_reject_reaction(reservation, message, member)
-        elif str(payload.emoji) == Config.EMOJIS['INFO']:
-            await self.handle_info_reaction(reservation, message, member)
+            return None
+        return remember_admin_verdict(member)
+    
+    @commands.Cog.listener()
+    @profiled('on_guild_role_update')
+    async def on_guild_role_update(self, before, after):
+        """Invalide les verdicts admin quand un rôle change"""
+        admin_verdicts.clear()
+    
+    @commands.Cog.listener()
+    @profiled('on_guild_role_delete')
+    async def on_guild_role_delete(self, role):
+        """Invalide les verdicts admin quand un rôle est supprimé"""
+        admin_verdicts.clear()
     
-    async def handle_approve_reaction(self, reservation, message, member):
+    async def handle_approve_reaction(self, reservation_id, message, member):
         """Gère la réaction d'approbation"""
-        if reservation['status'] != 'pending':
-            return
-        
-        # Mettre à jour le statut
-        success = db.update_reservation_status(
-            reservation['_id'], 
+        # Mise à jour conditionnelle : sans effet si un autre admin a déjà traité la réservation
+        updated = await db.transition_reservation_status(
+            reservation_id, 
             'approved', 
             f"Approuvé par {member.name} via Discord"
         )
         
-        if success:
+        if updated:
             # Mettre à jour l'embed
-            embed = message.embeds[0]
-            embed.color = Config.COLORS['APPROVED']
-            embed.set_field_at(0, name="Statut", value="✅ APPROUVÉ", inline=True)
+            embed = EmbedBuilder.apply_status(message.embeds[0], 'approved')
             
-            await message.edit(embed=embed)
+            await message.edit(embed=embed, view=ReservationControls(reservation_id, pending=False))
             
             # Ajouter une réaction de confirmation
             await message.add_reaction('✅')
             
-            logger.info(f"Réservation {reservation['_id']} approuvée par {member.name}")
+            logger.info(f"Réservation {reservation_id} approuvée par {member.name}")
     
-    async def handle_reject_reaction(self, reservation, message, member):
+    async def handle_reject_reaction(self, reservation_id, message, member):
         """Gère la réaction de rejet"""
-        if reservation['status'] != 'pending':
-            return
-        
-        # Mettre à jour le statut
-        success = db.update_reservation_status(
-            reservation['_id'], 
+        # Mise à jour conditionnelle : sans effet si un autre admin a déjà traité la réservation
+        updated = await db.transition_reservation_status(
+            reservation_id, 
             'rejected', 
             f"Rejeté par {member.name} via Discord"
         )
         
-        if success:
+        if updated:
             # Mettre à jour l'embed
-            embed = message.embeds[0]
-            embed.color = Config.COLORS['REJECTED']
-            embed.set_field_at(0, name="Statut", value="❌ REJETÉ", inline=True)
+            embed = EmbedBuilder.apply_status(message.embeds[0], 'rejected')
             
-            await message.edit(embed=embed)
+            await message.edit(embed=embed, view=ReservationControls(reservation_id, pending=False))
             
             # Ajouter une réaction de confirmation
             await message.add_reaction('❌')
             
-            logger.info(f"Réservation {reservation['_id']} rejetée par {member.name}")
+            logger.info(f"Réservation {reservation_id} rejetée par {member.name}")
     
     async def handle_info_reaction(self, reservation, message, member):
         """Gère la réaction d'information"""
         # Récupérer les informations complètes
-        game = None
-        user = None
-        
-        if 'gameId' in reservation:
-            game = db.get_game_by_id(reservation['gameId'])
-        if 'userId' in reservation:
-            user = db.get_user_by_id(reservation['userId'])
+        await db.hydrate_reservations([reservation])
         
         # Créer un embed détaillé
-        embed = EmbedBuilder.create_reservation_detail_embed(reservation, game, user)
+        embed = EmbedBuilder.create_reservation_detail_embed(ReservationView.from_document(reservation))
         
         # Envoyer l'embed en message temporaire
         await message.channel.send(embed=embed, delete_after=30)
     
     @commands.Cog.listener()
+    @profiled('on_message')
     async def on_message(self, message):
         """Gère les messages pour détecter les nouvelles réservations"""
         # Ignorer les messages du bot
@@ -172,33 +214,16 @@ class ReservationEvents(commands.Cog):
             logger.error(f"Erreur dans la commande textuelle: {e}")
             await message.channel.send(f"❌ Erreur: {str(e)}")
     
+    @profiled('!list')
     async def list_reservations_text(self, message):
-        """Liste les réservations en attente (commande textuelle)"""
-        reservations = db.get_pending_reservations()
-        
-        if not reservations:
-            embed = EmbedBuilder.create_warning_embed("Aucune réservation", "Aucune réservation en attente")
-            await message.channel.send(embed=embed)
-            return
-        
-        embed = EmbedBuilder.create_reservation_list_embed(reservations)
-        await message.channel.send(embed=embed)
+        """Liste les réservations en attente, page par page (commande textuelle)"""
+        embed, view = await build_reservation_list()
+        await message.channel.send(embed=embed, view=view)
     
+    @profiled('!stats')
     async def stats_text(self, message):
         """Affiche les statistiques (commande textuelle)"""
-        all_reservations = db.get_reservations()
-        
-        stats = {
-            'pending': 0,
-            'approved': 0,
-            'rejected': 0,
-            'total': len(all_reservations)
-        }
-        
-        for reservation in all_reservations:
-            status = reservation.get('status', 'unknown')
-            if status in stats:
-                stats[status] += 1
+        stats = await get_reservation_stats()
         
         embed = discord.Embed(
             title="📊 Statistiques",
@@ -212,6 +237,7 @@ class ReservationEvents(commands.Cog):
         
         await message.channel.send(embed=embed)
     
+    @profiled('!help')
     async def help_text(self, message):
         """Affiche l'aide (commande textuelle)"""
         embed = discord.Embed(
@@ -227,7 +253,7 @@ class ReservationEvents(commands.Cog):
         )
         
         embed.add_field(
-            name="Réactions",
+            name="Boutons (ou réactions)",
             value="✅ - Approuver\n❌ - Rejeter\nℹ️ - Voir les détails",
             inline=False
         )
@@ -4,7 +4,7 @@ from discord.ext import commands, tasks
 import asyncio
 import logging
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Configuration du logging avec encodage UTF-8
 logging.basicConfig(
@@ -22,6 +22,13 @@ logger = logging.getLogger(__name__)
 from config import Config
 from database import db
 from services.notification_service import NotificationService
+from services.reservation_watcher import ReservationWatcher
+from services.reminder_scheduler import ReminderScheduler
+from services.coordinator import Coordinator
+from views.reservation_controls import ReservationButton
+from services.metrics_server import MetricsServer, create_http_trace
+from services.loop_monitor import LoopMonitor
+from utils.metrics import LOOP_DURATION, LOOP_ERRORS, GATEWAY_LATENCY
 
 # Configuration du bot avec intents minimaux
 intents = discord.Intents.default()
@@ -31,19 +38,65 @@ intents.reactions = True
 intents.members = False
 intents.presences = False
 
-bot = commands.Bot(
+class ReservationBot(commands.Bot):
+    async def close(self):
+        # Envoyer les notifications en attente tant que la connexion REST est ouverte
+        await stop_discord_services()
+        await super().close()
+
+bot = ReservationBot(
     command_prefix=Config.BOT_PREFIX,
     intents=intents,
-    help_command=None
+    help_command=None,
+    # Latence et 429 des appels REST Discord, pour les métriques et le profilage des commandes
+    http_trace=create_http_trace()
 )
+GATEWAY_LATENCY.set_function(lambda: bot.latency)
 
 # Instance du service de notification
 notification_service = None
 
+# Surveillance des nouvelles réservations
+reservation_watcher = None
+
+# Planification des rappels
+reminder_scheduler = None
+
+# Coordination entre instances du bot (élection du leader)
+coordinator = None
+
+# Clé de bot_state qui mémorise la date du dernier résumé quotidien envoyé
+DAILY_SUMMARY_STATE_KEY = 'daily_summary'
+
+def start_singleton_jobs():
+    """Démarre les tâches qui ne doivent tourner que sur le leader"""
+    if not daily_summary.is_running():
+        daily_summary.start()
+    reminder_scheduler.start()
+    if not Config.COORDINATOR_PARTITION:
+        reservation_watcher.start()
+
+def stop_singleton_jobs():
+    """Arrête les tâches du leader quand l'instance perd le bail"""
+    daily_summary.cancel()
+    reminder_scheduler.stop()
+    if not Config.COORDINATOR_PARTITION:
+        reservation_watcher.stop()
+
+async def stop_discord_services():
+    """Arrête les tâches qui utilisent Discord puis vide la fenêtre de notifications"""
+    daily_summary.cancel()
+    if reminder_scheduler:
+        reminder_scheduler.stop()
+    if reservation_watcher:
+        reservation_watcher.stop()
+    if notification_service:
+        await notification_service.stop()
+
 @bot.event
 async def on_ready():
     """Événement déclenché quand le bot est prêt"""
-    global notification_service
+    global notification_service, reservation_watcher, reminder_scheduler, coordinator
     
     if bot.user:
         logger.info(f"Bot connecté en tant que {bot.user.name}")
@@ -52,19 +105,28 @@ async def on_ready():
         logger.info("Bot connecté")
     logger.info(f"Connecté à {len(bot.guilds)} serveur(s)")
     
-    # Initialiser le service de notification
-    notification_service = NotificationService(bot)
-    success = await notification_service.initialize()
-    
-    if success:
-        logger.info("Service de notification initialisé")
-    else:
-        logger.error("Echec de l'initialisation du service de notification")
-    
-    # Démarrer les tâches en arrière-plan
-    daily_summary.start()
-    reminder_check.start()
-    check_new_reservations.start() # Démarrer la nouvelle tâche
+    # on_ready est rappelé après chaque reconnexion : n'initialiser les services qu'une fois
+    if notification_service is None:
+        # Initialiser le service de notification, partagé avec les cogs
+        notification_service = NotificationService(bot)
+        bot.notification_service = notification_service
+        success = await notification_service.initialize()
+        
+        if success:
+            logger.info("Service de notification initialisé")
+        else:
+            logger.error("Echec de l'initialisation du service de notification")
+        
+        # Tâches en arrière-plan : le résumé quotidien, les rappels et (sans
+        # partitionnement) la détection des nouvelles réservations ne tournent
+        # que sur le leader
+        coordinator = Coordinator(on_elected=start_singleton_jobs, on_demoted=stop_singleton_jobs)
+        reminder_scheduler = ReminderScheduler(notification_service)
+        reservation_watcher = ReservationWatcher(notification_service, reminder_scheduler, coordinator)
+        if Config.COORDINATOR_PARTITION:
+            # Chaque instance notifie sa part des nouvelles réservations
+            reservation_watcher.start()
+        coordinator.start()
     
     # Synchroniser les commandes slash
     try:
@@ -106,70 +168,33 @@ async def on_command_error(ctx, error):
 
 @tasks.loop(hours=24)
 async def daily_summary():
-    """Envoie un résumé quotidien des réservations"""
-    if notification_service:
-        await notification_service.send_daily_summary()
+    """Envoie un résumé quotidien des réservations
 
-@tasks.loop(hours=1)
-async def reminder_check():
-    """Vérifie les réservations en attente depuis plus de 24h"""
-    if not notification_service:
-        return
-    
-    try:
-        # Récupérer les réservations en attente
-        pending_reservations = db.get_pending_reservations()
-        
-        # Vérifier celles qui sont en attente depuis plus de 24h
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        
-        for reservation in pending_reservations:
-            reservation_time = datetime.fromisoformat(str(reservation['startDate']))
-            if reservation_time < cutoff_time:
-                await notification_service.send_reminder_notification(reservation['_id'])
-                # Attendre un peu pour éviter le spam
-                await asyncio.sleep(5)
-    
-    except Exception as e:
-        logger.error(f"Erreur lors de la vérification des rappels: {e}")
-
-@tasks.loop(seconds=10)  # Vérifier toutes les 30 secondes
-async def check_new_reservations():
-    """Vérifie les nouvelles réservations et envoie des notifications"""
-    if not notification_service:
-        return
-    
-    try:
-        # Récupérer toutes les réservations
-        all_reservations = db.get_reservations()
-        
-        # Vérifier celles qui n'ont pas encore de message Discord
-        for reservation in all_reservations:
-            if reservation.get('status') == 'pending' and not reservation.get('discord_message_id'):
-                # C'est une nouvelle réservation, envoyer une notification
-                await notification_service.send_reservation_notification(reservation['_id'])
-                logger.info(f"Nouvelle réservation détectée et notifiée: {reservation['_id']}")
-                # Attendre un peu pour éviter le spam
-                await asyncio.sleep(2)
-    
-    except Exception as e:
-        logger.error(f"Erreur lors de la vérification des nouvelles réservations: {e}")
+    La boucle redémarre à chaque élection d'un leader : la date du dernier
+    envoi est gardée dans bot_state pour ne pas renvoyer le résumé du jour.
+    """
+    if notification_service:
+        with LOOP_DURATION.labels('daily_summary').time():
+            today = datetime.now().date().isoformat()
+            try:
+                state = await db.get_bot_state(DAILY_SUMMARY_STATE_KEY)
+            except Exception as e:
+                LOOP_ERRORS.labels('daily_summary').inc()
+                logger.error(f"Erreur lors de la lecture de l'état du résumé quotidien: {e}")
+                return
+            if state.get('last_sent') == today:
+                logger.info(f"Résumé quotidien du {today} déjà envoyé")
+                return
+            if await notification_service.send_daily_summary():
+                await db.set_bot_state(DAILY_SUMMARY_STATE_KEY, {'last_sent': today})
+            else:
+                LOOP_ERRORS.labels('daily_summary').inc()
 
 @daily_summary.before_loop
 async def before_daily_summary():
     """Attendre jusqu'à minuit pour commencer le résumé quotidien"""
     await asyncio.sleep(60)  # Attendre 1 minute pour éviter les conflits au démarrage
 
-@reminder_check.before_loop
-async def before_reminder_check():
-    """Attendre avant de commencer la vérification des rappels"""
-    await asyncio.sleep(300)  # Attendre 5 minutes
-
-@check_new_reservations.before_loop
-async def before_check_new_reservations():
-    """Attendre avant de commencer la vérification"""
-    await asyncio.sleep(30)  # Attendre 1 minute au démarrage
-
 async def load_extensions():
     """Charge toutes les extensions du bot"""
     extensions = [
@@ -187,10 +212,33 @@ async def load_extensions():
 
 async def main():
     """Fonction principale"""
+    cache_invalidation = None
+    metrics_server = None
+    loop_monitor = None
     try:
+        # Retard de la boucle d'événements et détection des appels bloquants
+        if Config.LOOP_MONITOR_ENABLED:
+            loop_monitor = LoopMonitor()
+            loop_monitor.start()
+            bot.loop_monitor = loop_monitor
+        
+        # Connexion à MongoDB
+        await db.connect()
+        await db.ensure_indexes()
+        await db.warm_message_index()
+        cache_invalidation = asyncio.create_task(db.watch_reference_changes())
+        
+        # Endpoint /metrics et sonde /ready
+        if Config.METRICS_ENABLED:
+            metrics_server = MetricsServer(bot, db)
+            await metrics_server.start()
+        
         # Charger les extensions
         await load_extensions()
         
+        # Boutons de modération persistants (valables aussi pour les messages envoyés avant un redémarrage)
+        bot.add_dynamic_items(ReservationButton)
+        
         # Démarrer le bot
         logger.info("Demarrage du bot...")
         if Config.DISCORD_TOKEN:
@@ -204,18 +252,51 @@ async def main():
     except Exception as e:
         logger.error(f"Erreur fatale: {e}")
     finally:
-        # Nettoyer les ressources
-        if db:
-            db.close()
+        # Arrêter d'abord les tâches qui utilisent MongoDB et Discord
+        # (déjà fait par bot.close() si le bot s'est connecté)
+        await stop_discord_services()
+        if cache_invalidation:
+            cache_invalidation.cancel()
+        if metrics_server:
+            await metrics_server.stop()
+        # Laisser les tâches annulées se terminer avant de fermer le client
+        await asyncio.sleep(0)
         
-        # Arrêter les tâches
-        daily_summary.cancel()
-        reminder_check.cancel()
-        check_new_reservations.cancel() # Arrêter la nouvelle tâche
+        if coordinator:
+            # Libérer le bail pour qu'une autre instance prenne le relais sans attendre
+            await coordinator.stop()
+        if db:
+            await db.close()
+        if loop_monitor:
+            loop_monitor.stop()
         
         logger.info("Bot arrete")
 
+async def check_indexes():
+    """Auto-vérification : crée les index puis signale les requêtes en COLLSCAN"""
+    await db.connect()
+    try:
+        await db.ensure_indexes()
+        report = await db.explain_queries()
+    finally:
+        await db.close()
+    
+    for entry in report:
+        state = "COLLSCAN" if entry['collscan'] else "OK"
+        logger.info(f"[{state}] {entry['name']}: {' > '.join(entry['stages'])}")
+    
+    collscans = [entry['name'] for entry in report if entry['collscan']]
+    if collscans:
+        logger.error(f"{len(collscans)} requête(s) sans index: {', '.join(collscans)}")
+        return 1
+    logger.info("Toutes les requêtes du bot utilisent un index")
+    return 0
+
 if __name__ == "__main__":
+    # Mode auto-vérification des index : python main.py --check-indexes
+    if '--check-indexes' in sys.argv:
+        sys.exit(asyncio.run(check_indexes()))
+    
     # Vérifier la configuration
     if not Config.DISCORD_TOKEN:
         logger.error("Token Discord manquant dans les variables d'environnement")
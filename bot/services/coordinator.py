@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import zlib
+from database import db
+from utils.metrics import LOOP_DURATION, LOOP_ERRORS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Nom du bail des tâches uniques (résumé quotidien, rappels...)
+LEADER_LEASE = 'leader'
+
+
+class Coordinator:
+    """Coordonne plusieurs instances du bot à l'aide de baux stockés dans MongoDB
+
+    Le leader est l'instance qui détient le bail 'leader' de la collection
+    bot_leases ; il le renouvelle toutes les COORDINATOR_RENEW_INTERVAL
+    secondes. Si le leader cesse de renouveler, une autre instance prend le bail
+    dès son expiration (COORDINATOR_LEASE_SECONDS). Un arrêt propre libère le
+    bail pour une reprise immédiate.
+
+    Chaque instance publie aussi un heartbeat dans bot_members : avec
+    COORDINATOR_PARTITION, les réservations sont réparties entre les instances
+    vivantes par hachage de leur _id (owns()).
+
+    Les baux reposent sur les horloges des instances : elles doivent être
+    synchronisées (NTP) à une fraction de COORDINATOR_LEASE_SECONDS près.
+    """
+
+    def __init__(self, on_elected=None, on_demoted=None):
+        self.instance_id = Config.INSTANCE_ID
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self.members = []
+        self._lease_deadline = None
+        self._task = None
+
+    def start(self):
+        """Démarre l'élection et les heartbeats en arrière-plan"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la coordination et libère le bail et l'inscription de l'instance"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+        was_leader = self.is_leader
+        self._set_leader(False)
+        try:
+            if was_leader:
+                await db.release_lease(LEADER_LEASE, self.instance_id)
+            await db.remove_member(self.instance_id)
+        except Exception as e:
+            logger.error(f"Erreur lors de la libération du bail de l'instance {self.instance_id}: {e}")
+
+    def owns(self, reservation_id):
+        """Indique si cette instance est responsable d'une réservation
+
+        Sans partitionnement, ou tant que la liste des instances n'est pas
+        connue, chaque instance se considère responsable : la prise atomique
+        des notifications évite alors les doublons.
+        """
+        if not Config.COORDINATOR_PARTITION or self.instance_id not in self.members:
+            return True
+        slot = zlib.crc32(str(reservation_id).encode()) % len(self.members)
+        return self.members[slot] == self.instance_id
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                with LOOP_DURATION.labels('coordinator').time():
+                    await db.heartbeat_member(self.instance_id, Config.COORDINATOR_LEASE_SECONDS)
+                    self.members = await db.get_live_members()
+
+                    started = loop.time()
+                    if await db.acquire_lease(LEADER_LEASE, self.instance_id, Config.COORDINATOR_LEASE_SECONDS):
+                        self._lease_deadline = started + Config.COORDINATOR_LEASE_SECONDS
+                        self._set_leader(True)
+                    else:
+                        self._set_leader(False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOOP_ERRORS.labels('coordinator').inc()
+                logger.error(f"Erreur lors du renouvellement du bail de l'instance {self.instance_id}: {e}")
+                # Sans renouvellement, rester leader au-delà du bail risquerait un double leader
+                if self.is_leader and loop.time() >= self._lease_deadline:
+                    self._set_leader(False)
+
+            await asyncio.sleep(Config.COORDINATOR_RENEW_INTERVAL)
+
+    def _set_leader(self, is_leader):
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        if is_leader:
+            logger.info(f"Instance {self.instance_id} élue leader")
+            callback = self.on_elected
+        else:
+            logger.warning(f"Instance {self.instance_id} n'est plus leader")
+            callback = self.on_demoted
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erreur lors du changement de rôle de l'instance: {e}")
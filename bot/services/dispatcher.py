@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import logging
+from enum import IntEnum
+from utils.profiling import current_profile, resume
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Routes REST utilisées par le bot, nommées comme les buckets de discord.py
+# (le paramètre majeur, ici l'ID du salon, est passé à part)
+SEND_MESSAGE = 'POST /channels/{channel_id}/messages'
+FETCH_MESSAGE = 'GET /channels/{channel_id}/messages/{message_id}'
+EDIT_MESSAGE = 'PATCH /channels/{channel_id}/messages/{message_id}'
+
+
+class Priority(IntEnum):
+    """Voies de priorité des envois vers Discord (plus petit = plus prioritaire)"""
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    BACKGROUND = 2
+
+
+class _RouteQueue:
+    """File et workers d'une route (méthode, chemin et paramètre majeur)"""
+
+    def __init__(self):
+        self.queue = asyncio.PriorityQueue()
+        self.workers = []
+
+
+class DiscordDispatcher:
+    """File d'envoi des appels REST Discord, une file par route
+
+    Chaque route (méthode et chemin, plus le paramètre majeur : l'ID du
+    salon) a sa propre file, vidée par DISCORD_DISPATCH_CONCURRENCY workers
+    par ordre de priorité puis d'arrivée. Un arriéré de notifications bloqué
+    sur le bucket épuisé de POST /channels/{id}/messages n'occupe que les
+    workers de cette route : les récupérations et éditions de messages
+    avancent sur leurs propres files. Les appels déclenchés par un admin
+    (Priority.INTERACTIVE) passent devant les appels en attente de leur route.
+    """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or Config.DISCORD_DISPATCH_CONCURRENCY
+        self._routes = {}
+        self._sequence = itertools.count()
+        self._running = False
+
+    @property
+    def queue_depth(self):
+        """Nombre d'appels en attente, toutes routes confondues"""
+        return sum(route.queue.qsize() for route in self._routes.values())
+
+    def start(self):
+        """Démarre les workers des routes déjà connues ; les suivantes démarrent à leur premier appel"""
+        self._running = True
+        for route in self._routes.values():
+            self._start_workers(route)
+
+    def stop(self):
+        """Arrête les workers ; les appels en attente échouent au lieu de rester bloqués"""
+        self._running = False
+        for route in self._routes.values():
+            for worker in route.workers:
+                worker.cancel()
+            route.workers = []
+            while not route.queue.empty():
+                _, _, _, future, _ = route.queue.get_nowait()
+                route.queue.task_done()
+                if not future.done():
+                    future.set_exception(RuntimeError("File d'envoi Discord arrêtée"))
+
+    async def submit(self, factory, route, major, priority=Priority.NOTIFICATION):
+        """Planifie un appel Discord sur route et attend son résultat
+
+        factory est une fonction sans argument qui retourne la coroutine à
+        exécuter, par exemple lambda: channel.send(embed=embed) pour la route
+        SEND_MESSAGE et le paramètre majeur channel.id. Lève RuntimeError si
+        la file n'est pas démarrée (ou déjà arrêtée).
+        """
+        if not self._running:
+            raise RuntimeError("File d'envoi Discord arrêtée")
+        queue = self._routes.get((route, major))
+        if queue is None:
+            queue = self._routes[(route, major)] = _RouteQueue()
+            self._start_workers(queue)
+        future = asyncio.get_running_loop().create_future()
+        # Le temps de l'appel reste attribué au gestionnaire qui l'a soumis
+        queue.queue.put_nowait((priority, next(self._sequence), factory, future, current_profile()))
+        return await future
+
+    def _start_workers(self, route):
+        if not route.workers:
+            route.workers = [asyncio.create_task(self._worker(route.queue)) for _ in range(self.concurrency)]
+
+    async def _worker(self, queue):
+        while True:
+            priority, _, factory, future, profile = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                try:
+                    with resume(profile):
+                        result = await factory()
+                except asyncio.CancelledError:
+                    # Arrêt de la file pendant l'appel
+                    if not future.done():
+                        future.set_exception(RuntimeError("File d'envoi Discord arrêtée"))
+                    raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                queue.task_done()
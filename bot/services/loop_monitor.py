@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from utils.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Dossier du bot : la pile d'un blocage est attribuée à la ligne du bot la plus profonde
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nombre de mesures de retard conservées pour les percentiles (~10 minutes à 0.25s)
+LAG_SAMPLES = 2400
+
+# Nombre maximal d'emplacements de blocage suivis (les suivants sont regroupés)
+MAX_OFFENDERS = 100
+
+# Nombre de frames gardées dans les journaux
+STACK_DEPTH = 12
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+def _task_name(task):
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return getattr(coro, '__qualname__', None) or task.get_name()
+
+
+def _location(stack):
+    """Ligne du bot la plus profonde de la pile (sinon la frame la plus profonde)"""
+    for frame in reversed(stack):
+        if frame.filename.startswith(BOT_DIR) and frame.filename != __file__:
+            return f"{os.path.relpath(frame.filename, BOT_DIR)}:{frame.lineno} ({frame.name})"
+    if stack:
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} ({frame.name})"
+    return "(inconnu)"
+
+
+class LoopMonitor:
+    """Mesure le retard de la boucle d'événements et identifie ce qui la bloque
+
+    Une tâche se réveille toutes les LOOP_MONITOR_INTERVAL secondes : l'écart
+    entre l'heure prévue et l'heure réelle du réveil est le retard de la
+    boucle (heartbeats de la gateway, commandes et tâches de fond subissent le
+    même). En parallèle, un thread de surveillance vérifie que la boucle se
+    réveille bien : si elle reste bloquée plus de LOOP_LAG_THRESHOLD_MS, il
+    capture la pile du thread de la boucle (sys._current_frames) et la tâche
+    asyncio en cours. Au réveil, le blocage est journalisé et attribué à la
+    ligne du bot en cause (worst_offenders).
+    """
+
+    def __init__(self):
+        self.interval = Config.LOOP_MONITOR_INTERVAL
+        self.threshold = Config.LOOP_LAG_THRESHOLD_MS / 1000
+        self._samples = deque(maxlen=LAG_SAMPLES)
+        self._offenders = {}
+        self._stalls = 0
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_tick = None
+        self._stall = None
+        self._task = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Démarre la mesure ; à appeler depuis la boucle surveillée"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+        logger.info(f"Surveillance de la boucle d'événements démarrée (seuil {Config.LOOP_LAG_THRESHOLD_MS:.0f}ms)")
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._stopping.set()
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_tick = now
+            self._samples.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+            stall, self._stall = self._stall, None
+            if lag >= self.threshold:
+                self._record_stall(lag, stall)
+
+    def _watch(self):
+        """Thread de surveillance : capture la pile de la boucle pendant un blocage"""
+        sampled_tick = None
+        while not self._stopping.wait(self.threshold / 2):
+            last_tick = self._last_tick
+            if last_tick == sampled_tick or time.monotonic() - last_tick < self.interval + self.threshold:
+                continue
+            # Une seule capture par blocage, au moment où il dépasse le seuil
+            sampled_tick = last_tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            try:
+                task = asyncio.current_task(self._loop)
+            except RuntimeError:
+                task = None
+            self._stall = (stack, _task_name(task))
+
+    def _record_stall(self, lag, stall):
+        self._stalls += 1
+        EVENT_LOOP_STALLS.inc()
+
+        if stall is None:
+            # Blocage trop court pour être capturé par le thread de surveillance
+            location, task, stack = "(non capturé)", None, []
+        else:
+            stack, task = stall
+            location = _location(stack)
+
+        offender = self._offenders.get(location)
+        if offender is None:
+            if len(self._offenders) >= MAX_OFFENDERS:
+                location = "(autres emplacements)"
+                offender = self._offenders.get(location)
+            if offender is None:
+                offender = self._offenders[location] = {
+                    'location': location, 'task': task, 'count': 0, 'total': 0.0, 'max': 0.0
+                }
+        offender['count'] += 1
+        offender['total'] += lag
+        offender['max'] = max(offender['max'], lag)
+        if task:
+            offender['task'] = task
+
+        details = "".join(traceback.format_list(stack[-STACK_DEPTH:]))
+        logger.warning(
+            f"⏱️ Boucle d'événements bloquée {lag * 1000:.0f}ms par {location}"
+            f"{f' (tâche {task})' if task else ''}" + (f"\n{details}" if details else "")
+        )
+
+    def lag_stats(self):
+        """Percentiles du retard (en secondes) sur les dernières mesures"""
+        samples = sorted(self._samples)
+        return {
+            'p50': _percentile(samples, 50),
+            'p99': _percentile(samples, 99),
+            'max': samples[-1] if samples else 0.0,
+            'samples': len(samples),
+            'stalls': self._stalls
+        }
+
+    def worst_offenders(self, limit=5):
+        """Emplacements ayant cumulé le plus de blocage depuis le démarrage"""
+        return sorted(self._offenders.values(), key=lambda offender: offender['total'], reverse=True)[:limit]
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import re
+import time
+import aiohttp
+from aiohttp import web
+from utils.metrics import registry, DISCORD_REST_LATENCY, DISCORD_RATE_LIMITS
+from utils.profiling import record_rest
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Délai maximal (secondes) du ping MongoDB de la sonde /ready
+READY_PING_TIMEOUT = 2
+
+# Les IDs Discord (snowflakes), emojis et tokens d'interaction sont retirés des
+# routes pour garder un nombre borné de séries
+_API_PREFIX = re.compile(r'^/api/v\d+')
+_SNOWFLAKE = re.compile(r'/\d{15,}')
+_REACTION = re.compile(r'/reactions/[^/]+')
+_TOKEN = re.compile(r'/(interactions|webhooks)/([^/]+)/[^/]+')
+
+
+def _route(url):
+    """Route REST normalisée : /api/v10/channels/123/messages -> /channels/:id/messages"""
+    path = _API_PREFIX.sub('', url.path)
+    path = _TOKEN.sub(r'/\1/:id/:token', path)
+    path = _REACTION.sub('/reactions/:emoji', path)
+    return _SNOWFLAKE.sub('/:id', path)
+
+
+def create_http_trace():
+    """TraceConfig aiohttp à passer à discord.py (http_trace) pour mesurer les appels REST
+
+    Chaque durée est aussi ajoutée au profil du gestionnaire qui a fait l'appel.
+    Les appels sans réponse (erreur de connexion, timeout) sont comptés avec
+    le statut 'error'.
+    """
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        duration = time.perf_counter() - context.started
+        record_rest(duration)
+        route = _route(params.url)
+        status = params.response.status
+        DISCORD_REST_LATENCY.labels(params.method, route, status).observe(duration)
+        if status == 429:
+            DISCORD_RATE_LIMITS.labels(params.method, route).inc()
+
+    async def on_request_exception(session, context, params):
+        duration = time.perf_counter() - context.started
+        record_rest(duration)
+        DISCORD_REST_LATENCY.labels(params.method, _route(params.url), 'error').observe(duration)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+class MetricsServer:
+    """Serveur HTTP local exposant /metrics (format Prometheus) et /ready
+
+    /ready répond 200 quand le bot est connecté à la gateway et à MongoDB,
+    503 sinon : c'est la sonde de santé utilisée par docker-compose.
+    """
+
+    def __init__(self, bot, database):
+        self.bot = bot
+        self.database = database
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.metrics)
+        app.router.add_get('/ready', self.ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, Config.METRICS_HOST, Config.METRICS_PORT)
+        await site.start()
+        logger.info(f"Métriques exposées sur http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def metrics(self, request):
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def ready(self, request):
+        if not self.bot.is_ready() or self.bot.is_closed() or self.database.client is None:
+            return web.Response(text="not ready", status=503)
+        # MongoDB doit répondre, pas seulement avoir été connecté au démarrage
+        try:
+            await asyncio.wait_for(self.database.client.admin.command('ping'), READY_PING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Sonde /ready: MongoDB injoignable ({e!r})")
+            return web.Response(text="mongodb unreachable", status=503)
+        return web.Response(text="ok")
@@ -0,0 +1,50 @@
+import logging
+from database import db, as_object_id
+from views.reservation_controls import DECISIONS
+
+logger = logging.getLogger(__name__)
+
+
+def parse_reservation_ids(text):
+    """Découpe une liste d'IDs saisie par un admin (espaces ou virgules)
+
+    Retourne (ids valides convertis en ObjectId, saisies invalides).
+    """
+    ids, invalid = [], []
+    for token in text.replace(',', ' ').split():
+        object_id = as_object_id(token)
+        if object_id:
+            ids.append(object_id)
+        else:
+            invalid.append(token)
+    return list(dict.fromkeys(ids)), invalid
+
+
+async def resolve_game_reservations(game_name):
+    """IDs des réservations en attente des jeux dont le nom contient game_name"""
+    game_ids = await db.find_game_ids_by_name(game_name)
+    if not game_ids:
+        return []
+    return await db.get_pending_reservation_ids(game_ids)
+
+
+async def apply_bulk_decision(reservation_ids, action, actor_name, notification_service=None):
+    """Approuve ou rejette plusieurs réservations en attente en une seule écriture
+
+    Les messages Discord des réservations modifiées sont ensuite mis à jour
+    par lots via le service de notification. Retourne le résultat par
+    réservation de Database.bulk_transition_reservation_status.
+    """
+    status, verb = DECISIONS[action]
+    outcomes = await db.bulk_transition_reservation_status(
+        reservation_ids,
+        status,
+        f"{verb} par {actor_name} via Discord (action groupée)"
+    )
+
+    updated = [reservation for outcome, reservation in outcomes.values() if outcome == 'updated']
+    if updated and notification_service:
+        await notification_service.update_reservation_messages(updated)
+
+    logger.info(f"Action groupée {action} par {actor_name}: {len(updated)}/{len(outcomes)} réservation(s) modifiée(s)")
+    return outcomes
@@ -4,14 +4,32 @@ import discord
 from datetime import datetime
 from database import db
 from utils.embeds import EmbedBuilder
+from services.statistics import get_daily_stats, approval_rate
+from services.dispatcher import DiscordDispatcher, Priority, SEND_MESSAGE, FETCH_MESSAGE, EDIT_MESSAGE
+from views.reservation_controls import ReservationControls, ReservationBatchControls, find_reservation_embed, controls_for_message
+from utils.reservation_view import ReservationView
+from utils.embeds import EMBED_MAX_TOTAL_CHARS
+from utils.metrics import DISPATCH_QUEUE_DEPTH
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Réservations par message groupé : une ligne de boutons par réservation, et
+# Discord limite un message à 5 lignes de composants
+BATCH_MAX_RESERVATIONS = 5
+
 class NotificationService:
     def __init__(self, bot):
         self.bot = bot
         self.channel = None
+        # Tous les envois du service passent par cette file
+        self.dispatcher = DiscordDispatcher()
+        DISPATCH_QUEUE_DEPTH.set_function(lambda: self.dispatcher.queue_depth)
+        # Réservations en attente de la fermeture de la fenêtre de regroupement
+        self._burst = []
+        self._burst_task = None
+        # Ferme la fenêtre de regroupement sans attendre (arrêt du bot)
+        self._flush_requested = asyncio.Event()
     
     async def initialize(self):
         """Initialise le service de notification"""
@@ -21,43 +39,53 @@ class NotificationService:
                 logger.error(f"❌ Impossible de trouver le salon {Config.CHANNEL_ID}")
                 return False
             
+            self.dispatcher.start()
             logger.info(f"✅ Service de notification initialisé pour le salon {self.channel.name}")
             return True
         except Exception as e:
             logger.error(f"❌ Erreur lors de l'initialisation du service de notification: {e}")
             return False
     
-    async def send_reservation_notification(self, reservation_id):
-        """Envoie une notification pour une nouvelle réservation"""
+    async def stop(self):
+        """Envoie les réservations de la fenêtre de regroupement en cours puis arrête la file d'envoi
+
+        À appeler avant la fermeture de la connexion à Discord : les
+        réservations déjà prises mais pas encore envoyées partent tout de
+        suite au lieu d'attendre l'expiration de leur bail.
+        """
+        if self._burst_task:
+            self._flush_requested.set()
+            try:
+                await self._burst_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_requested.clear()
+        self.dispatcher.stop()
+    
+    def _send(self, priority=Priority.NOTIFICATION, **kwargs):
+        """Envoie un message dans le salon des notifications via la file d'envoi"""
+        return self.dispatcher.submit(lambda: self.channel.send(**kwargs), SEND_MESSAGE, self.channel.id, priority)
+    
+    async def send_reservation_notification(self, reservation):
+        """Envoie une notification pour une nouvelle réservation
+
+        reservation est le document déjà lu (celui retourné par la prise de
+        claim_and_notify) : il n'est pas relu depuis la base.
+        """
+        reservation_id = reservation['_id']
         try:
-            # Récupérer la réservation
-            reservation = db.get_reservation_by_id(reservation_id)
-            if not reservation:
-                logger.error(f"❌ Réservation {reservation_id} introuvable")
-                return None
-            
             # Récupérer les informations du jeu et de l'utilisateur
-            game = None
-            user = None
-            
-            if 'gameId' in reservation:
-                game = db.get_game_by_id(reservation['gameId'])
-            if 'userId' in reservation:
-                user = db.get_user_by_id(reservation['userId'])
+            await db.hydrate_reservations([reservation])
             
             # Créer l'embed
-            embed = EmbedBuilder.create_reservation_embed(reservation, game, user)
+            embed = EmbedBuilder.create_reservation_embed(ReservationView.from_document(reservation))
             
-            # Envoyer le message
-            message = await self.channel.send(embed=embed)
-            
-            # Ajouter les réactions
-            await message.add_reaction(Config.EMOJIS['APPROVE'])
-            await message.add_reaction(Config.EMOJIS['REJECT'])
-            await message.add_reaction(Config.EMOJIS['INFO'])
+            # Envoyer l'embed et les boutons de modération en une seule requête
+            view = ReservationControls(reservation_id)
+            message = await self._send(embed=embed, view=view)
             
             # Sauvegarder l'ID du message Discord
-            db.add_discord_message_id(reservation_id, str(message.id))
+            await db.add_discord_message_id(reservation_id, str(message.id))
             
             logger.info(f"✅ Notification envoyée pour la réservation {reservation_id}")
             return message
@@ -66,63 +94,233 @@ class NotificationService:
             logger.error(f"❌ Erreur lors de l'envoi de la notification: {e}")
             return None
     
-    async def update_reservation_message(self, reservation_id, new_status):
-        """Met à jour le message Discord d'une réservation"""
+    async def claim_and_notify(self, reservation_id):
+        """Notifie une réservation après en avoir réservé l'envoi dans MongoDB
+
+        La prise est atomique (find_one_and_update) : deux boucles ou deux
+        instances du bot ne peuvent pas notifier la même réservation. Son bail
+        est prolongé tant que l'envoi attend (fenêtre de regroupement, file
+        d'envoi ralentie par les limites de Discord), pour qu'aucune autre
+        boucle ne la reprenne avant la fin de l'envoi. En cas d'échec de
+        l'envoi, la prise est libérée pour une nouvelle tentative.
+        Retourne (reservation, message) : reservation vaut None si la
+        réservation n'est pas à notifier (déjà notifiée, traitée ou prise
+        par une autre instance), message vaut None si l'envoi a échoué.
+        """
+        reservation = await db.claim_reservation_notification(
+            reservation_id, Config.INSTANCE_ID, Config.NOTIFICATION_CLAIM_LEASE
+        )
+        if not reservation:
+            return None, None
+        
+        renewal = asyncio.create_task(self._renew_claim(reservation_id))
         try:
-            # Récupérer la réservation
-            reservation = db.get_reservation_by_id(reservation_id)
-            if not reservation:
-                logger.error(f"❌ Réservation {reservation_id} introuvable")
-                return False
-            
-            # Récupérer l'ID du message Discord
-            discord_message_id = reservation.get('discord_message_id')
-            if not discord_message_id:
-                logger.warning(f"⚠️ Aucun message Discord associé à la réservation {reservation_id}")
-                return False
-            
-            # Récupérer le message
+            message = await self.notify_new_reservation(reservation)
+        finally:
+            renewal.cancel()
+        if message is None:
             try:
-                message = await self.channel.fetch_message(int(discord_message_id))
-            except:
-                logger.error(f"❌ Impossible de récupérer le message Discord {discord_message_id}")
-                return False
-            
-            # Mettre à jour l'embed
-            embed = message.embeds[0]
-            
-            # Changer la couleur selon le statut
-            if new_status == 'approved':
-                embed.color = Config.COLORS['APPROVED']
-                status_text = "✅ APPROUVÉ"
-            elif new_status == 'rejected':
-                embed.color = Config.COLORS['REJECTED']
-                status_text = "❌ REJETÉ"
+                await db.release_notification_claim(reservation_id, Config.INSTANCE_ID)
+            except Exception as e:
+                # Le bail expirera de lui-même
+                logger.error(f"❌ Impossible de libérer la notification de la réservation {reservation_id}: {e}")
+        return reservation, message
+    
+    async def _renew_claim(self, reservation_id):
+        """Prolonge la prise d'une réservation toutes les NOTIFICATION_CLAIM_LEASE / 3 secondes"""
+        while True:
+            await asyncio.sleep(Config.NOTIFICATION_CLAIM_LEASE / 3)
+            try:
+                if not await db.renew_notification_claim(reservation_id, Config.INSTANCE_ID, Config.NOTIFICATION_CLAIM_LEASE):
+                    logger.warning(f"⚠️ Prise de la notification de la réservation {reservation_id} perdue avant l'envoi")
+                    return
+            except Exception as e:
+                # Nouvelle tentative au prochain intervalle, avant l'expiration du bail
+                logger.error(f"❌ Impossible de prolonger la notification de la réservation {reservation_id}: {e}")
+    
+    async def notify_new_reservation(self, reservation):
+        """Notifie une nouvelle réservation (document) en regroupant les arrivées rapprochées
+
+        La première réservation part immédiatement et ouvre une fenêtre de
+        NOTIFICATION_COALESCE_WINDOW secondes. Les réservations arrivées pendant
+        la fenêtre sont envoyées à sa fermeture : en messages groupés si elles
+        sont au moins NOTIFICATION_BATCH_MIN, individuellement sinon. La fenêtre
+        reste ouverte tant que des réservations continuent d'arriver.
+        Retourne le message envoyé, ou None en cas d'échec.
+        """
+        if Config.NOTIFICATION_COALESCE_WINDOW <= 0:
+            return await self.send_reservation_notification(reservation)
+        
+        if self._burst_task is None:
+            self._burst_task = asyncio.create_task(self._run_burst_window())
+            return await self.send_reservation_notification(reservation)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._burst.append((reservation, future))
+        return await future
+    
+    async def _run_burst_window(self):
+        """Envoie les réservations accumulées à chaque fermeture de fenêtre"""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), Config.NOTIFICATION_COALESCE_WINDOW)
+                except asyncio.TimeoutError:
+                    pass
+                burst, self._burst = self._burst, []
+                if not burst:
+                    return
+                await self._flush_burst(burst)
+        finally:
+            self._burst_task = None
+            # Ne laisser aucun appelant en attente si la fenêtre est interrompue
+            for _, future in self._burst:
+                if not future.done():
+                    future.set_result(None)
+            self._burst = []
+    
+    async def _flush_burst(self, burst):
+        reservations = list({reservation['_id']: reservation for reservation, _ in burst}.values())
+        messages = {}
+        try:
+            if len(reservations) < Config.NOTIFICATION_BATCH_MIN:
+                results = await asyncio.gather(*(
+                    self.send_reservation_notification(reservation)
+                    for reservation in reservations
+                ))
+                messages = {reservation['_id']: message for reservation, message in zip(reservations, results)}
+            else:
+                messages = await self.send_reservation_batch(reservations)
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de l'envoi des notifications regroupées: {e}")
+        
+        for reservation, future in burst:
+            if not future.done():
+                future.set_result(messages.get(reservation['_id']))
+    
+    async def send_reservation_batch(self, reservations):
+        """Notifie plusieurs réservations (documents) dans des messages groupés
+
+        Chaque message regroupe jusqu'à BATCH_MAX_RESERVATIONS réservations :
+        un embed numéroté et une ligne de boutons par réservation. Toutes les
+        réservations d'un message reçoivent son ID comme discord_message_id.
+        Retourne {reservation_id: message ou None}.
+        """
+        await db.hydrate_reservations(reservations)
+        views = ReservationView.from_documents(reservations)
+        
+        # Répartir les réservations en respectant les limites d'un message
+        chunks = []
+        chunk_chars = 0
+        for view in views:
+            chars = len(EmbedBuilder.create_reservation_embed(view, BATCH_MAX_RESERVATIONS))
+            if not chunks or len(chunks[-1]) >= BATCH_MAX_RESERVATIONS or chunk_chars + chars > EMBED_MAX_TOTAL_CHARS:
+                chunks.append([])
+                chunk_chars = 0
+            chunks[-1].append(view)
+            chunk_chars += chars
+        
+        results = await asyncio.gather(*(self._send_batch_message(chunk) for chunk in chunks))
+        
+        messages = {}
+        for chunk, message in zip(chunks, results):
+            for view in chunk:
+                messages[view.id] = message
+        
+        sent = sum(1 for message in messages.values() if message)
+        logger.info(f"✅ Notification groupée envoyée pour {sent} réservation(s) en {len(chunks)} message(s)")
+        return messages
+    
+    async def _send_batch_message(self, views):
+        """Envoie un message groupé et l'associe à ses réservations"""
+        try:
+            if len(views) == 1:
+                embeds = [EmbedBuilder.create_reservation_embed(views[0])]
+                view = ReservationControls(views[0].id)
             else:
-                embed.color = Config.COLORS['PENDING']
-                status_text = "⏳ EN ATTENTE"
+                embeds = [EmbedBuilder.create_reservation_embed(v, position) for position, v in enumerate(views, 1)]
+                view = ReservationBatchControls([(v.id, True) for v in views])
             
-            # Mettre à jour le champ statut
-            for i, field in enumerate(embed.fields):
-                if field.name == "Statut":
-                    embed.set_field_at(i, name="Statut", value=status_text, inline=True)
-                    break
+            message = await self._send(embeds=embeds, view=view)
             
-            # Éditer le message
-            await message.edit(embed=embed)
+            if len(views) == 1:
+                await db.add_discord_message_id(views[0].id, str(message.id))
+            else:
+                await db.add_discord_message_ids([v.id for v in views], str(message.id))
+            return message
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de l'envoi d'une notification groupée: {e}")
+            return None
+    
+    async def update_reservation_messages(self, reservations):
+        """Met à jour les messages Discord de plusieurs réservations traitées
+
+        Les réservations sont regroupées par message : un message groupé n'est
+        récupéré et édité qu'une fois, quel que soit le nombre de ses
+        réservations traitées. Les éditions passent par la file d'envoi.
+        Retourne le nombre de messages mis à jour.
+        """
+        by_message = {}
+        for reservation in reservations:
+            discord_message_id = reservation.get('discord_message_id')
+            if discord_message_id:
+                by_message.setdefault(discord_message_id, {})[reservation['_id']] = reservation['status']
+        
+        results = await asyncio.gather(*(
+            self._edit_message_statuses(discord_message_id, statuses)
+            for discord_message_id, statuses in by_message.items()
+        ))
+        updated = sum(1 for success in results if success)
+        logger.info(f"✅ {updated}/{len(by_message)} message(s) Discord mis à jour")
+        return updated
+    
+    async def _edit_message_statuses(self, discord_message_id, statuses):
+        """Applique les statuts {reservation_id: statut} aux embeds et boutons d'un message
+
+        Ces éditions suivent une décision d'un admin : elles passent devant les
+        appels en attente de leur route.
+        """
+        try:
+            message = await self.dispatcher.submit(
+                lambda: self.channel.fetch_message(int(discord_message_id)),
+                FETCH_MESSAGE, self.channel.id, Priority.INTERACTIVE
+            )
+        except Exception:
+            logger.error(f"❌ Impossible de récupérer le message Discord {discord_message_id}")
+            return False
+        
+        try:
+            # Ne toucher que les embeds et les boutons des réservations concernées
+            # (un message groupé en contient plusieurs)
+            embeds = message.embeds
+            found = {}
+            for reservation_id, status in statuses.items():
+                index = find_reservation_embed(message, reservation_id)
+                if index is None:
+                    logger.warning(f"⚠️ Embed de la réservation {reservation_id} introuvable dans le message {discord_message_id}")
+                    continue
+                embeds[index] = EmbedBuilder.apply_status(embeds[index], status)
+                found[reservation_id] = status
+            if not found:
+                return False
+            view = controls_for_message(message, {
+                reservation_id: status == 'pending' for reservation_id, status in found.items()
+            })
             
-            logger.info(f"✅ Message Discord mis à jour pour la réservation {reservation_id}")
+            await self.dispatcher.submit(
+                lambda: message.edit(embeds=embeds, view=view),
+                EDIT_MESSAGE, self.channel.id, Priority.INTERACTIVE
+            )
             return True
-            
         except Exception as e:
-            logger.error(f"❌ Erreur lors de la mise à jour du message: {e}")
+            logger.error(f"❌ Erreur lors de la mise à jour du message {discord_message_id}: {e}")
             return False
     
     async def send_reminder_notification(self, reservation_id):
         """Envoie un rappel pour une réservation en attente"""
         try:
             # Récupérer la réservation
-            reservation = db.get_reservation_by_id(reservation_id)
+            reservation = await db.get_reservation_by_id(reservation_id)
             if not reservation:
                 return False
             
@@ -131,37 +329,10 @@ class NotificationService:
                 return False
             
             # Créer un embed de rappel
-            embed = discord.Embed(
-                title="⏰ Rappel - Réservation en attente",
-                description=f"La réservation {reservation_id} est en attente depuis plus de 24h",
-                color=Config.COLORS['WARNING'],
-                timestamp=datetime.utcnow()
-            )
-            
-            # Ajouter les informations de base
-            embed.add_field(
-                name="Début de réservation",
-                value=f"<t:{int(datetime.fromisoformat(str(reservation['startDate'])).timestamp())}:F>",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="Fin de réservation",
-                value=f"<t:{int(datetime.fromisoformat(str(reservation['endDate'])).timestamp())}:F>",
-                inline=True
-            )
-            
-            if reservation.get('notes'):
-                embed.add_field(
-                    name="Notes",
-                    value=reservation['notes'],
-                    inline=False
-                )
-            
-            embed.set_footer(text=f"ID: {reservation_id}")
+            embed = EmbedBuilder.create_reminder_embed(ReservationView.from_document(reservation))
             
             # Envoyer le rappel
-            await self.channel.send(embed=embed)
+            await self._send(Priority.BACKGROUND, embed=embed)
             
             logger.info(f"✅ Rappel envoyé pour la réservation {reservation_id}")
             return True
@@ -170,31 +341,37 @@ class NotificationService:
             logger.error(f"❌ Erreur lors de l'envoi du rappel: {e}")
             return False
     
+    async def send_reminder_digest(self, reservations):
+        """Envoie les rappels de plusieurs réservations en attente, regroupés
+
+        Les réservations sont réparties dans le moins de messages possible
+        (plusieurs embeds par message, un champ par réservation). Retourne les
+        IDs des réservations dont le rappel a été envoyé.
+        """
+        await db.hydrate_reservations(reservations)
+        views = ReservationView.from_documents(reservations)
+        messages = EmbedBuilder.create_reminder_digest(views, self.channel.guild.id, self.channel.id)
+        
+        async def send(embeds, ids):
+            try:
+                await self._send(Priority.BACKGROUND, embeds=embeds)
+                return ids
+            except Exception as e:
+                logger.error(f"❌ Erreur lors de l'envoi d'un rappel groupé: {e}")
+                return []
+        
+        results = await asyncio.gather(*(send(embeds, ids) for embeds, ids in messages))
+        reminded = [reservation_id for ids in results for reservation_id in ids]
+        
+        logger.info(f"✅ Rappel groupé envoyé pour {len(reminded)} réservation(s) en {len(messages)} message(s)")
+        return reminded
+    
     async def send_daily_summary(self):
         """Envoie un résumé quotidien des réservations"""
         try:
-            # Récupérer les réservations du jour
+            # Compter les réservations du jour par statut
             today = datetime.now().date()
-            all_reservations = db.get_reservations()
-            
-            today_reservations = []
-            for reservation in all_reservations:
-                reservation_date = datetime.fromisoformat(str(reservation['startDate'])).date()
-                if reservation_date == today:
-                    today_reservations.append(reservation)
-            
-            # Compter par statut
-            stats = {
-                'pending': 0,
-                'approved': 0,
-                'rejected': 0,
-                'total': len(today_reservations)
-            }
-            
-            for reservation in today_reservations:
-                status = reservation.get('status', 'unknown')
-                if status in stats:
-                    stats[status] += 1
+            stats = await get_daily_stats(today)
             
             # Créer l'embed de résumé
             embed = discord.Embed(
@@ -209,11 +386,11 @@ class NotificationService:
             embed.add_field(name="Approuvées", value=stats['approved'], inline=True)
             embed.add_field(name="Rejetées", value=stats['rejected'], inline=True)
             
-            if stats['total'] > 0:
-                approval_rate = (stats['approved'] / stats['total']) * 100
-                embed.add_field(name="Taux d'approbation", value=f"{approval_rate:.1f}%", inline=True)
+            rate = approval_rate(stats)
+            if rate is not None:
+                embed.add_field(name="Taux d'approbation", value=f"{rate:.1f}%", inline=True)
             
-            await self.channel.send(embed=embed)
+            await self._send(Priority.BACKGROUND, embed=embed)
             
             logger.info(f"✅ Résumé quotidien envoyé pour le {today}")
             return True
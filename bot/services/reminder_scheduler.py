@@ -0,0 +1,180 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime, timezone
+from database import db
+from utils.reservation_view import to_epoch
+from utils.metrics import LOOP_DURATION, LOOP_ERRORS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Délai (en secondes) avant de retenter un rappel dont l'envoi a échoué
+REMINDER_RETRY_DELAY = 300
+
+
+class ReminderScheduler:
+    """Planifie les rappels des réservations en attente
+
+    Les prochaines échéances sont gardées dans un tas binaire : le
+    planificateur dort exactement jusqu'à la plus proche. Chaque rappel envoyé
+    est enregistré dans last_reminded_at sur la réservation, ce qui fixe
+    l'échéance suivante (REMINDER_INTERVAL_HOURS plus tard) et évite de
+    renvoyer tous les rappels après un redémarrage.
+
+    Le planning n'est tenu que pendant que le planificateur tourne (sur le
+    leader en mode multi-instances) : schedule() est sans effet sinon, et
+    start() recharge les échéances depuis MongoDB.
+    """
+
+    def __init__(self, notification_service):
+        self.notification_service = notification_service
+        self._heap = []
+        # Échéance courante par réservation ; les entrées du tas qui ne
+        # correspondent plus à cette échéance sont ignorées
+        self._due = {}
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def start(self):
+        """Charge les réservations en attente et démarre le planificateur"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Arrête le planificateur et vide le planning"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self._due.clear()
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, reservation):
+        """Planifie (ou replanifie) le prochain rappel d'une réservation en attente"""
+        if not self.running:
+            return
+        if reservation.get('status', 'pending') != 'pending':
+            self.discard(reservation['_id'])
+            return
+
+        last_reminded = to_epoch(reservation.get('last_reminded_at'))
+        if last_reminded is not None:
+            due = last_reminded + Config.REMINDER_INTERVAL_HOURS * 3600
+        else:
+            pending_since = to_epoch(reservation.get('createdAt') or reservation.get('startDate'))
+            if pending_since is None:
+                return
+            due = pending_since + Config.REMINDER_DELAY_HOURS * 3600
+
+        self._push(reservation['_id'], due)
+
+    def discard(self, reservation_id):
+        """Retire une réservation traitée du planning"""
+        self._due.pop(reservation_id, None)
+
+    def _push(self, reservation_id, due):
+        previous = self._due.get(reservation_id)
+        self._due[reservation_id] = due
+        heapq.heappush(self._heap, (due, next(self._sequence), reservation_id))
+        # Réveiller le planificateur si cette échéance devient la plus proche
+        if previous is None or due < previous:
+            self._wakeup.set()
+
+    def _next_due(self):
+        """Échéance la plus proche, en éliminant les entrées obsolètes du tas"""
+        while self._heap:
+            due, _, reservation_id = self._heap[0]
+            if self._due.get(reservation_id) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now):
+        """Retire et retourne les réservations dont l'échéance est passée"""
+        due_ids = []
+        while True:
+            due = self._next_due()
+            if due is None or due > now:
+                return due_ids
+            _, _, reservation_id = heapq.heappop(self._heap)
+            del self._due[reservation_id]
+            due_ids.append(reservation_id)
+
+    async def _run(self):
+        try:
+            for reservation in await db.get_reminder_candidates():
+                self.schedule(reservation)
+            logger.info(f"Planificateur de rappels démarré: {len(self)} réservation(s) en attente")
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement des rappels: {e}")
+
+        while True:
+            self._wakeup.clear()
+            next_due = self._next_due()
+            timeout = None if next_due is None else max(0, next_due - time.time())
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                # Nouvelle échéance plus proche : recalculer l'attente
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            due_ids = self._pop_due(time.time())
+            try:
+                with LOOP_DURATION.labels('reminder_scheduler').time():
+                    await self._send_due(due_ids)
+            except Exception as e:
+                LOOP_ERRORS.labels('reminder_scheduler').inc()
+                logger.error(f"Erreur lors de l'envoi des rappels: {e}")
+                # Remettre au planning les rappels retirés, sauf ceux replanifiés entre-temps
+                retry_at = time.time() + REMINDER_RETRY_DELAY
+                for reservation_id in due_ids:
+                    if reservation_id not in self._due:
+                        self._push(reservation_id, retry_at)
+
+    async def _send_due(self, reservation_ids):
+        """Envoie les rappels échus et enregistre leur date d'envoi"""
+        if not reservation_ids:
+            return
+
+        # Ignorer les réservations traitées depuis leur planification
+        pending = await db.get_reservations_by_ids(reservation_ids, status='pending')
+        pending_ids = [reservation['_id'] for reservation in pending]
+
+        if Config.REMINDER_DIGEST:
+            reminded = await self.notification_service.send_reminder_digest(pending) if pending else []
+        else:
+            # Les envois sont cadencés par la file d'envoi du service de notification
+            results = await asyncio.gather(*(
+                self.notification_service.send_reminder_notification(reservation_id)
+                for reservation_id in pending_ids
+            ))
+            reminded = [reservation_id for reservation_id, sent in zip(pending_ids, results) if sent]
+
+        retry_at = time.time() + REMINDER_RETRY_DELAY
+        sent_ids = set(reminded)
+        for reservation_id in pending_ids:
+            if reservation_id not in sent_ids:
+                self._push(reservation_id, retry_at)
+
+        if reminded:
+            # Replanifier avant l'écriture : un échec de celle-ci ne doit pas
+            # faire renvoyer des rappels déjà partis
+            now = datetime.now(timezone.utc)
+            for reservation_id in reminded:
+                self._push(reservation_id, now.timestamp() + Config.REMINDER_INTERVAL_HOURS * 3600)
+            try:
+                await db.mark_reminded(reminded, now)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement de {len(reminded)} rappel(s) envoyé(s): {e}")
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+from datetime import timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from database import db
+from utils.metrics import LOOP_DURATION, LOOP_ERRORS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Clé du document de la collection bot_state qui mémorise la progression
+STATE_KEY = 'reservation_watcher'
+
+# Code renvoyé par MongoDB quand les change streams ne sont pas disponibles (pas de replica set)
+CHANGE_STREAM_UNSUPPORTED = 40573
+# Codes renvoyés quand le resume token n'est plus exploitable (oplog tourné, token invalide)
+RESUME_TOKEN_LOST = {260, 280, 286}
+
+# Nouvelles réservations en attente (ou repassées en attente sans message Discord),
+# et changements de statut pour tenir à jour le planning des rappels. Les prises et
+# libérations de notify_claim par le bot lui-même sont ignorées.
+CHANGE_STREAM_PIPELINE = [
+    {'$match': {
+        'operationType': {'$in': ['insert', 'update', 'replace']},
+        '$or': [
+            {
+                'fullDocument.status': 'pending',
+                'fullDocument.discord_message_id': None,
+                'updateDescription.updatedFields.notify_claim': {'$exists': False},
+                'updateDescription.removedFields': {'$ne': 'notify_claim'}
+            },
+            {'updateDescription.updatedFields.status': {'$exists': True}}
+        ]
+    }}
+]
+
+# Fenêtre de recouvrement du poll incrémental : des _id générés par plusieurs
+# processus ne sont pas strictement croissants dans la même seconde
+POLL_OVERLAP = timedelta(seconds=5)
+
+# Intervalle minimal entre deux sauvegardes du resume token quand aucun événement n'arrive
+RESUME_TOKEN_SAVE_INTERVAL = 60
+
+
+class ReservationWatcher:
+    """Détecte les nouvelles réservations et déclenche leur notification
+
+    Utilise un change stream MongoDB sur la collection reservations avec un
+    resume token persisté, pour reprendre sans perte ni doublon après un
+    redémarrage. Sans replica set, bascule sur un poll incrémental indexé sur
+    _id (high-water mark).
+
+    Toutes les NOTIFICATION_CLAIM_LEASE secondes, les réservations non
+    notifiées sont balayées en entier : celles dont l'envoi a échoué, ou dont
+    la prise a expiré (instance arrêtée en cours d'envoi), sont reprises.
+
+    Avec un coordinateur en mode partitionné, seules les réservations dont
+    cette instance est responsable sont notifiées ; toutes restent planifiées
+    pour les rappels. Chaque instance suit alors sa propre progression
+    (resume token et high-water mark sous STATE_KEY:INSTANCE_ID).
+    """
+
+    def __init__(self, notification_service, reminder_scheduler=None, coordinator=None):
+        self.notification_service = notification_service
+        self.reminder_scheduler = reminder_scheduler
+        self.coordinator = coordinator
+        # En mode partitionné, toutes les instances surveillent en même temps :
+        # une progression partagée serait écrasée par chacune
+        self.state_key = f"{STATE_KEY}:{Config.INSTANCE_ID}" if Config.COORDINATOR_PARTITION else STATE_KEY
+        self.mode = None
+        self._task = None
+        # Notifications lancées depuis le change stream, et réservations en cours de notification
+        self._notifications = set()
+        self._in_flight = set()
+
+    def start(self):
+        """Démarre la surveillance en arrière-plan"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Arrête la surveillance"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for task in self._notifications:
+            task.cancel()
+
+    async def _run(self):
+        """Boucle principale : change stream, avec repli sur le poll incrémental"""
+        while True:
+            try:
+                await self._watch()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.warning("Change streams indisponibles (pas de replica set), passage au poll incrémental")
+                    await self._poll()
+                    return
+                if e.code in RESUME_TOKEN_LOST:
+                    logger.warning(f"Resume token inutilisable, reprise depuis l'état courant: {e}")
+                    await db.set_bot_state(self.state_key, {'resume_token': None})
+                    continue
+                logger.error(f"Erreur du change stream des réservations: {e}")
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.error(f"Erreur du change stream des réservations: {e}")
+            except Exception as e:
+                logger.error(f"Erreur lors de la surveillance des réservations: {e}")
+
+            await asyncio.sleep(Config.RESERVATION_POLL_INTERVAL)
+
+    async def _watch(self):
+        """Consomme le change stream de la collection reservations"""
+        state = await db.get_bot_state(self.state_key)
+        collection = db.get_collection('reservations')
+
+        # Ouvrir le stream avant le rattrapage pour ne rien perdre entre les deux
+        stream = await collection.watch(
+            CHANGE_STREAM_PIPELINE,
+            full_document='updateLookup',
+            resume_after=state.get('resume_token'),
+            max_await_time_ms=1000
+        )
+        self.mode = 'change_stream'
+        logger.info("Surveillance des réservations par change stream démarrée")
+
+        try:
+            await self._catch_up()
+
+            loop = asyncio.get_running_loop()
+            last_saved = last_swept = loop.time()
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    await self._handle_change(change)
+
+                if loop.time() - last_swept >= Config.NOTIFICATION_CLAIM_LEASE:
+                    self._spawn(self._catch_up())
+                    last_swept = loop.time()
+
+                # Sauvegarder le token après chaque événement, et périodiquement sinon
+                if change is not None or loop.time() - last_saved >= RESUME_TOKEN_SAVE_INTERVAL:
+                    await db.set_bot_state(self.state_key, {'resume_token': stream.resume_token})
+                    last_saved = loop.time()
+        finally:
+            await stream.close()
+
+    async def _poll(self):
+        """Poll incrémental des réservations non notifiées au-delà du high-water mark"""
+        self.mode = 'poll'
+        state = await db.get_bot_state(self.state_key)
+        high_water = state.get('high_water_mark')
+        logger.info("Surveillance des réservations par poll incrémental démarrée")
+
+        loop = asyncio.get_running_loop()
+        last_swept = loop.time()
+        while True:
+            try:
+                with LOOP_DURATION.labels('reservation_poll').time():
+                    after_id = high_water
+                    if loop.time() - last_swept >= Config.NOTIFICATION_CLAIM_LEASE:
+                        # Balayage complet : reprendre les envois échoués ou abandonnés
+                        after_id = None
+                        last_swept = loop.time()
+                    elif isinstance(after_id, ObjectId):
+                        after_id = ObjectId.from_datetime(after_id.generation_time - POLL_OVERLAP)
+
+                    reservations = await db.get_unnotified_reservations(after_id)
+                    if self.reminder_scheduler:
+                        for reservation in reservations:
+                            self.reminder_scheduler.schedule(reservation)
+
+                    # Notifications lancées ensemble pour que le service puisse les regrouper
+                    results = await asyncio.gather(*(self._notify(reservation['_id']) for reservation in reservations))
+
+                    # Le high-water mark n'avance pas au-delà d'un envoi en échec,
+                    # pour que la réservation soit retentée au prochain passage
+                    advance = True
+                    new_high_water = high_water
+                    for reservation, sent in zip(reservations, results):
+                        if not sent:
+                            advance = False
+                        elif advance and (new_high_water is None or reservation['_id'] > new_high_water):
+                            new_high_water = reservation['_id']
+
+                    if new_high_water != high_water:
+                        high_water = new_high_water
+                        await db.set_bot_state(self.state_key, {'high_water_mark': high_water})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOOP_ERRORS.labels('reservation_poll').inc()
+                logger.error(f"Erreur lors de la vérification des nouvelles réservations: {e}")
+
+            await asyncio.sleep(Config.RESERVATION_POLL_INTERVAL)
+
+    async def _catch_up(self):
+        """Notifie les réservations non notifiées (arrivées pendant un arrêt, ou dont l'envoi a échoué)"""
+        with LOOP_DURATION.labels('reservation_catch_up').time():
+            reservations = await db.get_unnotified_reservations()
+            await asyncio.gather(*(self._notify(reservation['_id']) for reservation in reservations))
+
+    async def _handle_change(self, change):
+        """Traite un événement du change stream"""
+        reservation = change.get('fullDocument')
+        if reservation:
+            # Statut changé sur le site : les réactions sur l'ancien message doivent le voir
+            db.message_index.update_status(reservation['_id'], reservation.get('status'))
+            # Planifier le rappel, ou l'annuler si la réservation a été traitée
+            # (par le bot ou le site), quelle que soit l'instance qui notifie
+            if self.reminder_scheduler:
+                self.reminder_scheduler.schedule(reservation)
+            if reservation.get('status') != 'pending':
+                return
+        
+        # Ne pas bloquer le stream pendant la fenêtre de regroupement des
+        # notifications : les événements suivants doivent pouvoir la rejoindre.
+        # Une notification perdue par un arrêt est rattrapée au redémarrage.
+        self._spawn(self._notify(change['documentKey']['_id']))
+    
+    def _spawn(self, coroutine):
+        """Lance une notification en tâche de fond, annulée à l'arrêt du watcher"""
+        task = asyncio.create_task(coroutine)
+        self._notifications.add(task)
+        task.add_done_callback(self._notification_done)
+    
+    def _notification_done(self, task):
+        self._notifications.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Erreur lors de la notification d'une réservation: {task.exception()}")
+    
+    async def _notify(self, reservation_id):
+        """Envoie la notification si la réservation en a toujours besoin"""
+        if reservation_id in self._in_flight:
+            return True
+        if self.coordinator and not self.coordinator.owns(reservation_id):
+            return True
+
+        self._in_flight.add(reservation_id)
+        try:
+            # Un événement peut être rejoué après une reprise, ou traité par une
+            # autre instance : la prise atomique vérifie l'état courant
+            reservation, message = await self.notification_service.claim_and_notify(reservation_id)
+        finally:
+            self._in_flight.discard(reservation_id)
+
+        if reservation is None:
+            return True
+        if message is None:
+            return False
+
+        logger.info(f"Nouvelle réservation détectée et notifiée: {reservation_id}")
+        if self.reminder_scheduler:
+            self.reminder_scheduler.schedule(reservation)
+        return True
@@ -0,0 +1,31 @@
+from datetime import datetime, time, timedelta
+from database import db
+
+# Statuts affichés dans les statistiques
+STATUSES = ('pending', 'approved', 'rejected')
+
+
+async def get_reservation_stats(start=None, end=None):
+    """Statistiques des réservations par statut, calculées par agrégation MongoDB
+
+    Retourne un dict {'pending', 'approved', 'rejected', 'total'}. Le total
+    inclut les réservations dont le statut n'est pas listé.
+    """
+    counts = await db.count_reservations_by_status(start, end)
+    
+    stats = {status: counts.get(status, 0) for status in STATUSES}
+    stats['total'] = sum(counts.values())
+    return stats
+
+
+async def get_daily_stats(day):
+    """Statistiques des réservations qui commencent le jour donné"""
+    start = datetime.combine(day, time.min)
+    return await get_reservation_stats(start, start + timedelta(days=1))
+
+
+def approval_rate(stats):
+    """Pourcentage de réservations approuvées, ou None s'il n'y en a aucune"""
+    if stats['total'] <= 0:
+        return None
+    return (stats['approved'] / stats['total']) * 100
@@ -0,0 +1,40 @@
+"""Fixtures communes : base MongoDB en mémoire (celle des benchmarks)"""
+
+import os
+import sys
+
+import pytest
+
+# Les modules du bot s'importent depuis bot/ (comme dans main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_mongo import FakeMongoClient
+from database import db
+from utils.message_index import MessageIndex
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """La base globale du bot, branchée sur une base en mémoire vide"""
+    client = FakeMongoClient()
+    monkeypatch.setattr(db, 'client', client)
+    monkeypatch.setattr(db, 'db', client['test'])
+    monkeypatch.setattr(db, 'message_index', MessageIndex())
+    for cache in db.caches.values():
+        cache.clear()
+    db.unknown_messages.clear()
+    return db
+
+
+@pytest.fixture
+def discord_env(monkeypatch):
+    """Salon des notifications simulé, sans latence ni limite de débit par défaut"""
+    from benchmarks.fake_discord import FakeBot, FakeChannel, FakeGuild, FakeMember, FakeRest, snowflake
+    from config import Config
+
+    rest = FakeRest(latency=0.0, jitter=0.0, rate_limits={})
+    guild = FakeGuild(snowflake(), rest)
+    bot_user = guild.add_member(FakeMember(snowflake(), Config.BOT_NAME, bot=True))
+    channel = FakeChannel(snowflake(), guild, rest, author=bot_user)
+    monkeypatch.setattr(Config, 'CHANNEL_ID', channel.id)
+    return FakeBot(guild, channel, bot_user)
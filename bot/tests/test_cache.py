@@ -0,0 +1,47 @@
+"""Cache LRU à expiration (TTLCache)"""
+
+from utils import cache as cache_module
+from utils.cache import MISSING, TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set('a', 1)
+
+    now[0] += 4
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is MISSING
+    assert len(cache) == 0
+
+
+def test_falsy_values_are_cached():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('absent', None)
+
+    assert cache.get('absent') is None
+
+
+def test_invalidate_and_stats():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.invalidate('a')
+    cache.get('a')
+
+    assert cache.stats() == {'size': 0, 'maxsize': 10, 'hits': 1, 'misses': 1, 'hit_rate': 50.0}
@@ -0,0 +1,51 @@
+"""Répartition des réservations entre instances (Coordinator.owns)"""
+
+from bson import ObjectId
+
+from config import Config
+from services.coordinator import Coordinator
+
+
+def coordinator(instance_id, members, monkeypatch):
+    monkeypatch.setattr(Config, 'INSTANCE_ID', instance_id)
+    instance = Coordinator()
+    instance.members = members
+    return instance
+
+
+def test_every_reservation_has_exactly_one_owner(monkeypatch):
+    monkeypatch.setattr(Config, 'COORDINATOR_PARTITION', True)
+    members = ['bot-a', 'bot-b', 'bot-c']
+    instances = [coordinator(member, members, monkeypatch) for member in members]
+
+    reservation_ids = [ObjectId() for _ in range(300)]
+    owners = [[instance.instance_id for instance in instances if instance.owns(reservation_id)] for reservation_id in reservation_ids]
+
+    assert all(len(owner) == 1 for owner in owners)
+    # Chaque instance reçoit une part de la charge
+    assert {owner[0] for owner in owners} == set(members)
+
+
+def test_ownership_is_stable_for_a_given_membership(monkeypatch):
+    monkeypatch.setattr(Config, 'COORDINATOR_PARTITION', True)
+    reservation_id = ObjectId()
+    first = coordinator('bot-a', ['bot-a', 'bot-b'], monkeypatch)
+    second = coordinator('bot-a', ['bot-a', 'bot-b'], monkeypatch)
+
+    assert first.owns(reservation_id) == second.owns(reservation_id)
+    # L'ID sous forme de chaîne désigne la même réservation
+    assert first.owns(reservation_id) == first.owns(str(reservation_id))
+
+
+def test_owns_everything_without_partitioning(monkeypatch):
+    monkeypatch.setattr(Config, 'COORDINATOR_PARTITION', False)
+    instance = coordinator('bot-a', ['bot-a', 'bot-b'], monkeypatch)
+
+    assert all(instance.owns(ObjectId()) for _ in range(20))
+
+
+def test_owns_everything_until_registered(monkeypatch):
+    monkeypatch.setattr(Config, 'COORDINATOR_PARTITION', True)
+    instance = coordinator('bot-c', ['bot-a', 'bot-b'], monkeypatch)
+
+    assert all(instance.owns(ObjectId()) for _ in range(20))
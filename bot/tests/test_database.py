@@ -0,0 +1,144 @@
+"""Opérations atomiques et pagination de Database, sur la base en mémoire"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+
+def pending_reservation(start_date=None, **fields):
+    return {
+        '_id': ObjectId(),
+        'status': 'pending',
+        'startDate': start_date or datetime(2026, 1, 1, tzinfo=timezone.utc),
+        'discord_message_id': None,
+        **fields
+    }
+
+
+async def insert(db, *reservations):
+    await db.get_collection('reservations').insert_many(list(reservations))
+
+
+def test_transition_only_one_concurrent_decision_wins(fake_db):
+    async def scenario():
+        reservation = pending_reservation()
+        await insert(fake_db, reservation)
+        results = await asyncio.gather(
+            fake_db.transition_reservation_status(reservation['_id'], 'approved'),
+            fake_db.transition_reservation_status(reservation['_id'], 'rejected')
+        )
+        stored = await fake_db.get_reservation_by_id(reservation['_id'])
+        return results, stored
+
+    results, stored = asyncio.run(scenario())
+    winners = [result for result in results if result is not None]
+    assert len(winners) == 1
+    assert stored['status'] == winners[0]['status']
+
+
+def test_transition_requires_expected_status(fake_db):
+    async def scenario():
+        reservation = pending_reservation(status='approved')
+        await insert(fake_db, reservation)
+        refused = await fake_db.transition_reservation_status(reservation['_id'], 'rejected')
+        accepted = await fake_db.transition_reservation_status(
+            reservation['_id'], 'rejected', admin_notes='annulée', from_status='approved'
+        )
+        missing = await fake_db.transition_reservation_status(ObjectId(), 'approved')
+        return refused, accepted, missing
+
+    refused, accepted, missing = asyncio.run(scenario())
+    assert refused is None
+    assert accepted['status'] == 'rejected'
+    assert accepted['admin_notes'] == 'annulée'
+    assert missing is None
+
+
+def test_claim_is_exclusive_until_released(fake_db):
+    async def scenario():
+        reservation = pending_reservation()
+        await insert(fake_db, reservation)
+        claims = await asyncio.gather(
+            fake_db.claim_reservation_notification(reservation['_id'], 'a', 60),
+            fake_db.claim_reservation_notification(reservation['_id'], 'b', 60)
+        )
+        winner = next(claim['notify_claim']['owner'] for claim in claims if claim)
+        loser = 'b' if winner == 'a' else 'a'
+        # Seul le détenteur peut libérer la prise
+        await fake_db.release_notification_claim(reservation['_id'], loser)
+        blocked = await fake_db.claim_reservation_notification(reservation['_id'], loser, 60)
+        await fake_db.release_notification_claim(reservation['_id'], winner)
+        reclaimed = await fake_db.claim_reservation_notification(reservation['_id'], loser, 60)
+        return claims, blocked, reclaimed
+
+    claims, blocked, reclaimed = asyncio.run(scenario())
+    assert sum(1 for claim in claims if claim) == 1
+    assert blocked is None
+    assert reclaimed is not None
+
+
+def test_claim_taken_over_after_lease_expiry(fake_db):
+    async def scenario():
+        reservation = pending_reservation()
+        await insert(fake_db, reservation)
+        first = await fake_db.claim_reservation_notification(reservation['_id'], 'a', 60)
+        during_lease = await fake_db.claim_reservation_notification(reservation['_id'], 'b', 60)
+        # Bail expiré : l'instance a s'est arrêtée sans libérer la prise
+        await fake_db.get_collection('reservations').update_one(
+            {'_id': reservation['_id']},
+            {'$set': {'notify_claim.expires_at': datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        after_lease = await fake_db.claim_reservation_notification(reservation['_id'], 'b', 60)
+        return first, during_lease, after_lease
+
+    first, during_lease, after_lease = asyncio.run(scenario())
+    assert first['notify_claim']['owner'] == 'a'
+    assert during_lease is None
+    assert after_lease['notify_claim']['owner'] == 'b'
+
+
+def test_claim_skips_notified_or_processed_reservations(fake_db):
+    async def scenario():
+        notified = pending_reservation(discord_message_id='123')
+        processed = pending_reservation(status='approved')
+        await insert(fake_db, notified, processed)
+        return await asyncio.gather(
+            fake_db.claim_reservation_notification(notified['_id'], 'a', 60),
+            fake_db.claim_reservation_notification(processed['_id'], 'a', 60)
+        )
+
+    assert asyncio.run(scenario()) == [None, None]
+
+
+def test_reservations_pages_cover_every_reservation_once(fake_db):
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    # Plusieurs réservations par date : la clé (startDate, _id) les départage
+    reservations = [pending_reservation(base + timedelta(days=index // 3)) for index in range(23)]
+    reservations.append(pending_reservation(base, status='approved'))
+
+    async def scenario():
+        await insert(fake_db, *reservations)
+        pages = []
+        page, has_more = await fake_db.get_reservations_page(limit=5)
+        pages.append(page)
+        while has_more:
+            last = page[-1]
+            page, has_more = await fake_db.get_reservations_page(after=(last['startDate'], last['_id']), limit=5)
+            pages.append(page)
+
+        backwards = []
+        page = pages[-1]
+        while True:
+            first = page[0]
+            page, has_more = await fake_db.get_reservations_page(before=(first['startDate'], first['_id']), limit=5)
+            backwards.append(page)
+            if not has_more:
+                return pages, backwards
+
+    pages, backwards = asyncio.run(scenario())
+    expected = [r['_id'] for r in sorted(reservations[:-1], key=lambda r: (r['startDate'], r['_id']))]
+    assert [r['_id'] for page in pages for r in page] == expected
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    # En arrière, on retrouve les pages précédentes dans le même ordre
+    assert [[r['_id'] for r in page] for page in backwards] == [[r['_id'] for r in page] for page in reversed(pages[:-1])]
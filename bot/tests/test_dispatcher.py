@@ -0,0 +1,114 @@
+"""File d'envoi des appels REST Discord (DiscordDispatcher)"""
+
+import asyncio
+
+import pytest
+
+from services.dispatcher import DiscordDispatcher, Priority, EDIT_MESSAGE, SEND_MESSAGE
+
+
+def test_submit_fails_when_not_running():
+    async def scenario():
+        dispatcher = DiscordDispatcher(concurrency=1)
+        with pytest.raises(RuntimeError):
+            await dispatcher.submit(lambda: asyncio.sleep(0), SEND_MESSAGE, 1)
+        dispatcher.start()
+        dispatcher.stop()
+        with pytest.raises(RuntimeError):
+            await dispatcher.submit(lambda: asyncio.sleep(0), SEND_MESSAGE, 1)
+
+    asyncio.run(scenario())
+
+
+def test_stop_fails_queued_and_running_calls():
+    async def scenario():
+        dispatcher = DiscordDispatcher(concurrency=1)
+        dispatcher.start()
+        blocked = asyncio.Event()
+        calls = [
+            asyncio.create_task(dispatcher.submit(blocked.wait, SEND_MESSAGE, 1))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        assert dispatcher.queue_depth == 2
+        dispatcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+        return dispatcher, results
+
+    dispatcher, results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert dispatcher.queue_depth == 0
+
+
+def test_calls_run_by_priority_then_arrival():
+    async def scenario():
+        dispatcher = DiscordDispatcher(concurrency=1)
+        dispatcher.start()
+        order = []
+        release = asyncio.Event()
+
+        def call(name):
+            async def run():
+                order.append(name)
+            return run
+
+        # Le premier appel occupe l'unique worker pendant que les autres s'accumulent
+        first = asyncio.create_task(dispatcher.submit(release.wait, SEND_MESSAGE, 1))
+        await asyncio.sleep(0.01)
+        calls = [
+            asyncio.create_task(dispatcher.submit(call(name), SEND_MESSAGE, 1, priority))
+            for name, priority in [
+                ('notification-1', Priority.NOTIFICATION),
+                ('background', Priority.BACKGROUND),
+                ('interactive', Priority.INTERACTIVE),
+                ('notification-2', Priority.NOTIFICATION)
+            ]
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, *calls)
+        dispatcher.stop()
+        return order
+
+    assert asyncio.run(scenario()) == ['interactive', 'notification-1', 'notification-2', 'background']
+
+
+def test_concurrency_is_bounded_per_route():
+    async def scenario():
+        dispatcher = DiscordDispatcher(concurrency=2)
+        dispatcher.start()
+        running = {'now': 0, 'peak': 0}
+
+        async def call():
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+            await asyncio.sleep(0.01)
+            running['now'] -= 1
+
+        await asyncio.gather(*(dispatcher.submit(call, SEND_MESSAGE, 1) for _ in range(6)))
+        dispatcher.stop()
+        return running['peak']
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_blocked_route_does_not_delay_other_routes():
+    async def scenario():
+        dispatcher = DiscordDispatcher(concurrency=1)
+        dispatcher.start()
+        blocked = asyncio.Event()
+        # Arriéré de notifications sur le bucket épuisé des envois du salon 1
+        backlog = [asyncio.create_task(dispatcher.submit(blocked.wait, SEND_MESSAGE, 1)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+
+        async def edit():
+            return 'edited'
+
+        edited = await asyncio.wait_for(dispatcher.submit(edit, EDIT_MESSAGE, 1, Priority.INTERACTIVE), 1)
+        other_channel = await asyncio.wait_for(dispatcher.submit(edit, SEND_MESSAGE, 2), 1)
+        blocked.set()
+        await asyncio.gather(*backlog)
+        dispatcher.stop()
+        return edited, other_channel
+
+    assert asyncio.run(scenario()) == ('edited', 'edited')
@@ -0,0 +1,99 @@
+"""Index des messages de notification et son chargement depuis MongoDB"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from config import Config
+from utils.message_index import MessageIndex
+
+
+def notified(message_id, status='pending', created=None):
+    """Réservation notifiée ; created fixe la date de création portée par son _id"""
+    reservation_id = ObjectId.from_datetime(created) if created else ObjectId()
+    return {'_id': reservation_id, 'status': status, 'discord_message_id': message_id}
+
+
+def test_second_reservation_turns_message_into_batch():
+    index = MessageIndex()
+    first, second = ObjectId(), ObjectId()
+    index.track('1', first, 'pending')
+    assert index.get(1) == {'reservation_id': first, 'status': 'pending'}
+
+    index.track('1', second, 'pending')
+    # Un message groupé est suivi mais ne désigne pas une réservation unique
+    assert '1' in index
+    assert index.get('1') is None
+    assert len(index) == 1
+
+
+def test_update_status_follows_reservation():
+    index = MessageIndex()
+    reservation_id = ObjectId()
+    index.track('1', reservation_id, 'pending')
+    index.update_status(reservation_id, 'approved')
+    index.update_status(ObjectId(), 'rejected')
+
+    assert index.get('1')['status'] == 'approved'
+
+
+def test_warm_loads_pending_and_recent_messages_only(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, 'MESSAGE_INDEX_WINDOW_DAYS', 7)
+    old = datetime.now(timezone.utc) - timedelta(days=30)
+    reservations = [
+        notified('1'),
+        notified('2', 'approved'),
+        notified('3', 'pending', old),
+        notified('4', 'approved', old - timedelta(days=1)),
+        notified(None)
+    ]
+
+    async def scenario():
+        await fake_db.get_collection('reservations').insert_many(reservations)
+        await fake_db.warm_message_index()
+
+    asyncio.run(scenario())
+    assert len(fake_db.message_index) == 3
+    assert '4' not in fake_db.message_index
+
+
+def test_messages_outside_the_window_are_loaded_on_demand(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, 'MESSAGE_INDEX_WINDOW_DAYS', 7)
+    old = notified('4', 'approved', datetime.now(timezone.utc) - timedelta(days=30))
+
+    async def scenario():
+        await fake_db.get_collection('reservations').insert_one(old)
+        await fake_db.warm_message_index()
+        assert '4' not in fake_db.message_index
+        return await fake_db.resolve_tracked_message(4)
+
+    assert asyncio.run(scenario()) == {'reservation_id': old['_id'], 'status': 'approved'}
+    assert '4' in fake_db.message_index
+
+
+def test_unknown_messages_are_not_looked_up_again(fake_db):
+    async def scenario():
+        first = await fake_db.resolve_tracked_message(5)
+        # Arrivé après la première recherche : masqué par le cache négatif
+        await fake_db.get_collection('reservations').insert_one(notified('5'))
+        cached = await fake_db.resolve_tracked_message(5)
+        fake_db.unknown_messages.clear()
+        found = await fake_db.resolve_tracked_message(5)
+        return first, cached, found
+
+    first, cached, found = asyncio.run(scenario())
+    assert first is None
+    assert cached is None
+    assert found['status'] == 'pending'
+
+
+def test_batch_messages_are_resolved_as_batches(fake_db):
+    reservations = [notified('6'), notified('6')]
+
+    async def scenario():
+        await fake_db.get_collection('reservations').insert_many(reservations)
+        return await fake_db.resolve_tracked_message('6')
+
+    assert asyncio.run(scenario()) is None
+    assert '6' in fake_db.message_index
@@ -0,0 +1,77 @@
+"""Actions de modération groupées (apply_bulk_decision)"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from database import db
+from services.moderation import apply_bulk_decision, parse_reservation_ids
+from services.notification_service import NotificationService
+
+
+def reservation(status='pending'):
+    return {
+        '_id': ObjectId(),
+        'status': status,
+        'startDate': datetime(2026, 1, 1, tzinfo=timezone.utc),
+        'discord_message_id': None
+    }
+
+
+def status_of(embed):
+    """Statut affiché par l'embed, None s'il n'a pas encore été modifié"""
+    return next((field.value for field in embed.fields if field.name == "Statut"), None)
+
+
+def test_bulk_decision_updates_pending_reservations_and_their_message(fake_db, discord_env):
+    pending = [reservation() for _ in range(3)]
+    kept = reservation()
+    already = reservation('rejected')
+    missing = ObjectId()
+
+    async def scenario():
+        service = NotificationService(discord_env)
+        await service.initialize()
+        await db.get_collection('reservations').insert_many(pending + [kept, already])
+        await service.send_reservation_batch(pending + [kept])
+        outcomes = await apply_bulk_decision(
+            [r['_id'] for r in pending] + [already['_id'], missing], 'approve', 'admin', service
+        )
+        service.dispatcher.stop()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert [outcomes[r['_id']][0] for r in pending] == ['updated'] * 3
+    assert outcomes[already['_id']][0] == 'rejected'
+    assert outcomes[missing] == ('not_found', None)
+
+    # Un seul message groupé, édité une fois : l'embed de la réservation non traitée est intact
+    message, = discord_env.channel.messages.values()
+    assert [status_of(embed) for embed in message.embeds] == ["✅ APPROUVÉ"] * 3 + [None]
+    # Boutons Approuver/Rejeter désactivés pour les réservations traitées
+    assert [[button.disabled for button in row.children[:2]] for row in message.components] == [[True, True]] * 3 + [[False, False]]
+    assert discord_env.guild.rest.calls['PATCH /channels/:id/messages/:id'] == 1
+
+
+def test_bulk_decision_without_notification_service(fake_db):
+    pending = reservation()
+
+    async def scenario():
+        await db.get_collection('reservations').insert_one(pending)
+        outcomes = await apply_bulk_decision([pending['_id'], pending['_id']], 'reject', 'admin')
+        stored = await db.get_reservation_by_id(pending['_id'])
+        return outcomes, stored
+
+    outcomes, stored = asyncio.run(scenario())
+    assert list(outcomes) == [pending['_id']]
+    assert stored['status'] == 'rejected'
+    assert 'action groupée' in stored['admin_notes']
+
+
+def test_parse_reservation_ids():
+    first, second = ObjectId(), ObjectId()
+    ids, invalid = parse_reservation_ids(f"{first}, {second} abc {first}")
+
+    assert ids == [first, second]
+    assert invalid == ['abc']
@@ -0,0 +1,143 @@
+"""Envoi des notifications : prise des réservations et fenêtre de regroupement"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from config import Config
+from database import db
+from services.notification_service import NotificationService
+
+
+def pending_reservation():
+    return {
+        '_id': ObjectId(),
+        'status': 'pending',
+        'startDate': datetime(2026, 1, 1, tzinfo=timezone.utc),
+        'discord_message_id': None
+    }
+
+
+def test_claim_is_renewed_while_the_send_outlasts_the_lease(fake_db, discord_env, monkeypatch):
+    monkeypatch.setattr(Config, 'NOTIFICATION_CLAIM_LEASE', 0.3)
+    monkeypatch.setattr(Config, 'NOTIFICATION_COALESCE_WINDOW', 0)
+    # L'envoi attend trois baux dans la file (limite de débit de Discord)
+    discord_env.channel.rest.latency = 0.9
+    reservation = pending_reservation()
+
+    async def scenario():
+        service = NotificationService(discord_env)
+        await service.initialize()
+        await fake_db.get_collection('reservations').insert_one(reservation)
+        notify = asyncio.create_task(service.claim_and_notify(reservation['_id']))
+        await asyncio.sleep(0.6)
+        # Une autre instance (ou le rattrapage) tente de reprendre la réservation
+        stolen = await fake_db.claim_reservation_notification(reservation['_id'], 'other', 0.3)
+        claimed, message = await notify
+        await service.stop()
+        return stolen, claimed, message
+
+    stolen, claimed, message = asyncio.run(scenario())
+    assert stolen is None
+    assert claimed is not None and message is not None
+    assert len(discord_env.channel.messages) == 1
+
+
+async def started_service(bot, *reservations):
+    service = NotificationService(bot)
+    await service.initialize()
+    if reservations:
+        await db.get_collection('reservations').insert_many(list(reservations))
+    return service
+
+
+def sent_messages(bot):
+    return list(bot.channel.messages.values())
+
+
+def test_burst_is_sent_as_one_batch_message(fake_db, discord_env, monkeypatch):
+    monkeypatch.setattr(Config, 'NOTIFICATION_COALESCE_WINDOW', 0.1)
+    monkeypatch.setattr(Config, 'NOTIFICATION_BATCH_MIN', 3)
+    reservations = [pending_reservation() for _ in range(5)]
+
+    async def scenario():
+        service = await started_service(discord_env, *reservations)
+        results = await asyncio.gather(*(service.claim_and_notify(r['_id']) for r in reservations))
+        await service.stop()
+        stored = await db.get_collection('reservations').find({}).to_list()
+        return results, stored
+
+    results, stored = asyncio.run(scenario())
+    messages = sent_messages(discord_env)
+    # La première part tout de suite, les suivantes à la fermeture de la fenêtre
+    assert sorted(len(message.embeds) for message in messages) == [1, 4]
+    assert all(message is not None for _, message in results)
+    assert {r['discord_message_id'] for r in stored} == {str(message.id) for message in messages}
+
+
+def test_small_burst_is_sent_individually(fake_db, discord_env, monkeypatch):
+    monkeypatch.setattr(Config, 'NOTIFICATION_COALESCE_WINDOW', 0.1)
+    monkeypatch.setattr(Config, 'NOTIFICATION_BATCH_MIN', 3)
+    reservations = [pending_reservation() for _ in range(3)]
+
+    async def scenario():
+        service = await started_service(discord_env, *reservations)
+        await asyncio.gather(*(service.claim_and_notify(r['_id']) for r in reservations))
+        await service.stop()
+
+    asyncio.run(scenario())
+    assert [len(message.embeds) for message in sent_messages(discord_env)] == [1, 1, 1]
+
+
+def test_stop_sends_the_pending_burst_immediately(fake_db, discord_env, monkeypatch):
+    monkeypatch.setattr(Config, 'NOTIFICATION_COALESCE_WINDOW', 30)
+    monkeypatch.setattr(Config, 'NOTIFICATION_BATCH_MIN', 3)
+    reservations = [pending_reservation() for _ in range(4)]
+
+    async def scenario():
+        service = await started_service(discord_env, *reservations)
+        notify = asyncio.gather(*(service.claim_and_notify(r['_id']) for r in reservations))
+        await asyncio.sleep(0.05)
+        assert len(sent_messages(discord_env)) == 1
+        await asyncio.wait_for(service.stop(), 1)
+        return await notify
+
+    results = asyncio.run(scenario())
+    assert sorted(len(message.embeds) for message in sent_messages(discord_env)) == [1, 3]
+    assert all(message is not None for _, message in results)
+
+
+def test_batch_is_split_into_messages_of_five(fake_db, discord_env):
+    reservations = [pending_reservation() for _ in range(12)]
+
+    async def scenario():
+        service = await started_service(discord_env, *reservations)
+        messages = await service.send_reservation_batch(reservations)
+        service.dispatcher.stop()
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert sorted((len(message.embeds) for message in sent_messages(discord_env)), reverse=True) == [5, 5, 2]
+    # Une ligne de boutons par réservation dans chaque message groupé
+    assert all(len(message.components) == len(message.embeds) for message in sent_messages(discord_env))
+    assert set(messages) == {r['_id'] for r in reservations}
+
+
+def test_reminder_digest_respects_message_limits(fake_db, discord_env):
+    reservations = [pending_reservation() for _ in range(300)]
+
+    async def scenario():
+        service = await started_service(discord_env, *reservations)
+        reminded = await service.send_reminder_digest(reservations)
+        service.dispatcher.stop()
+        return reminded
+
+    reminded = asyncio.run(scenario())
+    messages = sent_messages(discord_env)
+    assert reminded == [r['_id'] for r in reservations]
+    assert 1 < len(messages) < len(reservations)
+    for message in messages:
+        assert len(message.embeds) <= 10
+        assert sum(len(embed) for embed in message.embeds) <= 6000
+        assert all(len(embed.fields) <= 25 for embed in message.embeds)
@@ -0,0 +1,136 @@
+"""Tas des échéances de ReminderScheduler"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from config import Config
+from services.reminder_scheduler import ReminderScheduler, REMINDER_RETRY_DELAY
+
+
+class FailingNotifications:
+    """Service de notification dont chaque rappel échoue"""
+
+    def __init__(self):
+        self.attempts = []
+
+    async def send_reminder_notification(self, reservation_id):
+        self.attempts.append(reservation_id)
+        return False
+
+
+@pytest.fixture
+def scheduler():
+    return ReminderScheduler(notification_service=None)
+
+
+def test_pop_due_returns_due_reservations_in_order(scheduler):
+    first, second, later = ObjectId(), ObjectId(), ObjectId()
+    scheduler._push(second, 200)
+    scheduler._push(later, 500)
+    scheduler._push(first, 100)
+
+    assert scheduler._next_due() == 100
+    assert scheduler._pop_due(300) == [first, second]
+    assert scheduler._next_due() == 500
+    assert len(scheduler) == 1
+
+
+def test_rescheduling_ignores_stale_entries(scheduler):
+    reservation_id = ObjectId()
+    scheduler._push(reservation_id, 100)
+    scheduler._push(reservation_id, 400)
+
+    # L'ancienne échéance reste dans le tas mais n'est plus celle de la réservation
+    assert scheduler._pop_due(300) == []
+    assert scheduler._next_due() == 400
+    assert scheduler._pop_due(400) == [reservation_id]
+    assert scheduler._next_due() is None
+
+
+def test_discard_removes_reservation(scheduler):
+    kept, discarded = ObjectId(), ObjectId()
+    scheduler._push(discarded, 100)
+    scheduler._push(kept, 200)
+    scheduler.discard(discarded)
+
+    assert scheduler._pop_due(300) == [kept]
+
+
+def test_schedule_is_ignored_while_stopped(scheduler):
+    scheduler.schedule({'_id': ObjectId(), 'status': 'pending', 'createdAt': datetime.now(timezone.utc)})
+
+    assert len(scheduler) == 0
+
+
+def test_schedule_computes_due_date_while_running(scheduler, fake_db, monkeypatch):
+    monkeypatch.setattr(Config, 'REMINDER_DELAY_HOURS', 24)
+    monkeypatch.setattr(Config, 'REMINDER_INTERVAL_HOURS', 12)
+    created = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    never_reminded, reminded, processed = ObjectId(), ObjectId(), ObjectId()
+
+    async def scenario():
+        scheduler.start()
+        await asyncio.sleep(0)
+        scheduler.schedule({'_id': never_reminded, 'status': 'pending', 'createdAt': created})
+        scheduler.schedule({'_id': reminded, 'status': 'pending', 'createdAt': created, 'last_reminded_at': created})
+        scheduler.schedule({'_id': processed, 'status': 'pending', 'createdAt': created})
+        scheduler.schedule({'_id': processed, 'status': 'approved'})
+        due = dict(scheduler._due)
+        scheduler.stop()
+        return due
+
+    due = asyncio.run(scenario())
+    assert due == {
+        never_reminded: (created + timedelta(hours=24)).timestamp(),
+        reminded: (created + timedelta(hours=12)).timestamp()
+    }
+    assert len(scheduler) == 0
+
+
+def test_failed_reminders_are_requeued(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, 'REMINDER_DIGEST', False)
+    notifications = FailingNotifications()
+    scheduler = ReminderScheduler(notifications)
+    pending = {'_id': ObjectId(), 'status': 'pending'}
+
+    async def scenario():
+        await fake_db.get_collection('reservations').insert_many([pending, {'_id': ObjectId(), 'status': 'approved'}])
+        started = time.time()
+        await scheduler._send_due([pending['_id']])
+        return started
+
+    started = asyncio.run(scenario())
+    assert notifications.attempts == [pending['_id']]
+    assert list(scheduler._due) == [pending['_id']]
+    assert scheduler._due[pending['_id']] >= started + REMINDER_RETRY_DELAY
+
+
+class SentNotifications:
+    """Service de notification dont chaque rappel part"""
+
+    async def send_reminder_notification(self, reservation_id):
+        return True
+
+
+def test_sent_reminders_are_not_resent_when_recording_fails(fake_db, monkeypatch):
+    monkeypatch.setattr(Config, 'REMINDER_DIGEST', False)
+    scheduler = ReminderScheduler(SentNotifications())
+    pending = {'_id': ObjectId(), 'status': 'pending'}
+
+    async def failing_mark_reminded(reservation_ids, reminded_at):
+        raise ConnectionError("MongoDB indisponible")
+
+    async def scenario():
+        await fake_db.get_collection('reservations').insert_one(pending)
+        monkeypatch.setattr(fake_db, 'mark_reminded', failing_mark_reminded)
+        started = time.time()
+        await scheduler._send_due([pending['_id']])
+        return started
+
+    started = asyncio.run(scenario())
+    # Prochain rappel à l'intervalle normal, pas au délai de nouvelle tentative
+    assert scheduler._due[pending['_id']] >= started + Config.REMINDER_INTERVAL_HOURS * 3600
@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+# Valeur retournée par TTLCache.get quand la clé est absente ou expirée
+MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU borné avec expiration des entrées
+
+    Les entrées les moins récemment utilisées sont évincées au-delà de maxsize,
+    et une entrée plus vieille que ttl secondes est considérée comme absente.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Retourne la valeur en cache, ou MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """Ajoute ou remplace une entrée"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Supprime une entrée"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Vide le cache"""
+        self._entries.clear()
+
+    def stats(self):
+        """Compteurs du cache"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) * 100 if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -2,12 +2,22 @@ import discord
 from datetime import datetime
 from config import Config
 
+# Limites imposées par Discord aux embeds
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_TOTAL_CHARS = 6000
+MESSAGE_MAX_EMBEDS = 10
+EMBED_MAX_DESCRIPTION = 4096
+
 class EmbedBuilder:
     @staticmethod
-    def create_reservation_embed(reservation, game=None, user=None):
-        """Crée un embed pour une réservation"""
+    def create_reservation_embed(view, position=None):
+        """Crée un embed pour une réservation (view: ReservationView)
+
+        position numérote l'embed dans un message groupé, comme ses boutons.
+        """
+        prefix = f"#{position} " if position is not None else ""
         embed = discord.Embed(
-            title=f"🎮 Nouvelle réservation - {game['name'] if game else 'Jeu inconnu'}",
+            title=f"{prefix}🎮 Nouvelle réservation - {view.game_name if view.has_game else 'Jeu inconnu'}",
             description=f"Une nouvelle réservation a été créée",
             color=Config.COLORS['PENDING'],
             timestamp=datetime.utcnow()
@@ -16,72 +26,76 @@ class EmbedBuilder:
         # Informations sur la réservation
         embed.add_field(
             name="📅 Début de réservation",
-            value=f"<t:{int(datetime.fromisoformat(str(reservation['startDate'])).timestamp())}:F>",
+            value=f"<t:{view.start_ts}:F>",
             inline=True
         )
         
         embed.add_field(
             name="📅 Fin de réservation",
-            value=f"<t:{int(datetime.fromisoformat(str(reservation['endDate'])).timestamp())}:F>",
+            value=f"<t:{view.end_ts}:F>",
             inline=True
         )
         
         embed.add_field(
             name="👤 Utilisateur",
-            value=f"{user['username'] if user else 'Utilisateur inconnu'}",
+            value=f"{view.username or 'Utilisateur inconnu'}",
             inline=True
         )
         
-        if reservation.get('notes'):
+        if view.notes:
             embed.add_field(
                 name="📝 Notes",
-                value=reservation['notes'],
+                value=view.notes,
                 inline=False
             )
         
         # Informations sur le jeu
-        if game:
+        if view.has_game:
             embed.add_field(
                 name="🎯 Détails du jeu",
-                value=f"**Joueurs:** {game.get('players', 'N/A')}\n**Durée:** {game.get('duration', 'N/A')}\n**Âge:** {game.get('age', 'N/A')}",
+                value=f"**Joueurs:** {view.game_players}\n**Durée:** {view.game_duration}\n**Âge:** {view.game_age}",
                 inline=False
             )
         
-        embed.set_footer(text=f"ID: {reservation['_id']}")
+        embed.set_footer(text=f"ID: {view.id}")
         
         return embed
     
     @staticmethod
-    def create_reservation_list_embed(reservations, title="Réservations en attente"):
-        """Crée un embed pour la liste des réservations"""
+    def create_reservation_list_embed(views, title="Réservations en attente", page=None):
+        """Crée un embed pour la liste des réservations (views: liste de ReservationView)
+
+        page numérote la page affichée quand la liste est paginée.
+        """
         embed = discord.Embed(
             title=title,
             color=Config.COLORS['INFO'],
             timestamp=datetime.utcnow()
         )
         
-        if not reservations:
+        if not views:
             embed.description = "Aucune réservation en attente"
+            if page is not None:
+                embed.set_footer(text=f"Page {page}")
             return embed
         
-        for reservation in reservations[:10]:  # Limite à 10 réservations
-            game = reservation.get('game', {})
-            user = reservation.get('user', {})
-            
+        for view in views[:10]:  # Limite à 10 réservations
             embed.add_field(
-                name=f"🎮 {game.get('name', 'Jeu inconnu')} - {user.get('username', 'Utilisateur inconnu')}",
-                value=f"📅 <t:{int(datetime.fromisoformat(str(reservation['startDate'])).timestamp())}:F>\n⏰ <t:{int(datetime.fromisoformat(str(reservation['endDate'])).timestamp())}:F>\nID: `{reservation['_id']}`",
+                name=f"🎮 {view.game_name or 'Jeu inconnu'} - {view.username or 'Utilisateur inconnu'}",
+                value=f"📅 <t:{view.start_ts}:F>\n⏰ <t:{view.end_ts}:F>\nID: `{view.id}`",
                 inline=False
             )
         
-        if len(reservations) > 10:
-            embed.set_footer(text=f"Affichage des 10 premières réservations sur {len(reservations)}")
+        if page is not None:
+            embed.set_footer(text=f"Page {page}")
+        elif len(views) > 10:
+            embed.set_footer(text=f"Affichage des 10 premières réservations sur {len(views)}")
         
         return embed
     
     @staticmethod
-    def create_reservation_detail_embed(reservation, game=None, user=None):
-        """Crée un embed détaillé pour une réservation"""
+    def create_reservation_detail_embed(view):
+        """Crée un embed détaillé pour une réservation (view: ReservationView)"""
         embed = discord.Embed(
             title=f"📋 Détails de la réservation",
             color=Config.COLORS['INFO'],
@@ -93,62 +107,212 @@ class EmbedBuilder:
             'pending': '⏳',
             'approved': '✅',
             'rejected': '❌'
-        }.get(reservation['status'], '❓')
+        }.get(view.status, '❓')
         
         embed.add_field(
             name="Statut",
-            value=f"{status_emoji} {reservation['status'].upper()}",
+            value=f"{status_emoji} {view.status.upper()}",
             inline=True
         )
         
         # Dates
         embed.add_field(
             name="Début",
-            value=f"<t:{int(datetime.fromisoformat(str(reservation['startDate'])).timestamp())}:F>",
+            value=f"<t:{view.start_ts}:F>",
             inline=True
         )
         
         embed.add_field(
             name="Fin",
-            value=f"<t:{int(datetime.fromisoformat(str(reservation['endDate'])).timestamp())}:F>",
+            value=f"<t:{view.end_ts}:F>",
             inline=True
         )
         
         # Utilisateur
         embed.add_field(
             name="Utilisateur",
-            value=f"{user['username'] if user else 'Inconnu'}",
+            value=f"{view.username or 'Inconnu'}",
             inline=True
         )
         
         # Jeu
-        if game:
+        if view.has_game:
             embed.add_field(
                 name="Jeu",
-                value=f"**{game['name']}**\nJoueurs: {game.get('players', 'N/A')}\nDurée: {game.get('duration', 'N/A')}",
+                value=f"**{view.game_name or 'Jeu inconnu'}**\nJoueurs: {view.game_players}\nDurée: {view.game_duration}",
                 inline=False
             )
         
         # Notes
-        if reservation.get('notes'):
+        if view.notes:
             embed.add_field(
                 name="Notes",
-                value=reservation['notes'],
+                value=view.notes,
                 inline=False
             )
         
         # Notes admin
-        if reservation.get('admin_notes'):
+        if view.admin_notes:
             embed.add_field(
                 name="Notes admin",
-                value=reservation['admin_notes'],
+                value=view.admin_notes,
+                inline=False
+            )
+        
+        embed.set_footer(text=f"ID: {view.id}")
+        
+        return embed
+    
+    @staticmethod
+    def create_reminder_embed(view):
+        """Crée un embed de rappel pour une réservation en attente (view: ReservationView)"""
+        embed = discord.Embed(
+            title="⏰ Rappel - Réservation en attente",
+            description=f"La réservation {view.id} est en attente depuis plus de 24h",
+            color=Config.COLORS['WARNING'],
+            timestamp=datetime.utcnow()
+        )
+        
+        # Ajouter les informations de base
+        embed.add_field(
+            name="Début de réservation",
+            value=f"<t:{view.start_ts}:F>",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Fin de réservation",
+            value=f"<t:{view.end_ts}:F>",
+            inline=True
+        )
+        
+        if view.notes:
+            embed.add_field(
+                name="Notes",
+                value=view.notes,
                 inline=False
             )
         
-        embed.set_footer(text=f"ID: {reservation['_id']}")
+        embed.set_footer(text=f"ID: {view.id}")
         
         return embed
     
+    @staticmethod
+    def create_reminder_digest(views, guild_id, channel_id):
+        """Regroupe les rappels de plusieurs réservations dans le moins de messages possible
+
+        Chaque réservation devient un champ d'embed avec un lien vers sa
+        notification d'origine. Les champs sont répartis dans des embeds de 25
+        champs au plus, et les embeds dans des messages de 10 embeds et 6000
+        caractères au plus. Retourne une liste de (embeds, ids des réservations).
+        """
+        # Place réservée à la description ajoutée au premier embed de chaque message
+        description_reserve = 100
+        messages = []
+        embeds, ids, message_chars = [], [], description_reserve
+        embed = None
+        
+        for view in views:
+            name = f"🎮 {view.game_name or 'Jeu inconnu'} - {view.username or 'Utilisateur inconnu'}"[:256]
+            value = f"📅 <t:{view.start_ts}:F>"
+            if view.created_ts:
+                value += f" · en attente depuis <t:{view.created_ts}:R>"
+            if view.discord_message_id:
+                value += f"\n[Voir la notification](https://discord.com/channels/{guild_id}/{channel_id}/{view.discord_message_id})"
+            value += f"\nID: `{view.id}`"
+            field_chars = len(name) + len(value)
+            
+            # Nouvel embed si le courant est plein, nouveau message si le message l'est
+            if embed is None or len(embed.fields) >= EMBED_MAX_FIELDS or message_chars + field_chars > EMBED_MAX_TOTAL_CHARS:
+                if embed is not None and (len(embeds) >= MESSAGE_MAX_EMBEDS or message_chars + field_chars > EMBED_MAX_TOTAL_CHARS):
+                    messages.append((embeds, ids))
+                    embeds, ids, message_chars = [], [], description_reserve
+                
+                title = "⏰ Rappel - Réservations en attente" if not embeds else "⏰ Rappel (suite)"
+                embed = discord.Embed(title=title, color=Config.COLORS['WARNING'], timestamp=datetime.utcnow())
+                embeds.append(embed)
+                message_chars += len(title)
+            
+            embed.add_field(name=name, value=value, inline=False)
+            ids.append(view.id)
+            message_chars += field_chars
+        
+        if embeds:
+            messages.append((embeds, ids))
+        
+        total = len(views)
+        for embeds, ids in messages:
+            embeds[0].description = f"{total} réservation(s) en attente de traitement"
+        
+        return messages
+    
+    @staticmethod
+    def apply_status(embed, status):
+        """Met à jour la couleur et le champ Statut d'un embed de réservation"""
+        if status == 'approved':
+            embed.color = Config.COLORS['APPROVED']
+            status_text = "✅ APPROUVÉ"
+        elif status == 'rejected':
+            embed.color = Config.COLORS['REJECTED']
+            status_text = "❌ REJETÉ"
+        else:
+            embed.color = Config.COLORS['PENDING']
+            status_text = "⏳ EN ATTENTE"
+        
+        for i, field in enumerate(embed.fields):
+            if field.name == "Statut":
+                embed.set_field_at(i, name="Statut", value=status_text, inline=True)
+                break
+        else:
+            embed.insert_field_at(0, name="Statut", value=status_text, inline=True)
+        
+        return embed
+    
+    @staticmethod
+    def create_bulk_summary_embed(status, outcomes, invalid=()):
+        """Crée le récapitulatif d'une action groupée
+
+        outcomes : {reservation_id: (résultat, document)} tel que retourné par
+        Database.bulk_transition_reservation_status ; invalid : saisies qui ne
+        sont pas des IDs valides.
+        """
+        updated = [rid for rid, (outcome, _) in outcomes.items() if outcome == 'updated']
+        not_found = [rid for rid, (outcome, _) in outcomes.items() if outcome == 'not_found']
+        already = [(rid, outcome) for rid, (outcome, _) in outcomes.items() if outcome not in ('updated', 'not_found')]
+        
+        verb = "approuvée(s)" if status == 'approved' else "rejetée(s)"
+        embed = discord.Embed(
+            title=f"{Config.EMOJIS['APPROVE'] if status == 'approved' else Config.EMOJIS['REJECT']} Action groupée",
+            color=Config.COLORS['SUCCESS'] if updated else Config.COLORS['WARNING'],
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name=verb.capitalize(), value=str(len(updated)), inline=True)
+        embed.add_field(name="Déjà traitées", value=str(len(already)), inline=True)
+        embed.add_field(name="Introuvables / invalides", value=str(len(not_found) + len(invalid)), inline=True)
+        
+        lines = [f"✅ `{rid}`" for rid in updated]
+        lines += [f"⚠️ `{rid}` déjà {outcome}" for rid, outcome in already]
+        lines += [f"❓ `{rid}` introuvable" for rid in not_found]
+        lines += [f"❌ `{token}` ID invalide" for token in invalid]
+        
+        # Le détail par réservation est tronqué à la limite de la description
+        description = ""
+        for i, line in enumerate(lines):
+            remaining = len(lines) - i
+            if len(description) + len(line) + 40 > EMBED_MAX_DESCRIPTION:
+                description += f"… et {remaining} autre(s)"
+                break
+            description += line + "\n"
+        embed.description = description or "Aucune réservation concernée"
+        return embed
+    
+    @staticmethod
+    def create_transition_error_embed(reservation_id, current):
+        """Explique l'échec d'un changement de statut (current: réservation relue, ou None)"""
+        if not current:
+            return EmbedBuilder.create_error_embed("Réservation introuvable", f"Aucune réservation trouvée avec l'ID: {reservation_id}")
+        return EmbedBuilder.create_warning_embed("Action impossible", f"Cette réservation est déjà {current['status']}")
+    
     @staticmethod
     def create_success_embed(title, description):
         """Crée un embed de succès"""
@@ -0,0 +1,58 @@
+class MessageIndex:
+    """Index en mémoire des messages de notification du bot
+
+    Associe l'ID de chaque message Discord suivi à l'ID et au statut de sa
+    réservation, pour écarter les réactions sans intérêt sans appel REST ni
+    requête MongoDB.
+
+    Un message groupé (plusieurs réservations notifiées ensemble) ne désigne
+    pas une réservation unique : il est suivi à part et get() ne le retourne
+    pas, sa modération passe uniquement par les boutons.
+    """
+
+    def __init__(self):
+        self._by_message = {}
+        self._batches = {}
+        self._by_reservation = {}
+
+    def track(self, message_id, reservation_id, status):
+        """Associe un message Discord à une réservation"""
+        message_id = str(message_id)
+        entry = self._by_message.get(message_id)
+        if message_id in self._batches or (entry and entry['reservation_id'] != reservation_id):
+            # Deuxième réservation sur le même message : c'est un message groupé
+            reservation_ids = self._batches.get(message_id) or [entry['reservation_id']]
+            self.track_batch(message_id, reservation_ids + [reservation_id])
+            return
+        self._by_message[message_id] = {'reservation_id': reservation_id, 'status': status}
+        self._by_reservation[reservation_id] = message_id
+
+    def track_batch(self, message_id, reservation_ids):
+        """Associe un message groupé à ses réservations"""
+        message_id = str(message_id)
+        self._by_message.pop(message_id, None)
+        self._batches[message_id] = list(reservation_ids)
+        for reservation_id in reservation_ids:
+            self._by_reservation[reservation_id] = message_id
+
+    def update_status(self, reservation_id, status):
+        """Met à jour le statut connu d'une réservation suivie"""
+        message_id = self._by_reservation.get(reservation_id)
+        if message_id in self._by_message:
+            self._by_message[message_id]['status'] = status
+
+    def get(self, message_id):
+        """Retourne {'reservation_id', 'status'} pour un message individuel suivi, ou None"""
+        return self._by_message.get(str(message_id))
+
+    def clear(self):
+        """Vide l'index"""
+        self._by_message.clear()
+        self._batches.clear()
+        self._by_reservation.clear()
+
+    def __contains__(self, message_id):
+        return str(message_id) in self._by_message or str(message_id) in self._batches
+
+    def __len__(self):
+        return len(self._by_message) + len(self._batches)
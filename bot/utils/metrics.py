@@ -0,0 +1,266 @@
+"""Métriques du bot au format texte Prometheus
+
+Registre minimal en mémoire (compteurs, jauges, histogrammes à labels), sans
+dépendance externe : une observation coûte une recherche dichotomique et
+quelques incréments, ce qui permet de le laisser actif en production. Le
+rendu est exposé par services/metrics_server.py.
+"""
+
+import bisect
+import time
+from contextlib import contextmanager
+
+# Bornes (en secondes) des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Bornes du retard de la boucle d'événements, plus fines vers le bas
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        """Retourne la série correspondant aux valeurs de labels"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: {len(self.labelnames)} label(s) attendu(s)")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _default(self):
+        return self._children[()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Compteur monotone"""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Valeur lue au moment de l'export (taille de file, latence gateway...)"""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception:
+                return float('nan')
+        return self.value
+
+
+class Gauge(_Metric):
+    """Valeur instantanée"""
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"]
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Observe la durée du bloc"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """Distribution de valeurs (latences) par intervalles cumulés"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, ('le', _format_value(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exportées"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Export au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registre global du bot
+registry = MetricsRegistry()
+
+# Métriques du bot
+LOOP_DURATION = registry.histogram(
+    'bot_loop_iteration_seconds', "Durée d'une itération des tâches de fond", ('job',)
+)
+LOOP_ERRORS = registry.counter(
+    'bot_loop_errors_total', "Itérations des tâches de fond terminées en erreur", ('job',)
+)
+DB_LATENCY = registry.histogram(
+    'bot_db_operation_seconds', "Latence des méthodes de Database", ('method',)
+)
+DB_ERRORS = registry.counter(
+    'bot_db_errors_total', "Méthodes de Database terminées en erreur", ('method',)
+)
+MONGO_COMMAND_LATENCY = registry.histogram(
+    'bot_mongo_command_seconds', "Latence des commandes MongoDB vue par le driver", ('collection', 'operation')
+)
+MONGO_DOCUMENTS_RETURNED = registry.counter(
+    'bot_mongo_documents_returned_total', "Documents retournés ou modifiés par les commandes MongoDB", ('collection', 'operation')
+)
+MONGO_SLOW_COMMANDS = registry.counter(
+    'bot_mongo_slow_commands_total', "Commandes MongoDB au-delà de MONGO_SLOW_QUERY_MS", ('collection', 'operation')
+)
+DISCORD_REST_LATENCY = registry.histogram(
+    'bot_discord_rest_seconds', "Latence des requêtes REST vers Discord", ('method', 'route', 'status')
+)
+DISCORD_RATE_LIMITS = registry.counter(
+    'bot_discord_rate_limited_total', "Réponses 429 de l'API Discord", ('method', 'route')
+)
+DISPATCH_QUEUE_DEPTH = registry.gauge(
+    'bot_dispatch_queue_depth', "Appels Discord en attente dans la file d'envoi"
+)
+REACTION_LATENCY = registry.histogram(
+    'bot_reaction_handler_seconds', "Durée de traitement des réactions", ('emoji',)
+)
+GATEWAY_LATENCY = registry.gauge(
+    'bot_gateway_latency_seconds', "Latence du heartbeat de la gateway Discord"
+)
+EVENT_LOOP_LAG = registry.histogram(
+    'bot_event_loop_lag_seconds', "Retard de réveil de la boucle d'événements", buckets=LAG_BUCKETS
+)
+EVENT_LOOP_STALLS = registry.counter(
+    'bot_event_loop_stalls_total', "Blocages de la boucle d'événements au-delà de LOOP_LAG_THRESHOLD_MS"
+)
+HANDLER_DURATION = registry.histogram(
+    'bot_handler_seconds', "Durée des commandes, listeners et boutons (wall), dont MongoDB (db) et REST Discord (rest)",
+    ('handler', 'component')
+)
+HANDLER_ERRORS = registry.counter(
+    'bot_handler_errors_total', "Commandes, listeners et boutons terminés en erreur", ('handler',)
+)
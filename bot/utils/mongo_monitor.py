@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+from pymongo import monitoring
+from utils.metrics import MONGO_COMMAND_LATENCY, MONGO_DOCUMENTS_RETURNED, MONGO_SLOW_COMMANDS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Commandes suivies, et champ du filtre de chacune
+MONITORED_COMMANDS = {
+    'find': 'filter',
+    'aggregate': 'pipeline',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'update': 'updates',
+    'delete': 'deletes',
+    'insert': None,
+    'getMore': None
+}
+
+# Marqueur des commandes de change stream, suivies sans être mesurées
+CHANGE_STREAM = object()
+
+# Commandes qu'explain sait analyser
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete'}
+
+# Champs ajoutés par le driver, retirés avant de relancer une commande dans explain
+DRIVER_FIELDS = {'lsid', '$db', '$clusterTime', '$readPreference', 'txnNumber', 'readConcern', 'writeConcern', 'apiVersion'}
+
+# Nombre maximal de formes de requêtes suivies (les suivantes sont regroupées)
+MAX_SHAPES = 500
+
+
+def query_shape(value):
+    """Forme d'un filtre : les clés et opérateurs sont gardés, les valeurs remplacées par 1"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Les listes de valeurs ($in...) gardent une seule entrée ; les listes
+        # de sous-requêtes ($or, pipeline) gardent leur structure
+        shapes = [query_shape(item) for item in value]
+        if all(shape == 1 for shape in shapes):
+            return [1] if shapes else []
+        return shapes
+    return 1
+
+
+def plan_stages(explain):
+    """Liste les étapes des plans gagnants d'une sortie explain()"""
+    stages = []
+
+    def walk(node, in_winning_plan):
+        if isinstance(node, dict):
+            if in_winning_plan and 'stage' in node:
+                stages.append(node['stage'])
+            for key, value in node.items():
+                if key != 'rejectedPlans':
+                    walk(value, in_winning_plan or key == 'winningPlan')
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_winning_plan)
+
+    walk(explain, False)
+    return stages
+
+
+def _is_change_stream(command):
+    pipeline = command.get('pipeline') or []
+    return bool(pipeline) and isinstance(pipeline[0], dict) and '$changeStream' in pipeline[0]
+
+
+def _returned_documents(command_name, reply):
+    cursor = reply.get('cursor')
+    if cursor:
+        return len(cursor.get('firstBatch') or cursor.get('nextBatch') or [])
+    if command_name == 'findAndModify':
+        return 1 if reply.get('value') else 0
+    if command_name == 'distinct':
+        return len(reply.get('values') or [])
+    return reply.get('n', 0)
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Écoute les commandes envoyées par le driver MongoDB
+
+    Pour chaque commande suivie : latence par collection et opération
+    (métriques), nombre de documents retournés, et statistiques par forme de
+    requête depuis le démarrage (top_offenders). Une commande plus lente que
+    MONGO_SLOW_QUERY_MS est journalisée avec la forme de son filtre ; son plan
+    d'exécution est capturé une fois par forme, en tâche de fond, et ajouté
+    aux statistiques. Les change streams (agrégation $changeStream et getMore
+    de leurs curseurs, qui attendent les événements côté serveur) sont exclus.
+
+    Les callbacks sont appelés dans la boucle d'événements par le driver
+    async : ils doivent rester courts et ne jamais bloquer.
+    """
+
+    def __init__(self):
+        self.database = None
+        self._pending = {}
+        self._stats = {}
+        self._explaining = set()
+        # Références des explain() en cours, pour que la boucle ne les collecte pas
+        self._explain_tasks = set()
+        # Curseurs des change streams : leurs getMore attendent des événements
+        # (awaitData) et dureraient toujours plus que le seuil des requêtes lentes
+        self._change_streams = set()
+
+    def attach(self, database):
+        """Base utilisée pour capturer les plans d'exécution des commandes lentes"""
+        self.database = database
+
+    def started(self, event):
+        command = event.command
+        if event.command_name == 'killCursors':
+            self._change_streams.difference_update(command.get('cursors') or [])
+            return
+        if event.command_name not in MONITORED_COMMANDS:
+            return
+        if event.command_name == 'getMore':
+            if command.get('getMore') in self._change_streams:
+                self._pending[(event.connection_id, event.request_id)] = (CHANGE_STREAM, command.get('getMore'))
+                return
+            collection = command.get('collection')
+        else:
+            collection = command.get(event.command_name)
+            if event.command_name == 'aggregate' and _is_change_stream(command):
+                self._pending[(event.connection_id, event.request_id)] = (CHANGE_STREAM, None)
+                return
+        # Les agrégations au niveau de la base ont {aggregate: 1}
+        if collection == 1:
+            collection = '$cmd'
+        self._pending[(event.connection_id, event.request_id)] = (collection, command)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, command = pending
+        if collection is CHANGE_STREAM:
+            self._track_change_stream(command, event.reply)
+            return
+        self._record(event.command_name, collection, command, event.duration_micros / 1e6,
+                     _returned_documents(event.command_name, event.reply))
+
+    def failed(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, command = pending
+        if collection is CHANGE_STREAM:
+            self._change_streams.discard(command)
+            return
+        self._record(event.command_name, collection, command, event.duration_micros / 1e6, 0, failed=True)
+
+    def _track_change_stream(self, previous_id, reply):
+        """Mémorise le curseur d'un change stream, l'oublie une fois fermé par le serveur"""
+        cursor_id = (reply.get('cursor') or {}).get('id')
+        if cursor_id:
+            self._change_streams.add(cursor_id)
+        elif previous_id is not None:
+            self._change_streams.discard(previous_id)
+
+    def _record(self, operation, collection, command, duration, documents, failed=False):
+        collection = str(collection)
+        MONGO_COMMAND_LATENCY.labels(collection, operation).observe(duration)
+        if documents:
+            MONGO_DOCUMENTS_RETURNED.labels(collection, operation).inc(documents)
+
+        filter_field = MONITORED_COMMANDS[operation]
+        shape = json.dumps(query_shape(command.get(filter_field)), default=str) if filter_field else ""
+        key = (collection, operation, shape)
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= MAX_SHAPES:
+                key = (collection, operation, "(autres formes)")
+                stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'collection': collection, 'operation': operation, 'shape': key[2],
+                    'count': 0, 'total': 0.0, 'max': 0.0, 'slow': 0, 'errors': 0, 'documents': 0, 'plan': None
+                }
+        stats['count'] += 1
+        stats['total'] += duration
+        stats['max'] = max(stats['max'], duration)
+        stats['documents'] += documents
+        if failed:
+            stats['errors'] += 1
+
+        if duration * 1000 >= Config.MONGO_SLOW_QUERY_MS:
+            stats['slow'] += 1
+            MONGO_SLOW_COMMANDS.labels(collection, operation).inc()
+            logger.warning(
+                f"🐢 Requête lente: {collection}.{operation} {duration * 1000:.0f}ms "
+                f"(forme: {shape or '-'}, plan: {' > '.join(stats['plan']) if stats['plan'] else 'en cours de capture'})"
+            )
+            self._capture_plan(key, operation, command)
+
+    def _capture_plan(self, key, operation, command):
+        """Lance explain() en tâche de fond, une seule fois par forme de requête"""
+        if (not Config.MONGO_EXPLAIN_SLOW_QUERIES or self.database is None or operation not in EXPLAINABLE_COMMANDS
+                or self._stats[key]['plan'] is not None or key in self._explaining):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._explaining.add(key)
+        explained = {name: value for name, value in command.items() if name not in DRIVER_FIELDS}
+        task = loop.create_task(self._explain(key, explained))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, key, command):
+        try:
+            explain = await self.database.command({'explain': command, 'verbosity': 'queryPlanner'})
+            self._stats[key]['plan'] = plan_stages(explain)
+            collection, operation, shape = key
+            logger.info(f"Plan de {collection}.{operation} {shape or ''}: {' > '.join(self._stats[key]['plan'])}")
+        except Exception as e:
+            logger.warning(f"Impossible de capturer le plan de {key[0]}.{key[1]}: {e}")
+            self._stats[key]['plan'] = []
+        finally:
+            self._explaining.discard(key)
+
+    def top_offenders(self, limit=10):
+        """Formes de requêtes triées par temps total passé depuis le démarrage"""
+        return sorted(self._stats.values(), key=lambda stats: stats['total'], reverse=True)[:limit]
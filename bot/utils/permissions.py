@@ -1,5 +1,13 @@
 import discord
+from collections import namedtuple
 from config import Config
+from utils.cache import TTLCache, MISSING
+
+# Verdict admin d'un membre, suffisant pour traiter une réaction sans objet Member
+AdminVerdict = namedtuple('AdminVerdict', ['id', 'name', 'is_admin'])
+
+# Cache ID utilisateur -> AdminVerdict, pour éviter un fetch_member par réaction
+admin_verdicts = TTLCache(Config.ADMIN_CACHE_SIZE, Config.ADMIN_CACHE_TTL)
 
 def has_admin_role(member):
     """Vérifie si un membre a le rôle admin"""
@@ -16,12 +24,23 @@ def has_admin_role(member):
     
     return False
 
+def remember_admin_verdict(member):
+    """Calcule le verdict admin d'un membre et le met en cache"""
+    verdict = AdminVerdict(member.id, member.name, has_admin_role(member))
+    admin_verdicts.set(member.id, verdict)
+    return verdict
+
+def get_cached_admin_verdict(user_id):
+    """Retourne le verdict admin en cache d'un utilisateur, ou None"""
+    verdict = admin_verdicts.get(user_id)
+    return None if verdict is MISSING else verdict
+
 def check_admin_permission(interaction):
     """Vérifie les permissions admin pour une interaction"""
     if not interaction.guild:
         return False, "Cette commande ne peut être utilisée que sur un serveur"
     
-    if not has_admin_role(interaction.user):
+    if not remember_admin_verdict(interaction.user).is_admin:
         return False, "Vous n'avez pas les permissions nécessaires pour utiliser cette commande"
     
     return True, None
@@ -0,0 +1,165 @@
+"""Profilage des commandes, listeners et boutons du bot
+
+profiled() mesure chaque exécution d'un gestionnaire : durée totale, temps
+passé dans MongoDB (méthodes de Database) et dans les appels REST Discord
+(trace aiohttp de discord.py). Les temps sont rattachés au gestionnaire par
+une ContextVar : les tâches créées pendant son exécution en héritent, les
+temps d'opérations lancées en parallèle s'additionnent donc et peuvent
+dépasser la durée totale.
+
+sample_stacks() échantillonne la pile du thread de la boucle d'événements
+pendant quelques secondes (profilage à la demande, commande /profile).
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from utils.metrics import HANDLER_DURATION, HANDLER_ERRORS
+
+# Dossier du bot, retiré des chemins des piles échantillonnées
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Profile:
+    """Temps cumulés d'une exécution de gestionnaire"""
+    __slots__ = ('db', 'rest')
+
+    def __init__(self):
+        self.db = 0.0
+        self.rest = 0.0
+
+
+_current = ContextVar('profile', default=None)
+_in_db = ContextVar('profile_in_db', default=False)
+
+
+def current_profile():
+    """Profil du gestionnaire en cours d'exécution (None hors gestionnaire)"""
+    return _current.get()
+
+
+@contextmanager
+def resume(profile):
+    """Rattache les mesures du bloc à un profil capturé ailleurs (file d'envoi)"""
+    token = _current.set(profile)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure_db():
+    """Compte la durée du bloc comme temps MongoDB du gestionnaire en cours
+
+    Les appels imbriqués (une méthode de Database qui en appelle une autre)
+    ne sont comptés qu'une fois.
+    """
+    profile = _current.get()
+    if profile is None or _in_db.get():
+        yield
+        return
+    token = _in_db.set(True)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.db += time.perf_counter() - started
+        _in_db.reset(token)
+
+
+def record_rest(duration):
+    """Ajoute la durée d'un appel REST Discord au gestionnaire en cours"""
+    profile = _current.get()
+    if profile is not None:
+        profile.rest += duration
+
+
+def profiled(name=None):
+    """Décorateur des coroutines de gestion (commandes, listeners, boutons)
+
+    À placer sous @app_commands.command / @commands.Cog.listener : la
+    signature est conservée (functools.wraps) pour la déclaration des
+    options des commandes slash.
+    """
+
+    def decorator(function):
+        handler = name or function.__name__
+        wall_histogram = HANDLER_DURATION.labels(handler, 'wall')
+        db_histogram = HANDLER_DURATION.labels(handler, 'db')
+        rest_histogram = HANDLER_DURATION.labels(handler, 'rest')
+        errors = HANDLER_ERRORS.labels(handler)
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            parent = _current.get()
+            profile = Profile()
+            token = _current.set(profile)
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                wall_histogram.observe(time.perf_counter() - started)
+                db_histogram.observe(profile.db)
+                rest_histogram.observe(profile.rest)
+                _current.reset(token)
+                # Un gestionnaire imbriqué (commande textuelle dans on_message) compte aussi pour son parent
+                if parent is not None:
+                    parent.db += profile.db
+                    parent.rest += profile.rest
+
+        return wrapper
+
+    return decorator
+
+
+def _frame_label(frame):
+    filename = frame.f_code.co_filename
+    if filename.startswith(BOT_DIR):
+        filename = os.path.relpath(filename, BOT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(thread_id, seconds, interval=0.005):
+    """Échantillonne la pile d'un thread, à exécuter dans un autre thread
+
+    Retourne un Counter des piles repliées (format « collapsed » des flame
+    graphs : frames de la racine à la feuille séparées par des ';').
+    """
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    current_thread = threading.get_ident()
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is None or thread_id == current_thread:
+            break
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed(stacks):
+    """Texte des piles repliées, une pile par ligne suivie de son nombre d'échantillons"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_frames(stacks, limit=10):
+    """Frames les plus souvent au sommet de la pile (temps propre)"""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    return leaves.most_common(limit)
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+
+def to_epoch(value):
+    """Convertit une date de réservation en timestamp epoch (secondes, UTC)
+
+    pymongo décode les dates BSON en datetime naïfs exprimés en UTC ; les
+    chaînes ISO 8601 sont aussi acceptées.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class ReservationView:
+    """Vue compacte d'une réservation pour l'affichage
+
+    Construite une seule fois par document : les dates sont converties en
+    timestamps epoch UTC et les champs du jeu et de l'utilisateur sont extraits,
+    pour que les embeds n'aient plus rien à parser.
+    """
+
+    __slots__ = (
+        'id', 'status', 'start_ts', 'end_ts', 'created_ts', 'notes', 'admin_notes', 'discord_message_id',
+        'has_game', 'game_name', 'game_players', 'game_duration', 'game_age', 'username'
+    )
+
+    def __init__(self, id, status, start_ts, end_ts, created_ts=None, notes=None, admin_notes=None, discord_message_id=None,
+                 has_game=False, game_name=None, game_players=None, game_duration=None, game_age=None,
+                 username=None):
+        self.id = id
+        self.status = status
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.created_ts = created_ts
+        self.notes = notes
+        self.admin_notes = admin_notes
+        self.discord_message_id = discord_message_id
+        self.has_game = has_game
+        self.game_name = game_name
+        self.game_players = game_players
+        self.game_duration = game_duration
+        self.game_age = game_age
+        self.username = username
+
+    @classmethod
+    def from_document(cls, reservation, game=None, user=None):
+        """Construit la vue d'un document de réservation
+
+        game et user sont pris dans les clés 'game' et 'user' ajoutées par
+        Database.hydrate_reservations s'ils ne sont pas fournis.
+        """
+        if game is None:
+            game = reservation.get('game')
+        if user is None:
+            user = reservation.get('user')
+
+        return cls(
+            id=reservation['_id'],
+            status=reservation.get('status', 'pending'),
+            start_ts=to_epoch(reservation.get('startDate')),
+            end_ts=to_epoch(reservation.get('endDate')),
+            created_ts=to_epoch(reservation.get('createdAt')),
+            notes=reservation.get('notes'),
+            admin_notes=reservation.get('admin_notes'),
+            discord_message_id=reservation.get('discord_message_id'),
+            has_game=bool(game),
+            game_name=game.get('name') if game else None,
+            game_players=game.get('players', 'N/A') if game else None,
+            game_duration=game.get('duration', 'N/A') if game else None,
+            game_age=game.get('age', 'N/A') if game else None,
+            username=user.get('username') if user else None
+        )
+
+    @classmethod
+    def from_documents(cls, reservations):
+        """Construit les vues d'une liste de réservations hydratées"""
+        return [cls.from_document(reservation) for reservation in reservations]
+
+    def __repr__(self):
+        return f"<ReservationView id={self.id} status={self.status}>"
@@ -0,0 +1 @@
+# Package views pour les composants d'interface du bot 
\ No newline at end of file
@@ -0,0 +1,90 @@
+import discord
+import logging
+from bson import ObjectId
+from utils.embeds import EmbedBuilder
+from utils.permissions import check_admin_permission, send_permission_error
+from views.reservation_controls import DECISIONS
+from services.moderation import apply_bulk_decision
+from utils.profiling import profiled
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Discord limite un menu de sélection à 25 options
+SELECT_MAX_OPTIONS = 25
+
+
+class BulkModerationView(discord.ui.View):
+    """Menu de sélection des réservations d'une liste, à approuver ou rejeter ensemble
+
+    Attaché à l'embed de liste : l'admin coche les réservations puis clique
+    sur Approuver ou Rejeter ; toutes sont traitées en une seule écriture.
+    """
+
+    def __init__(self, views, timeout=600):
+        super().__init__(timeout=timeout)
+        options = [
+            discord.SelectOption(
+                label=f"{view.game_name or 'Jeu inconnu'} - {view.username or 'Utilisateur inconnu'}"[:100],
+                description=f"ID: {view.id}",
+                value=str(view.id)
+            )
+            for view in views[:SELECT_MAX_OPTIONS]
+        ]
+        self.select = None
+        if options:
+            self.select = discord.ui.Select(
+                placeholder="Sélectionner des réservations…",
+                min_values=1,
+                max_values=len(options),
+                options=options,
+                row=0
+            )
+            self.select.callback = self.on_select
+            self.add_item(self.select)
+        else:
+            # Liste vide : rien à sélectionner
+            self.approve.disabled = True
+            self.reject.disabled = True
+
+    async def on_select(self, interaction):
+        """La sélection est conservée par le menu jusqu'au clic sur une action"""
+        await interaction.response.defer()
+
+    @discord.ui.button(label="Approuver la sélection", style=discord.ButtonStyle.success, emoji=Config.EMOJIS['APPROVE'], row=1)
+    async def approve(self, interaction, button):
+        await self.decide(interaction, 'approve')
+
+    @discord.ui.button(label="Rejeter la sélection", style=discord.ButtonStyle.danger, emoji=Config.EMOJIS['REJECT'], row=1)
+    async def reject(self, interaction, button):
+        await self.decide(interaction, 'reject')
+
+    @profiled('button:bulk')
+    async def decide(self, interaction, action):
+        """Traite les réservations sélectionnées et répond par un récapitulatif"""
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
+
+        if not self.select or not self.select.values:
+            embed = EmbedBuilder.create_warning_embed("Aucune sélection", "Sélectionnez au moins une réservation dans le menu")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        await interaction.response.defer()
+
+        try:
+            reservation_ids = [ObjectId(value) for value in self.select.values]
+            outcomes = await apply_bulk_decision(
+                reservation_ids,
+                action,
+                interaction.user.name,
+                getattr(interaction.client, 'notification_service', None)
+            )
+            embed = EmbedBuilder.create_bulk_summary_embed(DECISIONS[action][0], outcomes)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'action groupée {action}: {e}")
+            embed = EmbedBuilder.create_error_embed("Erreur", f"Une erreur s'est produite: {str(e)}")
+
+        await interaction.followup.send(embed=embed)
@@ -0,0 +1,194 @@
+import discord
+import logging
+import re
+from bson import ObjectId
+from database import db
+from utils.embeds import EmbedBuilder
+from utils.reservation_view import ReservationView
+from utils.permissions import check_admin_permission, send_permission_error
+from utils.profiling import profiled
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Actions des boutons et statut résultant
+DECISIONS = {
+    'approve': ('approved', "Approuvé"),
+    'reject': ('rejected', "Rejeté")
+}
+
+
+# Format des custom_id des boutons de modération
+CUSTOM_ID_PATTERN = r'reservation:(?P<action>approve|reject|info):(?P<id>[0-9a-f]{24})'
+
+
+class ReservationButton(discord.ui.DynamicItem[discord.ui.Button], template=CUSTOM_ID_PATTERN):
+    """Bouton de modération persistant
+
+    L'action et l'ID de la réservation sont encodés dans le custom_id : le
+    bouton reste fonctionnel après un redémarrage du bot, sans état en mémoire.
+    Dans un message groupé, position numérote le bouton comme l'embed de sa
+    réservation et row le place sur la ligne de celle-ci.
+    """
+
+    def __init__(self, action, reservation_id, disabled=False, position=None, row=None):
+        labels = {
+            'approve': ("Approuver", discord.ButtonStyle.success, Config.EMOJIS['APPROVE']),
+            'reject': ("Rejeter", discord.ButtonStyle.danger, Config.EMOJIS['REJECT']),
+            'info': ("Détails", discord.ButtonStyle.secondary, Config.EMOJIS['INFO'])
+        }
+        label, style, emoji = labels[action]
+        if position is not None:
+            label = f"{label} #{position}"
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=style,
+                emoji=emoji,
+                disabled=disabled,
+                row=row,
+                custom_id=f"reservation:{action}:{reservation_id}"
+            )
+        )
+        self.action = action
+        self.reservation_id = ObjectId(str(reservation_id))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['action'], match['id'])
+
+    @profiled('button:reservation')
+    async def callback(self, interaction):
+        """Gère un clic sur un bouton de modération"""
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
+
+        try:
+            if self.action == 'info':
+                await self.show_details(interaction)
+            else:
+                await self.decide(interaction)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement du bouton {self.custom_id}: {e}")
+            embed = EmbedBuilder.create_error_embed("Erreur", f"Une erreur s'est produite: {str(e)}")
+            if interaction.response.is_done():
+                await interaction.followup.send(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    async def decide(self, interaction):
+        """Approuve ou rejette la réservation puis met à jour le message"""
+        status, verb = DECISIONS[self.action]
+
+        reservation = await db.transition_reservation_status(
+            self.reservation_id,
+            status,
+            f"{verb} par {interaction.user.name} via Discord"
+        )
+        if not reservation:
+            # Relire uniquement pour expliquer l'échec (introuvable ou déjà traitée)
+            current = await db.get_reservation_by_id(self.reservation_id)
+            embed = EmbedBuilder.create_transition_error_embed(self.reservation_id, current)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        # Le clic porte le message : l'éditer directement dans la réponse, en ne
+        # touchant que l'embed et les boutons de cette réservation
+        message = interaction.message
+        embeds = message.embeds
+        index = find_reservation_embed(message, self.reservation_id)
+        if index is None:
+            # Ne jamais écraser l'embed d'une autre réservation du message
+            logger.warning(f"Embed de la réservation {self.reservation_id} introuvable dans le message {message.id}, message non modifié")
+            embed = EmbedBuilder.create_success_embed(verb, f"Réservation {self.reservation_id} : {verb.lower()}e")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+        else:
+            embeds[index] = EmbedBuilder.apply_status(embeds[index], status)
+            view = controls_for_message(message, {self.reservation_id: False})
+            await interaction.response.edit_message(embeds=embeds, view=view)
+
+        logger.info(f"Réservation {self.reservation_id} {status} par {interaction.user.name}")
+
+    async def show_details(self, interaction):
+        """Affiche les détails de la réservation à l'admin"""
+        reservation = await db.get_reservation_by_id(self.reservation_id)
+        if not reservation:
+            embed = EmbedBuilder.create_error_embed("Réservation introuvable", f"Aucune réservation trouvée avec l'ID: {self.reservation_id}")
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+
+        await db.hydrate_reservations([reservation])
+        embed = EmbedBuilder.create_reservation_detail_embed(ReservationView.from_document(reservation))
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+class ReservationControls(discord.ui.View):
+    """Boutons Approuver / Rejeter / Détails d'une notification de réservation
+
+    Une fois la réservation traitée, seul le bouton Détails reste actif.
+    """
+
+    def __init__(self, reservation_id, pending=True):
+        super().__init__(timeout=None)
+        self.add_item(ReservationButton('approve', reservation_id, disabled=not pending))
+        self.add_item(ReservationButton('reject', reservation_id, disabled=not pending))
+        self.add_item(ReservationButton('info', reservation_id))
+
+
+class ReservationBatchControls(discord.ui.View):
+    """Boutons d'un message groupé : une ligne numérotée par réservation
+
+    entries : liste de (reservation_id, pending) dans l'ordre des embeds.
+    """
+
+    def __init__(self, entries):
+        super().__init__(timeout=None)
+        for row, (reservation_id, pending) in enumerate(entries):
+            position = row + 1
+            self.add_item(ReservationButton('approve', reservation_id, disabled=not pending, position=position, row=row))
+            self.add_item(ReservationButton('reject', reservation_id, disabled=not pending, position=position, row=row))
+            self.add_item(ReservationButton('info', reservation_id, position=position, row=row))
+
+
+def find_reservation_embed(message, reservation_id):
+    """Index de l'embed d'une réservation dans un message (repéré par son pied de page), ou None"""
+    footer = f"ID: {reservation_id}"
+    for i, embed in enumerate(message.embeds):
+        if embed.footer and embed.footer.text == footer:
+            return i
+    return None
+
+
+def controls_for_message(message, changes):
+    """Reconstruit les boutons d'un message après le traitement de réservations
+
+    changes associe l'ID de chaque réservation modifiée à son nouvel état
+    (True si encore en attente). L'état des autres réservations d'un message
+    groupé est relu sur les boutons du message lui-même (un bouton Approuver
+    désactivé = traitée). Retourne None (aucun bouton) si le message n'a
+    pas de boutons et que changes ne désigne pas une seule réservation.
+    """
+    changes = {str(reservation_id): pending for reservation_id, pending in changes.items()}
+    entries = []
+    for row in message.components:
+        for component in getattr(row, 'children', []):
+            match = re.fullmatch(CUSTOM_ID_PATTERN, getattr(component, 'custom_id', None) or '')
+            if match and match['action'] == 'approve':
+                entries.append((match['id'], not component.disabled))
+
+    if len(entries) == 1:
+        reservation_id, pending = entries[0]
+        return ReservationControls(reservation_id, pending=changes.get(reservation_id, pending))
+    if not entries:
+        if len(changes) != 1:
+            logger.warning(f"Boutons introuvables pour {len(changes)} réservation(s), message laissé sans boutons")
+            return None
+        reservation_id, pending = next(iter(changes.items()))
+        return ReservationControls(reservation_id, pending=pending)
+
+    return ReservationBatchControls([
+        (entry_id, changes.get(entry_id, entry_pending))
+        for entry_id, entry_pending in entries
+    ])
@@ -0,0 +1,79 @@
+import discord
+from database import db
+from utils.embeds import EmbedBuilder
+from utils.reservation_view import ReservationView
+from utils.permissions import check_admin_permission, send_permission_error
+from views.bulk_moderation import BulkModerationView
+from utils.profiling import profiled
+
+# Réservations par page de liste
+PAGE_SIZE = 10
+
+
+def page_key(reservation):
+    """Clé de pagination d'une réservation (ordre de la liste)"""
+    return reservation.get('startDate'), reservation['_id']
+
+
+async def build_reservation_list(after=None, before=None, page=1):
+    """Charge une page de réservations en attente et retourne (embed, vue)
+
+    Seule la page demandée est lue dans MongoDB (voir
+    Database.get_reservations_page) : le coût ne dépend pas du nombre de
+    réservations en attente.
+    """
+    reservations, has_more = await db.get_reservations_page(after=after, before=before, limit=PAGE_SIZE)
+
+    if before is not None:
+        if not has_more and len(reservations) == PAGE_SIZE:
+            page, has_previous, has_next = 1, False, True
+        elif not has_more:
+            # Des réservations ont été traitées entre-temps : page de début incomplète,
+            # repartir de la première page
+            reservations, has_more = await db.get_reservations_page(limit=PAGE_SIZE)
+            page, has_previous, has_next = 1, False, has_more
+        else:
+            has_previous, has_next = True, True
+    else:
+        has_previous, has_next = page > 1, has_more
+
+    await db.hydrate_reservations(reservations)
+    views = ReservationView.from_documents(reservations)
+    embed = EmbedBuilder.create_reservation_list_embed(views, page=page)
+    return embed, ReservationListView(reservations, views, page, has_previous, has_next)
+
+
+class ReservationListView(BulkModerationView):
+    """Liste paginée des réservations en attente
+
+    Reprend le menu d'actions groupées de BulkModerationView pour la page
+    affichée, et ajoute les boutons Précédent / Suivant qui ne chargent que la
+    page demandée, à partir des clés de la page courante.
+    """
+
+    def __init__(self, reservations, views, page, has_previous, has_next):
+        super().__init__(views)
+        self.page = page
+        self.first_key = page_key(reservations[0]) if reservations else None
+        self.last_key = page_key(reservations[-1]) if reservations else None
+        self.previous_page.disabled = not has_previous or self.first_key is None
+        self.next_page.disabled = not has_next or self.last_key is None
+
+    @discord.ui.button(label="Précédent", style=discord.ButtonStyle.secondary, emoji="◀️", row=2)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, before=self.first_key, page=self.page - 1)
+
+    @discord.ui.button(label="Suivant", style=discord.ButtonStyle.secondary, emoji="▶️", row=2)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, after=self.last_key, page=self.page + 1)
+
+    @profiled('button:page')
+    async def show(self, interaction, after=None, before=None, page=1):
+        """Remplace la page affichée par la page demandée"""
+        has_permission, error_message = check_admin_permission(interaction)
+        if not has_permission:
+            await send_permission_error(interaction, error_message)
+            return
+
+        embed, view = await build_reservation_list(after=after, before=before, page=page)
+        await interaction.response.edit_message(embed=embed, view=view)